@@ -21,6 +21,10 @@ from app.models.track import Track, TrackMaterial, TrackProgress
 from app.models.shared_link import SharedLink
 from app.models.associations import material_persona, material_segment
 from app.models.material_request import MaterialRequest
+from app.models.material_chunk import MaterialChunk
+from app.models.material_neighbor import MaterialNeighbor
+from app.models.material_fingerprint import MaterialFingerprint, MaterialLshBucket
+from app.models.storage_blob import StorageBlob
 from app.core.config import settings
 
 # this is the Alembic Config object
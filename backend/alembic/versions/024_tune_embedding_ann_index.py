@@ -0,0 +1,64 @@
+"""Rebuild the materials.embedding_vec ANN index with explicit build parameters
+
+Revision ID: 024
+Revises: f3e021285562
+
+017/018 created the HNSW index with pgvector's implicit defaults. This revision
+rebuilds it with explicit parameters and lets deployments pick IVFFlat instead:
+
+    EMBEDDING_INDEX_TYPE=hnsw      (default) m / ef_construction from
+                                   EMBEDDING_HNSW_M / EMBEDDING_HNSW_EF_CONSTRUCTION
+    EMBEDDING_INDEX_TYPE=ivfflat   lists from EMBEDDING_IVFFLAT_LISTS, or
+                                   rows / 1000 (min 10) when 0
+
+These are read from app.core.config.settings.
+
+Query-time knobs (hnsw.ef_search, ivfflat.probes) are applied per request by
+app.services.vector_index.apply_search_tuning.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+revision = '024'
+down_revision = 'f3e021285562'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    index_type = settings.EMBEDDING_INDEX_TYPE.lower()
+
+    op.execute('DROP INDEX IF EXISTS idx_materials_embedding_vec;')
+
+    if index_type == "ivfflat":
+        lists = settings.EMBEDDING_IVFFLAT_LISTS
+        if not lists:
+            conn = op.get_bind()
+            rows = conn.execute(
+                sa.text("SELECT count(*) FROM materials WHERE embedding_vec IS NOT NULL")
+            ).scalar() or 0
+            lists = max(rows // 1000, 10)
+        op.execute(f"""
+            CREATE INDEX idx_materials_embedding_vec
+            ON materials USING ivfflat (embedding_vec vector_cosine_ops)
+            WITH (lists = {int(lists)});
+        """)
+    else:
+        m = int(settings.EMBEDDING_HNSW_M)
+        ef_construction = int(settings.EMBEDDING_HNSW_EF_CONSTRUCTION)
+        op.execute(f"""
+            CREATE INDEX idx_materials_embedding_vec
+            ON materials USING hnsw (embedding_vec vector_cosine_ops)
+            WITH (m = {m}, ef_construction = {ef_construction});
+        """)
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS idx_materials_embedding_vec;')
+    op.execute("""
+        CREATE INDEX idx_materials_embedding_vec
+        ON materials USING hnsw (embedding_vec vector_cosine_ops);
+    """)
@@ -0,0 +1,57 @@
+"""Enable pg_trgm and add GIN trigram indexes on searched text columns
+
+Revision ID: 025
+Revises: 024
+
+The keyword fallbacks (semantic search, the agent's search_materials tool, the
+share-material intent detector and the product icon lookup) match with
+leading-wildcard ILIKE, which the btree indexes from 002 can never serve.
+GIN trigram indexes serve both ILIKE '%term%' and the pg_trgm word-similarity
+operators used by app.services.trigram_search.
+"""
+from alembic import op
+
+
+revision = '025'
+down_revision = '024'
+branch_labels = None
+depends_on = None
+
+
+MATERIAL_COLUMNS = (
+    'name',
+    'file_name',
+    'description',
+    'product_name',
+    'universe_name',
+    'tags',
+    'keywords',
+    'use_cases',
+    'pain_points',
+    'executive_summary',
+)
+
+PRODUCT_COLUMNS = ('name', 'display_name')
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+
+    for column in MATERIAL_COLUMNS:
+        op.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_materials_{column}_trgm
+            ON materials USING GIN ({column} gin_trgm_ops);
+        """)
+
+    for column in PRODUCT_COLUMNS:
+        op.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_products_{column}_trgm
+            ON products USING GIN ({column} gin_trgm_ops);
+        """)
+
+
+def downgrade():
+    for column in PRODUCT_COLUMNS:
+        op.execute(f'DROP INDEX IF EXISTS idx_products_{column}_trgm;')
+    for column in MATERIAL_COLUMNS:
+        op.execute(f'DROP INDEX IF EXISTS idx_materials_{column}_trgm;')
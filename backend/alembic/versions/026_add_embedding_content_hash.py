@@ -0,0 +1,24 @@
+"""Add materials.embedding_content_hash for incremental re-embedding
+
+Revision ID: 026
+Revises: 025
+
+Stores a hash of the text (and embedding model) a material's vector was built
+from, so only materials whose content changed are re-embedded.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '026'
+down_revision = '025'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('materials', sa.Column('embedding_content_hash', sa.String(64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('materials', 'embedding_content_hash')
@@ -0,0 +1,54 @@
+"""Add material_chunks for passage-level document embeddings
+
+Revision ID: 027
+Revises: 026
+
+Each row is an overlapping text window of a material's extracted file text
+(slide, page or section) with its own embedding. When pgvector is installed an
+embedding_vec vector(1024) column and an HNSW index are added, matching
+materials.embedding_vec from 018.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '027'
+down_revision = '026'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'material_chunks',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), onupdate=sa.func.now()),
+        sa.Column('material_id', sa.Integer(), sa.ForeignKey('materials.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('location', sa.String(50), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('embedding', sa.Text(), nullable=True),
+        sa.Column('source_hash', sa.String(64), nullable=False),
+    )
+    op.create_index('idx_material_chunks_material', 'material_chunks', ['material_id', 'chunk_index'])
+    op.create_index('idx_material_chunks_source_hash', 'material_chunks', ['source_hash'])
+
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'vector') THEN
+                ALTER TABLE material_chunks ADD COLUMN embedding_vec vector(1024);
+                CREATE INDEX idx_material_chunks_embedding_vec
+                    ON material_chunks USING hnsw (embedding_vec vector_cosine_ops);
+            END IF;
+        END
+        $$;
+    """)
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS idx_material_chunks_embedding_vec;')
+    op.drop_index('idx_material_chunks_source_hash', table_name='material_chunks')
+    op.drop_index('idx_material_chunks_material', table_name='material_chunks')
+    op.drop_table('material_chunks')
@@ -0,0 +1,70 @@
+"""Optionally build the embedding ANN indexes on compressed vectors
+
+Revision ID: 028
+Revises: 027
+
+With EMBEDDING_INDEX_PRECISION=half|binary and/or EMBEDDING_INDEX_DIMENSIONS>0
+the full-precision HNSW indexes on materials.embedding_vec and
+material_chunks.embedding_vec are replaced by HNSW expression indexes on
+halfvec / binary_quantize / subvector(...) of the same column (pgvector >= 0.7).
+embedding_vec itself keeps full precision and is used to rescore the final
+results (app.services.vector_index.ann_search_sql).
+
+With the default (full, 0) this revision is a no-op. To switch modes later,
+downgrade to 027 and upgrade again with the new settings.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.services.vector_index import ann_expression
+
+
+revision = '028'
+down_revision = '027'
+branch_labels = None
+depends_on = None
+
+# table -> (full-precision index from 024/027, compressed index name)
+_INDEXES = {
+    "materials": ("idx_materials_embedding_vec", "idx_materials_embedding_vec_ann"),
+    "material_chunks": ("idx_material_chunks_embedding_vec", "idx_material_chunks_embedding_vec_ann"),
+}
+
+
+def _has_vector_column(conn, table: str) -> bool:
+    return bool(conn.execute(sa.text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = :table AND column_name = 'embedding_vec'
+    """), {"table": table}).scalar())
+
+
+def upgrade():
+    expr = ann_expression("embedding_vec")
+    if not expr.compressed:
+        return
+
+    conn = op.get_bind()
+    m = int(settings.EMBEDDING_HNSW_M)
+    ef_construction = int(settings.EMBEDDING_HNSW_EF_CONSTRUCTION)
+    for table, (full_index, ann_index) in _INDEXES.items():
+        if not _has_vector_column(conn, table):
+            continue
+        op.execute(f'DROP INDEX IF EXISTS {full_index};')
+        op.execute(f'DROP INDEX IF EXISTS {ann_index};')
+        op.execute(f"""
+            CREATE INDEX {ann_index}
+            ON {table} USING hnsw ({expr.indexed} {expr.opclass})
+            WITH (m = {m}, ef_construction = {ef_construction});
+        """)
+
+
+def downgrade():
+    conn = op.get_bind()
+    for table, (full_index, ann_index) in _INDEXES.items():
+        op.execute(f'DROP INDEX IF EXISTS {ann_index};')
+        if _has_vector_column(conn, table):
+            op.execute(f"""
+                CREATE INDEX IF NOT EXISTS {full_index}
+                ON {table} USING hnsw (embedding_vec vector_cosine_ops);
+            """)
@@ -0,0 +1,38 @@
+"""Add material_neighbors for cached "more like this" lists
+
+Revision ID: 029
+Revises: 028
+
+Each material's top-N nearest neighbours by embedding similarity, computed
+from the stored vectors and invalidated when embeddings change.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '029'
+down_revision = '028'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'material_neighbors',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), onupdate=sa.func.now()),
+        sa.Column('material_id', sa.Integer(), sa.ForeignKey('materials.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('neighbor_id', sa.Integer(), sa.ForeignKey('materials.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.UniqueConstraint('material_id', 'neighbor_id', name='uq_material_neighbors_pair'),
+    )
+    op.create_index('idx_material_neighbors_material', 'material_neighbors', ['material_id', 'rank'])
+    op.create_index('idx_material_neighbors_neighbor', 'material_neighbors', ['neighbor_id'])
+
+
+def downgrade():
+    op.drop_index('idx_material_neighbors_neighbor', table_name='material_neighbors')
+    op.drop_index('idx_material_neighbors_material', table_name='material_neighbors')
+    op.drop_table('material_neighbors')
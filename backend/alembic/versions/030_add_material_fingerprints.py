@@ -0,0 +1,51 @@
+"""Add material_fingerprints and material_lsh_buckets for near-duplicate detection
+
+Revision ID: 030
+Revises: 029
+
+MinHash signatures of each material's extracted document text, and their LSH
+band buckets indexed by (band, bucket) so candidate duplicates are found with
+an index lookup instead of comparing every pair of materials.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '030'
+down_revision = '029'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'material_fingerprints',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), onupdate=sa.func.now()),
+        sa.Column('material_id', sa.Integer(), sa.ForeignKey('materials.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('source_hash', sa.String(64), nullable=False),
+        sa.Column('signature', sa.LargeBinary(), nullable=False),
+        sa.Column('shingle_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('idx_material_fingerprints_material', 'material_fingerprints', ['material_id'], unique=True)
+
+    op.create_table(
+        'material_lsh_buckets',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), onupdate=sa.func.now()),
+        sa.Column('material_id', sa.Integer(), sa.ForeignKey('materials.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('band', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+    )
+    op.create_index('idx_material_lsh_buckets_material', 'material_lsh_buckets', ['material_id'])
+    op.create_index('idx_material_lsh_buckets_band_bucket', 'material_lsh_buckets', ['band', 'bucket'])
+
+
+def downgrade():
+    op.drop_index('idx_material_lsh_buckets_band_bucket', table_name='material_lsh_buckets')
+    op.drop_index('idx_material_lsh_buckets_material', table_name='material_lsh_buckets')
+    op.drop_table('material_lsh_buckets')
+    op.drop_index('idx_material_fingerprints_material', table_name='material_fingerprints')
+    op.drop_table('material_fingerprints')
@@ -0,0 +1,27 @@
+"""Add materials.file_sha256 and widen materials.file_size for large uploads
+
+Revision ID: 031
+Revises: 030
+
+Uploads are streamed to disk and hashed on the fly; the SHA-256 is stored with
+the material. file_size becomes BIGINT since files up to MAX_FILE_SIZE (60GB)
+overflow INTEGER.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '031'
+down_revision = '030'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('materials', sa.Column('file_sha256', sa.String(64), nullable=True))
+    op.alter_column('materials', 'file_size', type_=sa.BigInteger(), existing_type=sa.Integer())
+
+
+def downgrade():
+    op.alter_column('materials', 'file_size', type_=sa.Integer(), existing_type=sa.BigInteger())
+    op.drop_column('materials', 'file_sha256')
@@ -0,0 +1,35 @@
+"""Add storage_blobs for content-addressed file storage
+
+Revision ID: 032
+Revises: 031
+
+New uploads are stored once per SHA-256 under blobs/xx/yy/<hash> and
+materials.file_path points at that key; storage_blobs counts the materials
+referencing each blob so it is deleted with the last of them. Existing
+folder-based paths keep working unchanged.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '032'
+down_revision = '031'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'storage_blobs',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), onupdate=sa.func.now()),
+        sa.Column('sha256', sa.String(64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('sha256', name='uq_storage_blobs_sha256'),
+    )
+
+
+def downgrade():
+    op.drop_table('storage_blobs')
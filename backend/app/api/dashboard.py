@@ -10,6 +10,7 @@ from app.models.usage import MaterialUsage
 from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.models.user import User
+from app.services.material_summary import summary_options
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
@@ -150,7 +151,7 @@ async def get_sales_dashboard(
     
     # Get all published materials (excluding attached materials)
     # Handle both enum and string status values
-    published_materials_query = db.query(Material).filter(
+    published_materials_query = db.query(Material).options(summary_options()).filter(
         or_(
             Material.status == MaterialStatus.PUBLISHED,
             Material.status == "published"
@@ -169,7 +170,7 @@ async def get_sales_dashboard(
         materials_by_type[material_type] += 1
     
     # Get popular materials (top 10 by usage_count, excluding attached materials)
-    popular_materials_query = db.query(Material).filter(
+    popular_materials_query = db.query(Material).options(summary_options()).filter(
         or_(
             Material.status == MaterialStatus.PUBLISHED,
             Material.status == "published"
@@ -202,7 +203,7 @@ async def get_sales_dashboard(
     
     # Get unique materials from recent views
     viewed_material_ids = list(set([v.material_id for v in recent_views]))
-    recently_viewed_materials = db.query(Material).filter(
+    recently_viewed_materials = db.query(Material).options(summary_options()).filter(
         Material.id.in_(viewed_material_ids),
         or_(
             Material.status == MaterialStatus.PUBLISHED,
@@ -7,10 +7,10 @@ from datetime import datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File
-from fastapi.responses import FileResponse
 from pathlib import Path
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
+from starlette.concurrency import run_in_threadpool
 
 from app.core.database import get_db
 from app.core.config import settings
@@ -42,6 +42,8 @@ from app.schemas.deal_room import (
     RoomPermissionsResponse,
 )
 from app.services.storage import storage_service
+from app.services.file_serving import send_file, serve_material_file
+from app.services.usage_ingest import usage_ingester
 from app.core.config import settings
 
 DEAL_ROOM_LOGOS_DIR = Path(settings.STORAGE_PATH) / "deal_room_logos"
@@ -1113,8 +1115,8 @@ async def get_room_by_token(
     ctx = get_room_access_context(room, current_user, db)
     my_permissions = ctx.to_permissions_response()
 
-    room.record_access()
-    db.commit()
+    # Written in the background by the usage ingester
+    usage_ingester.increment("deal_rooms", room.id, "access_count", last_accessed_at=datetime.utcnow())
 
     # Group materials by section
     sections: dict = {}
@@ -1210,40 +1212,14 @@ async def download_room_material(
     if not material or not material.file_path:
         raise HTTPException(status_code=404, detail="File not available")
 
-    # Track download
-    try:
-        usage = MaterialUsage(
-            material_id=material.id,
-            user_id=room.created_by_user_id,
-            action=UsageAction.DOWNLOAD.value,
-            used_at=datetime.utcnow(),
-            deal_room_id=room.id,
-            ip_address=request.client.host if request.client else None,
-            user_agent=request.headers.get("user-agent"),
+    # Track download (user_id required; use room creator when available)
+    if room.created_by_user_id is not None:
+        await usage_ingester.record(
+            material.id, room.created_by_user_id, UsageAction.DOWNLOAD.value, request, deal_room_id=room.id
         )
-        db.add(usage)
-        material.usage_count = (material.usage_count or 0) + 1
-    except Exception:
-        pass
-    db.commit()
-
-    file_path = storage_service.get_file_path(material.file_path)
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found on server")
+    usage_ingester.increment("materials", material.id, "usage_count")
 
-    file_format = material.file_format or (material.file_name.split(".")[-1] if material.file_name else "")
-    media_type_map = {
-        "pdf": "application/pdf",
-        "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        "mp4": "video/mp4", "webm": "video/webm", "mov": "video/quicktime",
-        "avi": "video/x-msvideo", "mkv": "video/x-matroska",
-    }
-    media_type = media_type_map.get(file_format.lower(), "application/octet-stream")
-    filename = material.file_name or f"material_{material.id}.{file_format}"
-
-    return FileResponse(path=str(file_path), filename=filename, media_type=media_type)
+    return await serve_material_file(request, material, inline=False)
 
 
 @router.get("/token/{token}/materials/{material_id}/thumbnail")
@@ -1254,7 +1230,6 @@ async def thumbnail_room_material(
     current_user: User = Depends(get_current_active_user),
 ):
     """Get pre-generated thumbnail for material in room. Requires login."""
-    from fastapi.responses import FileResponse
     from app.services.thumbnail_service import ensure_thumbnail
 
     room = db.query(DealRoom).filter(DealRoom.unique_token == token).first()
@@ -1274,7 +1249,7 @@ async def thumbnail_room_material(
     if not material or not material.file_path:
         raise HTTPException(status_code=404, detail="File not available")
 
-    file_path = storage_service.get_file_path(material.file_path)
+    file_path = await run_in_threadpool(storage_service.get_file_path, material.file_path)
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
 
@@ -1284,11 +1259,7 @@ async def thumbnail_room_material(
     if not thumb_path or not thumb_path.exists():
         raise HTTPException(status_code=404, detail="Thumbnail not available")
 
-    return FileResponse(
-        path=str(thumb_path),
-        media_type="image/png",
-        headers={"Cache-Control": "public, max-age=86400"},
-    )
+    return send_file(thumb_path, "image/png", {"Cache-Control": "public, max-age=86400"})
 
 
 @router.get("/token/{token}/materials/{material_id}/view")
@@ -1318,45 +1289,13 @@ async def view_room_material(
         raise HTTPException(status_code=404, detail="File not available")
 
     # Track view (user_id required; use room creator when available)
-    try:
-        if room.created_by_user_id is not None:
-            usage = MaterialUsage(
-                material_id=material.id,
-                user_id=room.created_by_user_id,
-                action=UsageAction.VIEW.value,
-                used_at=datetime.utcnow(),
-                deal_room_id=room.id,
-                ip_address=request.client.host if request.client else None,
-                user_agent=request.headers.get("user-agent"),
-            )
-            db.add(usage)
-        material.usage_count = (material.usage_count or 0) + 1
-    except Exception:
-        pass
-    db.commit()
-
-    file_path = storage_service.get_file_path(material.file_path)
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found on server")
+    if room.created_by_user_id is not None:
+        await usage_ingester.record(
+            material.id, room.created_by_user_id, UsageAction.VIEW.value, request, deal_room_id=room.id
+        )
+    usage_ingester.increment("materials", material.id, "usage_count")
 
-    file_format = material.file_format or (material.file_name.split(".")[-1] if material.file_name else "")
-    media_type_map = {
-        "pdf": "application/pdf",
-        "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        "mp4": "video/mp4", "webm": "video/webm", "mov": "video/quicktime",
-        "avi": "video/x-msvideo", "mkv": "video/x-matroska",
-    }
-    media_type = media_type_map.get(file_format.lower(), "application/octet-stream")
-    filename = material.file_name or f"material_{material.id}.{file_format}"
-
-    return FileResponse(
-        path=str(file_path),
-        filename=filename,
-        media_type=media_type,
-        headers={"Content-Disposition": f'inline; filename="{filename}"'},
-    )
+    return await serve_material_file(request, material, inline=True)
 
 
 # --- Analytics ---
@@ -9,7 +9,7 @@ from app.models.material import Material
 from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.models.user import User
-import json
+from app.services.material_summary import SUMMARY_FIELDS, json_list, summary_options
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,35 +18,46 @@ router = APIRouter(prefix="/api/discovery", tags=["discovery"])
 
 
 async def _try_semantic(keywords: str, limit: int, db: Session):
-    """Attempt semantic search, returns list of (material_id, score) or None."""
+    """Attempt semantic search, returns ranked summary rows (with `similarity`) or None."""
     try:
-        embedded_count = db.execute(
-            sa_text("SELECT count(*) FROM materials WHERE embedding_vec IS NOT NULL")
-        ).scalar()
-        if not embedded_count or embedded_count == 0:
+        from app.services.embedding_coverage import embedding_coverage
+        if not embedding_coverage.has_vectors(db):
             return None
 
-        from app.services.embedding_service import embed_text
-        qvec = await embed_text(keywords)
-        vec_str = "[" + ",".join(f"{v:.8f}" for v in qvec) + "]"
-
-        rows = db.execute(
-            sa_text("""
-                SELECT id, 1 - (embedding_vec <=> CAST(:qvec AS vector)) AS similarity
-                FROM materials
-                WHERE embedding_vec IS NOT NULL
-                  AND status NOT IN ('draft', 'archived')
-                ORDER BY embedding_vec <=> CAST(:qvec AS vector)
-                LIMIT :lim
-            """),
-            {"qvec": vec_str, "lim": limit},
-        ).fetchall()
-        return [(r[0], float(r[1])) for r in rows] if rows else None
+        from app.services.embedding_service import embed_query
+        from app.core.vector_codec import Vector
+        qvec = await embed_query(keywords)
+
+        from app.services.vector_index import ann_search_sql, apply_search_tuning
+        sql, ann_params = ann_search_sql(
+            SUMMARY_FIELDS, "materials", ["status NOT IN ('draft', 'archived')"], limit
+        )
+        apply_search_tuning(db, candidates=ann_params.get("ann_candidates", 0))
+        rows = db.execute(sa_text(sql), {"qvec": Vector(qvec), **ann_params}).fetchall()
+        return rows or None
     except Exception as e:
         logger.debug("Semantic search unavailable, falling back to keyword: %s", e)
         return None
 
 
+def _narrative_to_dict(m) -> dict:
+    """Serialize a Material or a summary row (see material_summary)."""
+    return {
+        "material_id": m.id,
+        "name": m.name,
+        "material_type": m.material_type,
+        "product_name": m.product_name,
+        "universe_name": m.universe_name,
+        "description": m.description,
+        "keywords": json_list(m.keywords),
+        "use_cases": json_list(m.use_cases),
+        "pain_points": json_list(m.pain_points),
+        "tags": json_list(m.tags),
+        "usage_count": m.usage_count or 0,
+        "health_score": m.health_score or 0,
+    }
+
+
 @router.get("/search")
 async def search_narratives(
     keywords: Optional[str] = None,
@@ -63,37 +74,12 @@ async def search_narratives(
 
     # Try semantic search first if a free-text query is provided
     if keywords and not use_case and not pain_point and not product_name:
-        semantic_hits = await _try_semantic(keywords, limit, db)
-        if semantic_hits:
-            ids = [h[0] for h in semantic_hits]
-            scores = {h[0]: h[1] for h in semantic_hits}
-            materials = db.query(Material).filter(Material.id.in_(ids)).all()
-            mat_map = {m.id: m for m in materials}
-
-            results = []
-            for mid in ids:
-                m = mat_map.get(mid)
-                if not m:
-                    continue
-                keywords_list = json.loads(m.keywords) if m.keywords else []
-                use_cases_list = json.loads(m.use_cases) if m.use_cases else []
-                pain_points_list = json.loads(m.pain_points) if m.pain_points else []
-                tags_list = json.loads(m.tags) if m.tags else []
-                results.append({
-                    "material_id": m.id,
-                    "name": m.name,
-                    "material_type": m.material_type,
-                    "product_name": m.product_name,
-                    "universe_name": m.universe_name,
-                    "description": m.description,
-                    "keywords": keywords_list,
-                    "use_cases": use_cases_list,
-                    "pain_points": pain_points_list,
-                    "tags": tags_list,
-                    "usage_count": m.usage_count or 0,
-                    "health_score": m.health_score or 0,
-                    "similarity_score": round(scores.get(mid, 0), 4),
-                })
+        semantic_rows = await _try_semantic(keywords, limit, db)
+        if semantic_rows:
+            results = [
+                {**_narrative_to_dict(r), "similarity_score": round(float(r.similarity), 4)}
+                for r in semantic_rows
+            ]
 
             return {
                 "results": results,
@@ -104,7 +90,7 @@ async def search_narratives(
             }
 
     # Keyword fallback
-    query = db.query(Material)
+    query = db.query(Material).options(summary_options())
     filters = []
 
     if keywords:
@@ -132,27 +118,7 @@ async def search_narratives(
     query = query.filter(Material.status.in_(["published", "high_usage"]))
     materials = query.offset(skip).limit(limit).all()
 
-    results = []
-    for material in materials:
-        keywords_list = json.loads(material.keywords) if material.keywords else []
-        use_cases_list = json.loads(material.use_cases) if material.use_cases else []
-        pain_points_list = json.loads(material.pain_points) if material.pain_points else []
-        tags_list = json.loads(material.tags) if material.tags else []
-
-        results.append({
-            "material_id": material.id,
-            "name": material.name,
-            "material_type": material.material_type,
-            "product_name": material.product_name,
-            "universe_name": material.universe_name,
-            "description": material.description,
-            "keywords": keywords_list,
-            "use_cases": use_cases_list,
-            "pain_points": pain_points_list,
-            "tags": tags_list,
-            "usage_count": material.usage_count or 0,
-            "health_score": material.health_score or 0,
-        })
+    results = [_narrative_to_dict(material) for material in materials]
 
     return {
         "results": results,
@@ -171,7 +137,7 @@ async def get_materials_by_use_case(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get materials for a specific use case"""
-    query = db.query(Material).filter(
+    query = db.query(Material).options(summary_options()).filter(
         Material.use_cases.ilike(f"%{use_case}%"),
         Material.status.in_(["published", "high_usage"])
     )
@@ -201,7 +167,7 @@ async def get_materials_by_pain_point(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get materials for a specific pain point"""
-    query = db.query(Material).filter(
+    query = db.query(Material).options(summary_options()).filter(
         Material.pain_points.ilike(f"%{pain_point}%"),
         Material.status.in_(["published", "high_usage"])
     )
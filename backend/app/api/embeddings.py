@@ -1,19 +1,30 @@
 """
 Embeddings API – generate and manage vector embeddings for materials.
 """
-import json
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 
 from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.models.user import User
 from app.models.material import Material
-from app.services.embedding_service import embed_text, embed_texts, build_material_text
+from app.services.embedding_service import (
+    embed_texts_with_provider,
+    build_material_text,
+    content_hash,
+    query_embedding_cache,
+    local_embedding_executor,
+)
+from app.services.embedding_pipeline import embedding_pipeline, store_embedding, after_embedding_commit
+from app.services.embedding_coverage import embedding_coverage
+from app.services.vector_index import index_mode
+from app.services.search_cache import search_result_cache
+from app.services.in_memory_vector_index import in_memory_vector_index
+from app.services.material_neighbors import refresh_neighbors
+from app.services.http_client import ai_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -28,15 +39,15 @@ async def _generate_embedding_for_material(material: Material, db: Session) -> b
             logger.warning("Material %s has insufficient text for embedding", material.id)
             return False
 
-        vec = await embed_text(composite_text)
-        vec_str = "[" + ",".join(f"{v:.8f}" for v in vec) + "]"
+        vecs, provider = await embed_texts_with_provider([composite_text])
+        vec = vecs[0]
 
-        material.embedding = json.dumps(vec)
-        db.execute(
-            text("UPDATE materials SET embedding_vec = :vec WHERE id = :mid"),
-            {"vec": vec_str, "mid": material.id},
-        )
+        embedding_coverage.ensure_fresh(db)
+        store_embedding(material, vec, db)
+        material.embedding_content_hash = content_hash(composite_text, provider)
         db.commit()
+        after_embedding_commit(material, vec)
+        refresh_neighbors(db, [material.id])
         return True
     except Exception as e:
         logger.error("Failed to generate embedding for material %s: %s", material.id, e)
@@ -44,54 +55,27 @@ async def _generate_embedding_for_material(material: Material, db: Session) -> b
         return False
 
 
-async def generate_all_embeddings(db: Session):
-    """Background task: generate embeddings for all materials missing them."""
-    materials = db.query(Material).filter(Material.embedding.is_(None)).all()
-    logger.info("Generating embeddings for %d materials...", len(materials))
-
-    batch_size = 16
-    success = 0
-    for i in range(0, len(materials), batch_size):
-        batch = materials[i : i + batch_size]
-        texts = [build_material_text(m) for m in batch]
-        try:
-            vecs = await embed_texts(texts)
-            for mat, vec in zip(batch, vecs):
-                vec_str = "[" + ",".join(f"{v:.8f}" for v in vec) + "]"
-                mat.embedding = json.dumps(vec)
-                db.execute(
-                    text("UPDATE materials SET embedding_vec = :vec WHERE id = :mid"),
-                    {"vec": vec_str, "mid": mat.id},
-                )
-            db.commit()
-            success += len(batch)
-        except Exception as e:
-            logger.error("Batch embedding failed at offset %d: %s", i, e)
-            db.rollback()
-
-    logger.info("Embedding generation complete: %d/%d successful", success, len(materials))
-    return success
-
-
 @router.post("/generate")
 async def trigger_generate_all(
-    background_tasks: BackgroundTasks,
+    force: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Trigger embedding generation for all materials (admin/pmm only)."""
+    """
+    Queue embedding generation (admin/pmm only).
+    Only materials without an embedding or whose content changed are queued,
+    unless force=true. Follow progress with GET /api/embeddings/progress.
+    """
     if current_user.role not in ("admin", "pmm", "director") and not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Only admin/pmm/director can generate embeddings")
 
     total = db.query(Material).count()
-    pending = db.query(Material).filter(Material.embedding.is_(None)).count()
-
-    count = await generate_all_embeddings(db)
+    queued = embedding_pipeline.scan(db, force=force)
     return {
-        "status": "completed",
+        "status": "queued",
         "total_materials": total,
-        "newly_embedded": count,
-        "already_embedded": total - pending,
+        "newly_queued": queued,
+        "queue": embedding_pipeline.progress(),
     }
 
 
@@ -115,7 +99,8 @@ async def embedding_status(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Check how many materials have embeddings."""
+    """Check how many materials have embeddings, and the vector coverage search uses to pick its mode."""
+    embedding_coverage.refresh(db)
     total = db.query(Material).count()
     embedded = db.query(Material).filter(Material.embedding.isnot(None)).count()
     return {
@@ -123,4 +108,23 @@ async def embedding_status(
         "embedded": embedded,
         "pending": total - embedded,
         "coverage_pct": round(embedded / total * 100, 1) if total > 0 else 0,
+        "vector_index": {**embedding_coverage.snapshot(), "storage": index_mode()},
+        "in_memory_index": {
+            "loaded": in_memory_vector_index.loaded,
+            "vectors": len(in_memory_vector_index),
+            "dimensions": in_memory_vector_index.dim,
+        },
+        "query_cache": query_embedding_cache.stats(),
+        "result_cache": search_result_cache.stats(),
+        "http_pool": ai_http_client.stats(),
+        "local_executor": local_embedding_executor.stats(),
+        "pipeline": embedding_pipeline.progress(),
     }
+
+
+@router.get("/progress")
+async def embedding_progress(
+    current_user: User = Depends(get_current_active_user),
+):
+    """Background embedding worker progress: queue depth, totals, batch size and throughput."""
+    return embedding_pipeline.progress()
@@ -1,27 +1,42 @@
 """
 Materials API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Response, Request
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status, Response, Request
+from typing import Awaitable, Callable, List, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models.material import Material, MaterialType, MaterialAudience, MaterialStatus
 from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.models.user import User
-from app.schemas.material import MaterialCreate, MaterialUpdate, MaterialResponse
+from app.schemas.material import (
+    MaterialCreate, MaterialUpdate, MaterialResponse, MaterialUploadResponse,
+    UploadSessionCreate, UploadSessionResponse,
+)
 from app.schemas.error import ErrorResponse
-from datetime import datetime, timedelta
-from app.services.file_extraction import extract_text_from_file
+from datetime import datetime
+from app.services.file_extraction import extract_pages_from_file, extract_text_from_file
 from app.services.ai_service import generate_executive_summary
 from app.core.config import settings
 from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+import json
 import logging
-import asyncio
 
 logger = logging.getLogger(__name__)
 
 # Import storage_service from storage module
-from app.services.storage import storage_service
+from app.services.storage import FileTooLargeError, PendingUpload, storage_service
+from app.services.upload_sessions import UploadSessionBusy, UploadSessionError, upload_sessions
+from app.services.embedding_coverage import embedding_coverage
+from app.services.in_memory_vector_index import in_memory_vector_index
+from app.services.embedding_pipeline import embedding_pipeline
+from app.services.material_chunks import is_chunkable
+from app.services.material_neighbors import get_neighbors, invalidate_neighbors
+from app.services.duplicate_detection import duplicate_report, find_near_duplicates, fingerprint_material
+from app.services.material_summary import summary_to_dict
+from app.services.file_serving import send_file, serve_material_file
+from app.services.usage_ingest import usage_ingester
 
 router = APIRouter(prefix="/api/materials", tags=["materials"])
 
@@ -111,33 +126,48 @@ def _check_existing_material_by_type(
     if material_type.upper() in db_to_frontend_mapping:
         normalized_type = db_to_frontend_mapping[material_type.upper()].lower()
     
-    # Query for existing materials with same product_name
+    # Stored types are either spelling (database enum name or frontend value), in any case
+    spellings = {normalized_type}
+    spellings.update(
+        db_name.lower() for db_name, frontend in db_to_frontend_mapping.items()
+        if frontend == normalized_type
+    )
+    
     query = db.query(Material).filter(
         Material.product_name.ilike(f"%{product_name}%"),
+        func.lower(Material.material_type).in_(spellings),
         Material.status != "ARCHIVED"  # Don't consider archived materials
     )
     
     if exclude_material_id:
         query = query.filter(Material.id != exclude_material_id)
     
-    existing_materials = query.all()
-    
-    # Filter materials that match the type
-    matching_materials = []
-    for existing in existing_materials:
-        if not existing.material_type:
-            continue
-        
-        # Normalize existing material type
-        existing_type_normalized = existing.material_type.lower()
-        if existing.material_type.upper() in db_to_frontend_mapping:
-            existing_type_normalized = db_to_frontend_mapping[existing.material_type.upper()].lower()
-        
-        # If types match, add to list
-        if existing_type_normalized == normalized_type:
-            matching_materials.append(existing)
-    
-    return matching_materials
+    return query.all()
+
+
+async def _flag_near_duplicates(material: Material, db: Session) -> List[dict]:
+    """
+    Fingerprint a freshly uploaded document, return its near-duplicates and queue it
+    for chunking with the same extracted pages.
+    Never fails the upload; the embedding pipeline fingerprints it later if this fails.
+    """
+    pages = None
+    try:
+        if is_chunkable(material):
+            pages = await extract_pages_from_file(
+                await run_in_threadpool(storage_service.get_file_path, material.file_path), material.file_format
+            )
+            await fingerprint_material(material, db, pages)
+        return find_near_duplicates(db, material.id)
+    except Exception as e:
+        logger.warning(f"Near-duplicate check failed for material {material.id}: {e}")
+        db.rollback()
+        return []
+    finally:
+        if pages:
+            embedding_pipeline.enqueue_extracted(material.id, pages)
+        else:
+            embedding_pipeline.enqueue_chunks([material.id])
 
 
 def _check_existing_material(
@@ -271,35 +301,12 @@ async def get_material(
     
     # Track view event for sales users (only track once per session to avoid spam)
     # This helps track active sessions for the KPI
-    try:
-        from app.models.usage import MaterialUsage, UsageAction
-        # Only track for sales users to measure active sessions
-        if current_user.role == "sales":
-            # Check if we've already tracked a view for this user/material in the last minute
-            # This prevents duplicate tracking from rapid API calls
-            one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
-            recent_view = db.query(MaterialUsage).filter(
-                MaterialUsage.material_id == material_id,
-                MaterialUsage.user_id == current_user.id,
-                MaterialUsage.action == UsageAction.VIEW.value,
-                MaterialUsage.used_at >= one_minute_ago
-            ).first()
-            
-            if not recent_view:
-                usage_event = MaterialUsage(
-                    material_id=material_id,
-                    user_id=current_user.id,
-                    action=UsageAction.VIEW.value,
-                    used_at=datetime.utcnow(),
-                    ip_address=request.client.host if request.client else None,
-                    user_agent=request.headers.get("user-agent")
-                )
-                db.add(usage_event)
-                db.commit()
-    except Exception as e:
-        # Log error but don't fail the request
-        logger.error(f"Failed to track material view: {str(e)}")
-        db.rollback()
+    if current_user.role == "sales":
+        from app.models.usage import UsageAction
+        # At most one view per user/material per minute, to ignore rapid repeat API calls
+        await usage_ingester.record(
+            material_id, current_user.id, UsageAction.VIEW.value, request, dedupe_seconds=60
+        )
     
     # Add PMM information and segment_ids
     material_dict = MaterialResponse.model_validate(material).model_dump()
@@ -312,6 +319,70 @@ async def get_material(
 
     return material_dict
 
+@router.get("/{material_id}/similar")
+async def get_similar_materials(
+    material_id: int,
+    limit: int = Query(default=10, ge=1, le=settings.SIMILAR_MATERIALS_TOP_N),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """More like this: materials closest to this one by stored embedding.
+
+    Served from the precomputed neighbour list (no embedding call); draft and
+    archived materials are left out.
+    """
+    if not db.query(Material.id).filter(Material.id == material_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Material not found"
+        )
+
+    neighbors = get_neighbors(db, material_id, limit)
+    return {
+        "material_id": material_id,
+        "count": len(neighbors),
+        "results": [summary_to_dict(row, score) for row, score in neighbors],
+    }
+
+@router.get("/duplicates/report")
+async def get_duplicate_report(
+    include_archived: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Near-duplicate groups across the whole catalog (admin/pmm/director only).
+    
+    Each group lists its members, the similar pairs that link them, and suggests
+    one material to keep and the rest to archive.
+    """
+    if current_user.role not in ("admin", "pmm", "director") and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin/pmm/director can view the duplicate report"
+        )
+    return duplicate_report(db, include_archived=include_archived)
+
+@router.get("/{material_id}/duplicates")
+async def get_material_duplicates(
+    material_id: int,
+    include_archived: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Near-duplicates of a material by document text (MinHash) or embedding similarity"""
+    if not db.query(Material.id).filter(Material.id == material_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Material not found"
+        )
+    duplicates = find_near_duplicates(db, material_id, include_archived=include_archived)
+    return {
+        "material_id": material_id,
+        "count": len(duplicates),
+        "near_duplicates": duplicates,
+    }
+
 @router.get("/check-duplicate")
 async def check_duplicate_material(
     product_name: str,
@@ -325,14 +396,19 @@ async def check_duplicate_material(
     Check for duplicate materials.
     - Returns blocking=True if exact name match found (should block upload)
     - Returns warning=True if same type but different name (should warn but allow)
+    - With material_id, also lists near-duplicates by document text or embedding
     """
     result = {
         "blocking": False,
         "warning": False,
         "existing_material": None,
-        "existing_materials": []
+        "existing_materials": [],
+        "near_duplicates": []
     }
     
+    if material_id:
+        result["near_duplicates"] = find_near_duplicates(db, material_id)
+    
     # Check for exact name match (blocking)
     if material_name:
         existing_by_name = _check_existing_material_by_name(db, product_name, material_name, material_id)
@@ -527,6 +603,7 @@ async def create_material(
         db.add(material)
         db.commit()
         db.refresh(material)
+        embedding_coverage.mark_created(material.id)
 
         # Link GTM materials to segments
         if is_gtm and segment_ids:
@@ -537,12 +614,8 @@ async def create_material(
             db.commit()
             db.refresh(material)
 
-        # Generate embedding in background (non-blocking)
-        try:
-            from app.api.embeddings import _generate_embedding_for_material
-            asyncio.ensure_future(_generate_embedding_for_material(material, db))
-        except Exception:
-            pass
+        # Embed in the background worker (non-blocking)
+        embedding_pipeline.enqueue_if_changed(material)
         
         # Return material (as dict with segment_ids for consistency)
         from app.schemas.material import MaterialResponse
@@ -744,17 +817,11 @@ async def update_material(
                     material.segments.append(seg)
 
         material.updated_at = datetime.utcnow()
-        # Clear embedding so it gets regenerated
-        material.embedding = None
         db.commit()
         db.refresh(material)
         
-        # Regenerate embedding in background
-        try:
-            from app.api.embeddings import _generate_embedding_for_material
-            asyncio.ensure_future(_generate_embedding_for_material(material, db))
-        except Exception:
-            pass
+        # Re-embed in the background only if the embedded text changed
+        embedding_pipeline.enqueue_if_changed(material)
         
         # Add PMM information and segment_ids to response
         material_dict = MaterialResponse.model_validate(material).model_dump()
@@ -809,16 +876,21 @@ async def delete_material(
         )
     
     try:
-        # Delete file if exists
+        # Release the file (blobs are deleted with their last reference)
+        released_blob = None
         if material.file_path:
             from app.services.storage import storage_service
             try:
-                storage_service.delete_file(material.file_path)
+                released_blob = storage_service.release_file(db, material.file_path)
             except Exception:
                 pass  # Continue even if file deletion fails
         
+        invalidate_neighbors(db, [material_id])
         db.delete(material)
         db.commit()
+        await run_in_threadpool(storage_service.purge_blob, db, released_blob)
+        embedding_coverage.mark_deleted(material_id)
+        in_memory_vector_index.remove(material_id)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except Exception as e:
         db.rollback()
@@ -827,7 +899,7 @@ async def delete_material(
             detail=f"Failed to delete material: {str(e)}"
         )
 
-@router.post("/upload", response_model=MaterialResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=MaterialUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_material_file(
     file: UploadFile = File(...),
     material_type: str = Form(...),
@@ -848,6 +920,58 @@ async def upload_material_file(
     current_user: User = Depends(get_current_active_user)
 ):
     """Upload a new material file"""
+    from app.core.constants import MAX_FILE_SIZE
+
+    return await _create_uploaded_material(
+        file.filename,
+        lambda: storage_service.receive_upload(file, MAX_FILE_SIZE),
+        material_type=material_type,
+        audience=audience,
+        universe_id=universe_id,
+        category_id=category_id,
+        product_id=product_id,
+        product_name=product_name,
+        universe_name=universe_name,
+        segment_ids=segment_ids,
+        other_type_description=other_type_description,
+        freshness_date=freshness_date,
+        pmm_in_charge_id=pmm_in_charge_id,
+        replace_existing=replace_existing,
+        send_notification=send_notification,
+        initial_status=status,
+        db=db,
+        current_user=current_user,
+    )
+
+async def _create_uploaded_material(
+    file_name: str,
+    receive: Callable[[], Awaitable[PendingUpload]],
+    material_type: str,
+    audience: str,
+    universe_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    product_name: Optional[str] = None,
+    universe_name: Optional[str] = None,
+    segment_ids: Optional[str] = None,
+    other_type_description: Optional[str] = None,
+    freshness_date: Optional[str] = None,
+    pmm_in_charge_id: Optional[int] = None,
+    replace_existing: str = "false",
+    send_notification: Optional[str] = "false",
+    initial_status: Optional[str] = "draft",
+    *,
+    db: Session,
+    current_user: User,
+) -> dict:
+    """
+    Validate upload metadata, store the file and create its material.
+    
+    `receive()` writes the file to a temp file in the staging folder (a
+    streamed request body or an assembled resumable upload) and is called
+    after the file type is validated; the temp file is stored as a blob once
+    the duplicate checks pass and removed otherwise.
+    """
     from app.services.storage import storage_service
     from app.models.product import Universe, Product
     from app.models.segment import Segment
@@ -933,27 +1057,27 @@ async def upload_material_file(
                     detail="Product does not belong to selected category"
                 )
     
+    pending_upload = None
     try:
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        # Validate file size (60GB limit)
+        # Validate file type before any bytes are copied
         from app.core.constants import MAX_FILE_SIZE, ALLOWED_FILE_EXTENSIONS
-        if file_size > MAX_FILE_SIZE:
-            max_size_gb = MAX_FILE_SIZE / (1024 * 1024 * 1024)
+        file_ext = '.' + file_name.split('.')[-1].lower() if '.' in file_name else ''
+        if file_ext not in ALLOWED_FILE_EXTENSIONS:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File size exceeds maximum allowed size of {max_size_gb:.0f}GB"
+                detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_FILE_EXTENSIONS)}"
             )
         
-        # Validate file type
-        file_ext = '.' + file.filename.split('.')[-1].lower() if '.' in file.filename else ''
-        if file_ext not in ALLOWED_FILE_EXTENSIONS:
+        # Write the file to a staging temp file (60GB limit enforced while copying)
+        try:
+            pending_upload = await receive()
+        except FileTooLargeError:
+            max_size_gb = MAX_FILE_SIZE / (1024 * 1024 * 1024)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_FILE_EXTENSIONS)}"
+                detail=f"File size exceeds maximum allowed size of {max_size_gb:.0f}GB"
             )
+        file_size = pending_upload.size
         
         # Map frontend values to database enum names
         material_type_mapping = {
@@ -1015,13 +1139,13 @@ async def upload_material_file(
         logger = logging.getLogger(__name__)
         
         # Check for exact name match (this should block)
-        existing_by_name = _check_existing_material_by_name(db, final_product_name, file.filename)
+        existing_by_name = _check_existing_material_by_name(db, final_product_name, file_name)
         if existing_by_name:
-            logger.info(f"[UPLOAD] Exact duplicate name found: {file.filename}")
+            logger.info(f"[UPLOAD] Exact duplicate name found: {file_name}")
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail={
-                    "message": f"A material with the name '{file.filename}' already exists for this product",
+                    "message": f"A material with the name '{file_name}' already exists for this product",
                     "blocking": True,
                     "existing_material": {
                         "id": existing_by_name.id,
@@ -1053,20 +1177,8 @@ async def upload_material_file(
             db.commit()  # Commit the archive before creating new material
             logger.info(f"[UPLOAD] Archived {len(existing_by_type)} existing material(s)")
         
-        # Get folder path
-        folder_path = storage_service.get_folder_path(
-            material_type=material_type,
-            audience=audience,
-            product_name=final_product_name,
-            universe_name=final_universe_name
-        )
-        
-        # Save file
-        relative_path = storage_service.save_file(
-            file_content=file_content,
-            file_name=file.filename,
-            folder_path=folder_path
-        )
+        # Store the received file (deduplicated by content)
+        relative_path = await run_in_threadpool(storage_service.commit_upload, db, pending_upload)
         
         # Parse freshness_date if provided, otherwise use current date
         last_updated_date = datetime.utcnow()
@@ -1101,20 +1213,21 @@ async def upload_material_file(
             'published': 'PUBLISHED',
             'archived': 'ARCHIVED',
         }
-        db_status = status_mapping.get(status.lower() if status else 'draft', 'DRAFT')
+        db_status = status_mapping.get(initial_status.lower() if initial_status else 'draft', 'DRAFT')
         
         # Create material record (columns are String type, not enum, so no casting needed)
         material = Material(
-            name=file.filename,
+            name=file_name,
             material_type=db_material_type,
             other_type_description=final_other_type_description,
             audience=db_audience,
             product_name=final_product_name,
             universe_name=final_universe_name,
             file_path=relative_path,
-            file_name=file.filename,
-            file_format=file.filename.split('.')[-1] if '.' in file.filename else None,
+            file_name=file_name,
+            file_format=file_name.split('.')[-1] if '.' in file_name else None,
             file_size=file_size,
+            file_sha256=pending_upload.sha256,
             owner_id=current_user.id,
             pmm_in_charge_id=final_pmm_in_charge_id,
             status=db_status,
@@ -1123,6 +1236,8 @@ async def upload_material_file(
         db.add(material)
         db.commit()
         db.refresh(material)
+        embedding_coverage.mark_created(material.id)
+        embedding_pipeline.enqueue_if_changed(material)
 
         if is_gtm and parsed_segment_ids:
             for seg_id in parsed_segment_ids:
@@ -1136,7 +1251,7 @@ async def upload_material_file(
         if material.file_format and str(material.file_format).lower() == "pdf":
             try:
                 from app.services.thumbnail_service import ensure_thumbnail
-                full_path = storage_service.get_file_path(material.file_path)
+                full_path = await run_in_threadpool(storage_service.get_file_path, material.file_path)
                 ensure_thumbnail(material.id, full_path, material.file_format)
             except Exception as te:
                 logger.debug(f"Thumbnail generation deferred: {te}")
@@ -1159,6 +1274,8 @@ async def upload_material_file(
                 if isinstance(material_dict[date_field], datetime):
                     material_dict[date_field] = material_dict[date_field].isoformat() + 'Z'
         
+        material_dict["near_duplicates"] = await _flag_near_duplicates(material, db)
+
         # Add warning if applicable
         if warning_message:
             material_dict["warning"] = warning_message
@@ -1226,12 +1343,140 @@ async def upload_material_file(
     except Exception as e:
         db.rollback()
         import traceback
-        logger.error(f"Error uploading file {file.filename if 'file' in locals() else 'unknown'}: {str(e)}", exc_info=True)
+        logger.error(f"Error uploading file {file_name}: {str(e)}", exc_info=True)
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to upload file: {str(e)}"
         )
+    finally:
+        # Removes the temp file unless it was stored
+        storage_service.discard_upload(pending_upload)
+
+
+def _get_upload_session(session_id: str, current_user: User) -> dict:
+    session = upload_sessions.get(session_id)
+    if not session or session["owner_id"] != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+    return session
+
+@router.post("/upload/sessions", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    payload: UploadSessionCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Start a resumable upload. PUT the file's bytes to .../chunks?offset=N in
+    chunks of any size up to UPLOAD_MAX_CHUNK_SIZE (in any order, in parallel),
+    then POST .../complete to create the material with this metadata.
+    """
+    from app.core.constants import MAX_FILE_SIZE, ALLOWED_FILE_EXTENSIONS
+
+    file_ext = Path(payload.file_name).suffix.lower()
+    if file_ext not in ALLOWED_FILE_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_FILE_EXTENSIONS)}"
+        )
+    if payload.total_size > MAX_FILE_SIZE:
+        max_size_gb = MAX_FILE_SIZE / (1024 * 1024 * 1024)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File size exceeds maximum allowed size of {max_size_gb:.0f}GB"
+        )
+    metadata = payload.model_dump(exclude={"file_name", "total_size", "sha256"})
+    session = await run_in_threadpool(
+        upload_sessions.create,
+        current_user.id, payload.file_name, payload.total_size, metadata, payload.sha256,
+    )
+    return upload_sessions.progress(session)
+
+@router.get("/upload/sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Progress of a resumable upload; resume by sending the missing ranges"""
+    session = _get_upload_session(session_id, current_user)
+    return upload_sessions.progress(session)
+
+@router.put("/upload/sessions/{session_id}/chunks")
+async def upload_session_chunk(
+    session_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Byte offset of this chunk in the file"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Store the raw request body at `offset`. Retrying a chunk overwrites it."""
+    session = _get_upload_session(session_id, current_user)
+    try:
+        written = await upload_sessions.write_chunk(session, offset, request.stream())
+    except UploadSessionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"session_id": session_id, "offset": offset, "length": written}
+
+@router.post(
+    "/upload/sessions/{session_id}/complete",
+    response_model=MaterialUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def complete_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Assemble a fully received upload and create its material, as POST /upload does"""
+    session = _get_upload_session(session_id, current_user)
+    try:
+        upload_sessions.begin_complete(session)
+    except UploadSessionBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    async def receive() -> PendingUpload:
+        try:
+            return await upload_sessions.assemble(session, storage_service.staging_path)
+        except UploadSessionError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    metadata = session["metadata"]
+    segment_ids = metadata.get("segment_ids")
+    try:
+        result = await _create_uploaded_material(
+            session["file_name"],
+            receive,
+            material_type=metadata["material_type"],
+            audience=metadata["audience"],
+            universe_id=metadata.get("universe_id"),
+            category_id=metadata.get("category_id"),
+            product_id=metadata.get("product_id"),
+            product_name=metadata.get("product_name"),
+            universe_name=metadata.get("universe_name"),
+            segment_ids=json.dumps(segment_ids) if segment_ids else None,
+            other_type_description=metadata.get("other_type_description"),
+            freshness_date=metadata.get("freshness_date"),
+            pmm_in_charge_id=metadata.get("pmm_in_charge_id"),
+            replace_existing=str(metadata.get("replace_existing", False)).lower(),
+            send_notification=str(metadata.get("send_notification", False)).lower(),
+            initial_status=metadata.get("status"),
+            db=db,
+            current_user=current_user,
+        )
+    except Exception:
+        # Keep the received bytes so the client can fix the problem and retry
+        upload_sessions.end_complete(session)
+        raise
+    await run_in_threadpool(upload_sessions.delete, session_id)
+    return result
+
+@router.delete("/upload/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Abandon a resumable upload and free its disk space"""
+    _get_upload_session(session_id, current_user)
+    await run_in_threadpool(upload_sessions.delete, session_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.get("/{material_id}/thumbnail")
 async def get_material_thumbnail(
@@ -1243,7 +1488,6 @@ async def get_material_thumbnail(
     Get pre-generated thumbnail (small PNG) for fast loading.
     For PDFs: first page extracted once and cached. Returns 404 for non-PDF or if not yet generated.
     """
-    from fastapi.responses import FileResponse
     from app.services.thumbnail_service import ensure_thumbnail, get_thumbnail_path
 
     material = db.query(Material).filter(Material.id == material_id).first()
@@ -1253,7 +1497,7 @@ async def get_material_thumbnail(
     if not material.file_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not available")
 
-    file_path = storage_service.get_file_path(material.file_path)
+    file_path = await run_in_threadpool(storage_service.get_file_path, material.file_path)
     if not file_path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
 
@@ -1263,22 +1507,17 @@ async def get_material_thumbnail(
     if not thumb_path or not thumb_path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Thumbnail not available")
 
-    return FileResponse(
-        path=str(thumb_path),
-        media_type="image/png",
-        headers={"Cache-Control": "public, max-age=86400"},
-    )
+    return send_file(thumb_path, "image/png", {"Cache-Control": "public, max-age=86400"})
 
 
 @router.get("/{material_id}/view")
 async def view_material_file(
     material_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """View a material file (e.g. for thumbnails). Returns file without download tracking."""
-    from fastapi.responses import FileResponse
-
     material = db.query(Material).filter(Material.id == material_id).first()
     if not material:
         raise HTTPException(
@@ -1292,34 +1531,7 @@ async def view_material_file(
             detail="File not available for this material"
         )
 
-    file_path = storage_service.get_file_path(material.file_path)
-    if not file_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on server"
-        )
-
-    file_format = material.file_format or (material.file_name.split('.')[-1] if material.file_name else '')
-    media_type_map = {
-        'pdf': 'application/pdf',
-        'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-        'ppt': 'application/vnd.ms-powerpoint',
-        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'doc': 'application/msword',
-        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        'xls': 'application/vnd.ms-excel',
-        'mp4': 'video/mp4', 'webm': 'video/webm', 'mov': 'video/quicktime',
-        'avi': 'video/x-msvideo', 'mkv': 'video/x-matroska',
-    }
-    media_type = media_type_map.get(file_format.lower(), 'application/octet-stream')
-    filename = material.file_name or (f"{material.name}.{file_format}" if material.file_format else material.name)
-
-    return FileResponse(
-        path=str(file_path),
-        filename=filename,
-        media_type=media_type,
-        headers={"Content-Disposition": f'inline; filename="{filename}"'},
-    )
+    return await serve_material_file(request, material, inline=True)
 
 
 @router.get("/{material_id}/download")
@@ -1330,10 +1542,7 @@ async def download_material_file(
     current_user: User = Depends(get_current_active_user)
 ):
     """Download a material file and track usage"""
-    from fastapi.responses import FileResponse
-    from app.services.storage import storage_service
-    from app.models.usage import MaterialUsage, UsageAction
-    from pathlib import Path
+    from app.models.usage import UsageAction
     
     material = db.query(Material).filter(Material.id == material_id).first()
     if not material:
@@ -1348,66 +1557,11 @@ async def download_material_file(
             detail="File not available for this material"
         )
     
-    # Track usage
-    try:
-        usage_event = MaterialUsage(
-            material_id=material_id,
-            user_id=current_user.id,
-            action=UsageAction.DOWNLOAD.value,
-            used_at=datetime.utcnow(),
-            ip_address=request.client.host if request.client else None,
-            user_agent=request.headers.get("user-agent")
-        )
-        db.add(usage_event)
-        
-        # Increment usage count
-        material.usage_count = (material.usage_count or 0) + 1
-        material.last_updated = datetime.utcnow()
-        
-        db.commit()
-    except Exception as e:
-        # Log error but don't fail the download
-        import logging
-        logging.error(f"Failed to track usage: {str(e)}")
-        db.rollback()
-    
-    file_path = storage_service.get_file_path(material.file_path)
-    if not file_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on server"
-        )
-    
-    # Determine media type based on file format
-    file_format = material.file_format or (material.file_name.split('.')[-1] if '.' in material.file_name else '')
-    media_type_map = {
-        'pdf': 'application/pdf',
-        'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-        'ppt': 'application/vnd.ms-powerpoint',
-        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'doc': 'application/msword',
-        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        'xls': 'application/vnd.ms-excel',
-        'mp4': 'video/mp4', 'webm': 'video/webm', 'mov': 'video/quicktime',
-        'avi': 'video/x-msvideo', 'mkv': 'video/x-matroska',
-    }
-    media_type = media_type_map.get(file_format.lower(), 'application/octet-stream')
-    
-    # Use original file_name to preserve extension, or construct from name + format
-    if material.file_name:
-        filename = material.file_name
-    elif material.file_format:
-        # Construct filename with proper extension
-        base_name = material.name.rsplit('.', 1)[0] if '.' in material.name else material.name
-        filename = f"{base_name}.{material.file_format}"
-    else:
-        filename = material.name
+    # Track usage (written in the background by the usage ingester)
+    await usage_ingester.record(material_id, current_user.id, UsageAction.DOWNLOAD.value, request)
+    usage_ingester.increment("materials", material_id, "usage_count", last_updated=datetime.utcnow())
     
-    return FileResponse(
-        path=str(file_path),
-        filename=filename,
-        media_type=media_type
-    )
+    return await serve_material_file(request, material, inline=False)
 
 
 @router.post("/{material_id}/track-action")
@@ -1419,7 +1573,6 @@ async def track_material_action(
     current_user: User = Depends(get_current_active_user)
 ):
     """Track a material action (view, browse, search, etc.) for usage analytics"""
-    from app.models.usage import MaterialUsage, UsageAction
     
     material = db.query(Material).filter(Material.id == material_id).first()
     if not material:
@@ -1438,32 +1591,10 @@ async def track_material_action(
     
     # Only track for sales users to measure active sessions
     if current_user.role == "sales":
-        # Prevent duplicate tracking: check if same action was tracked in last 5 minutes
-        five_minutes_ago = datetime.utcnow() - timedelta(minutes=5)
-        recent_action = db.query(MaterialUsage).filter(
-            MaterialUsage.material_id == material_id,
-            MaterialUsage.user_id == current_user.id,
-            MaterialUsage.action == action,
-            MaterialUsage.used_at >= five_minutes_ago
-        ).first()
-        
-        if not recent_action:
-            try:
-                usage_event = MaterialUsage(
-                    material_id=material_id,
-                    user_id=current_user.id,
-                    action=action,
-                    used_at=datetime.utcnow(),
-                    ip_address=request.client.host if request.client else None,
-                    user_agent=request.headers.get("user-agent")
-                )
-                db.add(usage_event)
-                db.commit()
-                return {"status": "tracked", "action": action, "material_id": material_id}
-            except Exception as e:
-                logger.error(f"Failed to track material action: {str(e)}")
-                db.rollback()
-                return {"status": "error", "message": str(e)}
+        # Prevent duplicate tracking: same action at most once per 5 minutes
+        if await usage_ingester.record(material_id, current_user.id, action, request, dedupe_seconds=300):
+            return {"status": "tracked", "action": action, "material_id": material_id}
+        return {"status": "skipped", "reason": "recently_tracked"}
     
     return {"status": "skipped", "reason": "not_sales_user"}
 
@@ -1519,7 +1650,7 @@ async def get_executive_summary(
         logger.info(f"[STEP 2/4] Starting text extraction for material {material_id}")
         
         # Get file path
-        file_path = storage_service.get_file_path(material.file_path)
+        file_path = await run_in_threadpool(storage_service.get_file_path, material.file_path)
         if not file_path.exists():
             print(f"[ERROR] File not found: {file_path}", flush=True)
             raise HTTPException(
@@ -1572,6 +1703,7 @@ async def get_executive_summary(
         material.executive_summary_generated_at = datetime.utcnow()
         db.commit()
         db.refresh(material)
+        embedding_pipeline.enqueue_if_changed(material)
         
         print(f"[SUCCESS] Summary saved and returned for material {material_id}", flush=True)
         logger.info(f"[SUCCESS] Summary saved and returned for material {material_id}")
@@ -1729,22 +1861,8 @@ async def batch_upload_materials(
                     final_product_name = suggestion.get('product_name') or product.display_name or product.name
                     final_universe_name = suggestion.get('universe_name') or universe.name or universe.display_name
                 
-                # Read file content
-                file_content = await file.read()
-                file_size = len(file_content)
-                
-                # Validate file size (60GB limit)
+                # Validate file type (the size limit is enforced while the file is streamed to disk)
                 from app.core.constants import MAX_FILE_SIZE, ALLOWED_FILE_EXTENSIONS
-                if file_size > MAX_FILE_SIZE:
-                    max_size_gb = MAX_FILE_SIZE / (1024 * 1024 * 1024)
-                    results["failure_count"] += 1
-                    results["failures"].append({
-                        "filename": file.filename,
-                        "error": f"File size exceeds maximum allowed size of {max_size_gb:.0f}GB"
-                    })
-                    continue
-                
-                # Validate file type
                 file_ext = '.' + file.filename.split('.')[-1].lower() if '.' in file.filename else ''
                 if file_ext not in ALLOWED_FILE_EXTENSIONS:
                     results["failure_count"] += 1
@@ -1819,20 +1937,19 @@ async def batch_upload_materials(
                     })
                     continue
                 
-                # Get folder path
-                folder_path = storage_service.get_folder_path(
-                    material_type=material_type,
-                    audience=audience,
-                    product_name=final_product_name,
-                    universe_name=final_universe_name
-                )
-                
-                # Save file
-                relative_path = storage_service.save_file(
-                    file_content=file_content,
-                    file_name=file.filename,
-                    folder_path=folder_path
-                )
+                # Stream the file to disk, then store it as a blob
+                try:
+                    pending_upload = await storage_service.receive_upload(file, MAX_FILE_SIZE)
+                except FileTooLargeError:
+                    max_size_gb = MAX_FILE_SIZE / (1024 * 1024 * 1024)
+                    results["failure_count"] += 1
+                    results["failures"].append({
+                        "filename": file.filename,
+                        "error": f"File size exceeds maximum allowed size of {max_size_gb:.0f}GB"
+                    })
+                    continue
+                file_size = pending_upload.size
+                relative_path = await run_in_threadpool(storage_service.commit_upload, db, pending_upload)
                 
                 # Parse freshness_date if provided
                 freshness_date = suggestion.get('freshness_date')
@@ -1867,6 +1984,7 @@ async def batch_upload_materials(
                     file_name=file.filename,
                     file_format=file.filename.split('.')[-1] if '.' in file.filename else None,
                     file_size=file_size,
+                    file_sha256=pending_upload.sha256,
                     owner_id=current_user.id,
                     pmm_in_charge_id=final_pmm_in_charge_id,
                     status="DRAFT",
@@ -1875,6 +1993,8 @@ async def batch_upload_materials(
                 db.add(material)
                 db.commit()
                 db.refresh(material)
+                embedding_coverage.mark_created(material.id)
+                embedding_pipeline.enqueue_if_changed(material)
 
                 if is_gtm and segment_ids:
                     for seg_id in segment_ids:
@@ -1884,11 +2004,14 @@ async def batch_upload_materials(
                     db.commit()
                     db.refresh(material)
 
+                near_duplicates = await _flag_near_duplicates(material, db)
+
                 results["success_count"] += 1
                 results["successes"].append({
                     "filename": file.filename,
                     "material_id": material.id,
-                    "material_name": material.name
+                    "material_name": material.name,
+                    "near_duplicates": near_duplicates
                 })
                 
             except HTTPException:
@@ -11,6 +11,7 @@ from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.models.user import User
 from app.models.product import Universe, Category, Product
+from app.services.trigram_search import trigram_match
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/products", tags=["products"])
@@ -554,10 +555,8 @@ async def get_product_icon(
     normalized_variations = list(set([v for v in normalized_variations if v]))
     
     # Try to find product in database
-    products = db.query(Product).filter(
-        (Product.name.ilike(f"%{product_name}%")) |
-        (Product.display_name.ilike(f"%{product_name}%"))
-    ).all()
+    match = trigram_match(db, product_name, (Product.name, Product.display_name))
+    products = db.query(Product).filter(match.condition).order_by(match.score.desc()).all()
     
     # Base icon directory
     base_icon_dir = Path("/app/icons/products")
@@ -1,80 +1,441 @@
 """
-Semantic search API – vector similarity search with pgvector, full-text fallback.
+Semantic search API – vector similarity search with pgvector, full-text fallback,
+and an optional hybrid mode fusing both with reciprocal-rank fusion.
+Passage (chunk) matches from uploaded documents are folded into material
+scores and exposed directly by /api/search/passages. /api/search/semantic/batch
+answers several queries with one embedding call and one SQL query.
 """
+import asyncio
 import logging
-from typing import Optional, List
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from sqlalchemy import text, or_
+from sqlalchemy import text
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.vector_codec import Vector
 from app.core.security import get_current_active_user
 from app.models.user import User
 from app.models.material import Material, MaterialStatus
-from app.services.embedding_service import embed_text
+from app.services.embedding_service import embed_queries, embed_query, normalize_query
+from app.services.embedding_coverage import embedding_coverage
+from app.services.vector_index import ann_expression, ann_search_sql, apply_search_tuning
+from app.services.in_memory_vector_index import in_memory_vector_index
+from app.services.hybrid_search import reciprocal_rank_fusion
+from app.services.material_chunks import (
+    ChunkHit,
+    aggregate_by_material,
+    chunk_coverage,
+    passage_dict,
+    search_chunks,
+)
+from app.services.material_summary import SUMMARY_COLUMNS, SUMMARY_FIELDS, load_summaries, summary_to_dict
+from app.services.search_cache import catalog_version, etag_matches, search_result_cache
+from app.services.trigram_search import trigram_match
+
+# Hybrid mode retrieves this many candidates per signal for each requested result
+HYBRID_CANDIDATE_MULTIPLIER = 4
+HYBRID_MAX_CANDIDATES = 100
+# Passages retrieved per requested material, before max-pooling per material
+PASSAGES_PER_RESULT = 5
+MAX_BATCH_QUERIES = 20
+
+_KEYWORD_COLUMNS = (
+    Material.name,
+    Material.description,
+    Material.product_name,
+    Material.tags,
+    Material.keywords,
+    Material.use_cases,
+    Material.pain_points,
+    Material.executive_summary,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/search", tags=["search"])
 
 
-def _material_to_dict(m, score: float = 0.0) -> dict:
-    return {
-        "id": m.id,
-        "name": m.name,
-        "material_type": m.material_type,
-        "audience": m.audience,
-        "product_name": m.product_name,
-        "universe_name": m.universe_name,
-        "description": m.description,
-        "status": m.status.value if m.status else None,
-        "file_format": m.file_format,
-        "file_size": m.file_size,
-        "tags": m.tags,
-        "keywords": m.keywords,
-        "use_cases": m.use_cases,
-        "pain_points": m.pain_points,
-        "usage_count": m.usage_count,
-        "owner_id": m.owner_id,
-        "created_at": m.created_at.isoformat() if m.created_at else None,
-        "updated_at": m.updated_at.isoformat() if m.updated_at else None,
-        "similarity_score": round(score, 4),
-    }
-
-
 @router.get("/semantic")
 async def semantic_search(
+    response: Response,
     q: str = Query(..., min_length=1, description="Natural language search query"),
     limit: int = Query(default=10, ge=1, le=50),
     universe: Optional[str] = None,
     product: Optional[str] = None,
     material_type: Optional[str] = None,
     status: Optional[str] = None,
+    mode: str = Query(default="auto", pattern="^(auto|hybrid)$", description="'auto' (vector, then full-text) or 'hybrid' (vector + full-text fused with RRF)"),
+    ef_search: Optional[int] = Query(default=None, ge=1, le=1000, description="Override hnsw.ef_search for this query"),
+    probes: Optional[int] = Query(default=None, ge=1, le=1000, description="Override ivfflat.probes for this query"),
+    if_none_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
     Semantic search over materials using vector similarity.
-    Falls back to full-text search if embeddings are not available.
-    """
-    embedded_count = db.execute(
-        text("SELECT count(*) FROM materials WHERE embedding_vec IS NOT NULL")
-    ).scalar()
+    Uses the in-process NumPy index when pgvector is not installed, and falls
+    back to full-text search if no embeddings are available at all.
+    With mode=hybrid, vector and full-text candidates are retrieved concurrently
+    and fused with reciprocal-rank fusion; each result carries per-signal scores.
 
-    if embedded_count and embedded_count > 0:
-        results = await _vector_search(q, limit, universe, product, material_type, status, db)
+    Responses are cached per (normalized query, filters, mode, catalog version)
+    and carry an ETag; a matching If-None-Match is answered with 304.
+    """
+    filters = SearchFilters(universe, product, material_type, status)
+    cache_key = (
+        normalize_query(q), filters, mode, limit, ef_search, probes, catalog_version.current(db),
+    )
+    cached = search_result_cache.get(cache_key)
+    if cached is not None:
+        etag, payload = cached
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=_cache_headers(etag))
+        response.headers.update(_cache_headers(etag))
+        return {**payload, "query": q}
+
+    vectors_available = _vectors_available(db)
+
+    if mode == "hybrid":
+        results = await _hybrid_search(
+            q, limit, filters, db, use_vectors=vectors_available,
+            ef_search=ef_search, probes=probes,
+        )
+        search_mode = "hybrid" if vectors_available else "fulltext"
+    elif vectors_available:
+        results = await _vector_search(
+            q, limit, universe, product, material_type, status, db,
+            ef_search=ef_search, probes=probes,
+        )
         search_mode = "semantic"
     else:
         results = _fulltext_search(q, limit, universe, product, material_type, status, db)
         search_mode = "fulltext"
 
-    return {
+    payload = {
         "query": q,
         "mode": search_mode,
         "count": len(results),
         "results": results,
     }
+    etag = search_result_cache.put(cache_key, payload)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
+    return payload
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    # Private: results are only served to authenticated users; no-cache forces revalidation
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+class BatchSearchQuery(BaseModel):
+    q: str = Field(..., min_length=1, max_length=1000)
+    limit: int = Field(default=10, ge=1, le=50)
+    universe: Optional[str] = None
+    product: Optional[str] = None
+    material_type: Optional[str] = None
+    status: Optional[str] = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchSearchQuery] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+
+
+@router.post("/semantic/batch")
+async def semantic_search_batch(
+    body: BatchSearchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Run several semantic searches at once.
+    Uncached queries are embedded in one embed_texts call and, with pgvector,
+    all queries run as one LATERAL-join SQL statement that also returns the
+    summary columns. Queries without vector hits fall back to full-text search
+    individually. Passage matches are not merged here; use /semantic for those.
+    Per-stage timings (ms) are returned for profiling.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    queries = body.queries
+    rows_per_query: List[list] = [[] for _ in queries]
+    embedded = 0
+
+    stage = time.perf_counter()
+    vectors_available = _vectors_available(db)
+    vecs = None
+    if vectors_available:
+        try:
+            vecs, embedded = await embed_queries([bq.q for bq in queries])
+        except Exception as e:
+            logger.error("Failed to embed batch queries, falling back to fulltext: %s", e)
+    timings["embed_ms"] = _ms_since(stage)
+
+    stage = time.perf_counter()
+    if vecs is not None:
+        if embedding_coverage.vector_available:
+            rows_per_query = _batch_vector_rows(queries, vecs, db)
+        else:
+            rows_per_query = _batch_in_memory_rows(queries, vecs, db)
+    timings["vector_search_ms"] = _ms_since(stage)
+
+    stage = time.perf_counter()
+    results = []
+    for bq, rows in zip(queries, rows_per_query):
+        if rows:
+            hits = [summary_to_dict(r, score) for r, score in rows]
+            mode = "semantic"
+        else:
+            hits = _fulltext_search(bq.q, bq.limit, bq.universe, bq.product, bq.material_type, bq.status, db)
+            mode = "fulltext"
+        results.append({"query": bq.q, "mode": mode, "count": len(hits), "results": hits})
+    timings["fallback_and_serialize_ms"] = _ms_since(stage)
+    timings["total_ms"] = _ms_since(started)
+
+    return {
+        "count": len(results),
+        "embedded_queries": embedded,
+        "results": results,
+        "timings_ms": timings,
+    }
+
+
+def _ms_since(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _batch_vector_rows(
+    queries: Sequence[BatchSearchQuery],
+    vecs: Sequence[List[float]],
+    db: Session,
+) -> List[list]:
+    """(summary row, similarity) top-k for every query in one statement, grouped per query."""
+    values = []
+    params: Dict[str, Any] = {}
+    for i, (bq, vec) in enumerate(zip(queries, vecs)):
+        values.append(
+            f"({i}, CAST(:qvec_{i} AS vector), CAST(:lim_{i} AS integer), CAST(:universe_{i} AS text), "
+            f"CAST(:product_{i} AS text), CAST(:mtype_{i} AS text), CAST(:status_{i} AS text))"
+        )
+        params.update({
+            f"qvec_{i}": Vector(vec),
+            f"lim_{i}": bq.limit,
+            f"universe_{i}": f"%{bq.universe}%" if bq.universe else None,
+            f"product_{i}": f"%{bq.product}%" if bq.product else None,
+            f"mtype_{i}": f"%{bq.material_type}%" if bq.material_type else None,
+            f"status_{i}": bq.status or None,
+        })
+
+    # Same semantics as SearchFilters.sql(), driven by each query's row
+    where_clauses = [
+        "(q.q_universe IS NULL OR universe_name ILIKE q.q_universe)",
+        "(q.q_product IS NULL OR product_name ILIKE q.q_product)",
+        "(q.q_mtype IS NULL OR material_type ILIKE q.q_mtype)",
+        "(CAST(status AS text) = q.q_status OR (q.q_status IS NULL AND status NOT IN ('draft', 'archived')))",
+    ]
+    inner, _ = ann_search_sql(
+        SUMMARY_FIELDS, "materials", where_clauses, 0, query_vector="q.qvec", limit_sql="q.lim",
+    )
+    sql = f"""
+        SELECT q.idx, hit.*
+        FROM (VALUES {", ".join(values)}) AS q(idx, qvec, lim, q_universe, q_product, q_mtype, q_status)
+        CROSS JOIN LATERAL ({inner}) hit
+        ORDER BY q.idx, hit.similarity DESC
+    """
+
+    max_limit = max(bq.limit for bq in queries)
+    factor = settings.EMBEDDING_RESCORE_FACTOR if ann_expression().compressed else 1
+    apply_search_tuning(db, candidates=max_limit * factor)
+    grouped: List[list] = [[] for _ in queries]
+    for row in db.execute(text(sql), params).fetchall():
+        grouped[row.idx].append((row, float(row.similarity)))
+    return grouped
+
+
+def _batch_in_memory_rows(
+    queries: Sequence[BatchSearchQuery],
+    vecs: Sequence[List[float]],
+    db: Session,
+) -> List[list]:
+    """(summary row, similarity) from the in-process index, hydrated with one summary query."""
+    hits = [
+        in_memory_vector_index.search(vec, bq.limit, bq.universe, bq.product, bq.material_type, bq.status)
+        for bq, vec in zip(queries, vecs)
+    ]
+    summaries = load_summaries(db, {mid for query_hits in hits for mid, _ in query_hits})
+    return [
+        [(summaries[mid], score) for mid, score in query_hits if mid in summaries]
+        for query_hits in hits
+    ]
+
+
+@router.get("/passages")
+async def passage_search(
+    q: str = Query(..., min_length=1, description="Natural language search query"),
+    limit: int = Query(default=10, ge=1, le=50),
+    material_id: Optional[int] = Query(default=None, description="Only search passages of this material"),
+    universe: Optional[str] = None,
+    product: Optional[str] = None,
+    material_type: Optional[str] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Passage-level search: the best-matching pages / slides of uploaded documents.
+    Each result names its material and the location of the passage within it.
+    """
+    if not chunk_coverage.has_chunks(db):
+        raise HTTPException(status_code=503, detail="No document passages have been indexed yet")
+    try:
+        query_vec = await embed_query(q)
+    except Exception as e:
+        logger.error("Failed to embed passage query: %s", e)
+        raise HTTPException(status_code=503, detail="Embedding service unavailable")
+
+    filters = SearchFilters(universe, product, material_type, status)
+    hits = search_chunks(db, query_vec, limit, filters, material_id=material_id)
+    names = dict(
+        db.query(Material.id, Material.name)
+        .filter(Material.id.in_({h.material_id for h in hits}))
+        .all()
+    ) if hits else {}
+
+    return {
+        "query": q,
+        "count": len(hits),
+        "results": [
+            {"material_id": h.material_id, "material_name": names.get(h.material_id), **passage_dict(h)}
+            for h in hits
+        ],
+    }
+
+
+def _vectors_available(db: Session) -> bool:
+    if embedding_coverage.has_vectors(db):
+        return True
+    return not embedding_coverage.vector_available and in_memory_vector_index.has_vectors(db)
+
+
+class SearchFilters(NamedTuple):
+    universe: Optional[str] = None
+    product: Optional[str] = None
+    material_type: Optional[str] = None
+    status: Optional[str] = None
+
+    def sql(self) -> Tuple[List[str], Dict[str, Any]]:
+        """WHERE clauses and bind params shared by the vector and full-text queries."""
+        where_clauses: List[str] = []
+        params: Dict[str, Any] = {}
+        if self.universe:
+            where_clauses.append("universe_name ILIKE :universe")
+            params["universe"] = f"%{self.universe}%"
+        if self.product:
+            where_clauses.append("product_name ILIKE :product")
+            params["product"] = f"%{self.product}%"
+        if self.material_type:
+            where_clauses.append("material_type ILIKE :mtype")
+            params["mtype"] = f"%{self.material_type}%"
+        if self.status:
+            where_clauses.append("status = :status")
+            params["status"] = self.status
+        else:
+            where_clauses.append("status NOT IN ('draft', 'archived')")
+        return where_clauses, params
+
+
+def _vector_rows(
+    query_vec: List[float],
+    limit: int,
+    filters: SearchFilters,
+    db: Session,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    columns: Sequence[str] = ("id",),
+) -> list:
+    """pgvector top-k rows with `columns` plus `similarity`, best first."""
+    where_clauses, params = filters.sql()
+    sql, ann_params = ann_search_sql(list(columns), "materials", where_clauses, limit)
+    params.update(ann_params, qvec=Vector(query_vec))
+
+    apply_search_tuning(
+        db, ef_search=ef_search, probes=probes, candidates=ann_params.get("ann_candidates", 0)
+    )
+    return db.execute(text(sql), params).fetchall()
+
+
+def _vector_candidates(
+    query_vec: List[float],
+    limit: int,
+    filters: SearchFilters,
+    db: Session,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> List[Tuple[int, float]]:
+    """Ranked (id, cosine similarity) pairs from pgvector, or the in-process index without it."""
+    if not embedding_coverage.vector_available:
+        return in_memory_vector_index.search(
+            query_vec, limit, filters.universe, filters.product, filters.material_type, filters.status
+        )
+    rows = _vector_rows(query_vec, limit, filters, db, ef_search=ef_search, probes=probes)
+    return [(r.id, float(r.similarity)) for r in rows]
+
+
+def _passage_candidates(
+    query_vec: List[float],
+    limit: int,
+    filters: SearchFilters,
+    db: Session,
+) -> List[Tuple[int, float, ChunkHit]]:
+    """Materials ranked by their best-matching passage; empty when nothing is chunked."""
+    if not chunk_coverage.has_chunks(db):
+        return []
+    try:
+        hits = search_chunks(db, query_vec, limit * PASSAGES_PER_RESULT, filters)
+    except Exception as e:
+        logger.error("Passage retrieval failed: %s", e)
+        db.rollback()
+        return []
+    return aggregate_by_material(hits)[:limit]
+
+
+def _fulltext_rows(
+    query: str,
+    limit: int,
+    filters: SearchFilters,
+    db: Session,
+    columns: Sequence[str] = ("id",),
+) -> list:
+    """search_tsv matches with `columns` plus `rank`, best first."""
+    where_clauses, params = filters.sql()
+    where_clauses.insert(0, "search_tsv @@ plainto_tsquery('english', :q)")
+    params.update({"q": query, "lim": limit})
+
+    sql = text(f"""
+        SELECT {", ".join(columns)}, ts_rank(search_tsv, plainto_tsquery('english', :q)) AS rank
+        FROM materials
+        WHERE {" AND ".join(where_clauses)}
+        ORDER BY rank DESC
+        LIMIT :lim
+    """)
+    return db.execute(sql, params).fetchall()
+
+
+def _fulltext_candidates(
+    query: str,
+    limit: int,
+    filters: SearchFilters,
+    db: Session,
+) -> List[Tuple[int, float]]:
+    """Ranked (id, ts_rank) pairs from the search_tsv full-text index."""
+    return [(r.id, float(r.rank)) for r in _fulltext_rows(query, limit, filters, db)]
 
 
 async def _vector_search(
@@ -85,59 +446,122 @@ async def _vector_search(
     material_type: Optional[str],
     status_filter: Optional[str],
     db: Session,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
 ) -> List[dict]:
-    """Perform vector cosine-similarity search via pgvector."""
+    """Perform vector cosine-similarity search via pgvector, or in-process without it."""
     try:
-        query_vec = await embed_text(query)
+        query_vec = await embed_query(query)
     except Exception as e:
         logger.error("Failed to embed query, falling back to fulltext: %s", e)
         return _fulltext_search(query, limit, universe, product, material_type, status_filter, db)
 
-    vec_str = "[" + ",".join(f"{v:.8f}" for v in query_vec) + "]"
+    filters = SearchFilters(universe, product, material_type, status_filter)
+    if embedding_coverage.vector_available:
+        # Ranking and the summary columns in one round-trip
+        rows = _vector_rows(
+            query_vec, limit, filters, db, ef_search=ef_search, probes=probes, columns=SUMMARY_FIELDS,
+        )
+        hits = [(r.id, float(r.similarity)) for r in rows]
+        known = {r.id: r for r in rows}
+    else:
+        hits = _vector_candidates(query_vec, limit, filters, db)
+        known = {}
+    passages = _passage_candidates(query_vec, limit, filters, db)
+    if not hits and not passages:
+        return _fulltext_search(query, limit, universe, product, material_type, status_filter, db)
 
-    where_clauses = ["embedding_vec IS NOT NULL"]
-    params = {"qvec": vec_str, "lim": limit}
+    # A material scores as well as its own vector or its best passage, whichever is higher
+    scores = dict(hits)
+    for mid, score, _ in passages:
+        scores[mid] = max(scores.get(mid, score), score)
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return _attach_passages(_hydrate(ranked, db, known), passages)
 
-    if universe:
-        where_clauses.append("universe_name ILIKE :universe")
-        params["universe"] = f"%{universe}%"
-    if product:
-        where_clauses.append("product_name ILIKE :product")
-        params["product"] = f"%{product}%"
-    if material_type:
-        where_clauses.append("material_type ILIKE :mtype")
-        params["mtype"] = f"%{material_type}%"
-    if status_filter:
-        where_clauses.append("status = :status")
-        params["status"] = status_filter
+
+async def _hybrid_search(
+    query: str,
+    limit: int,
+    filters: SearchFilters,
+    db: Session,
+    use_vectors: bool = True,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> List[dict]:
+    """
+    Vector + full-text retrieval fused with reciprocal-rank fusion.
+    The full-text query runs in a worker thread while the query embedding is
+    being computed, so the slower signal hides the faster one.
+    """
+    pool = min(max(limit * HYBRID_CANDIDATE_MULTIPLIER, limit), HYBRID_MAX_CANDIDATES)
+
+    fulltext_job = run_in_threadpool(_fulltext_candidates, query, pool, filters, db)
+    if use_vectors:
+        query_vec, fulltext_hits = await asyncio.gather(
+            embed_query(query), fulltext_job, return_exceptions=True
+        )
     else:
-        where_clauses.append("status NOT IN ('draft', 'archived')")
+        query_vec = None
+        (fulltext_hits,) = await asyncio.gather(fulltext_job, return_exceptions=True)
+
+    if isinstance(fulltext_hits, BaseException):
+        logger.error("Full-text retrieval failed in hybrid search: %s", fulltext_hits)
+        db.rollback()
+        fulltext_hits = []
+
+    vector_hits: List[Tuple[int, float]] = []
+    passages: List[Tuple[int, float, ChunkHit]] = []
+    if isinstance(query_vec, BaseException):
+        logger.error("Failed to embed query for hybrid search: %s", query_vec)
+    elif query_vec is not None:
+        vector_hits = _vector_candidates(query_vec, pool, filters, db, ef_search=ef_search, probes=probes)
+        passages = _passage_candidates(query_vec, pool, filters, db)
+
+    fused = reciprocal_rank_fusion({
+        "vector": vector_hits,
+        "fulltext": fulltext_hits,
+        "passage": [(mid, score) for mid, score, _ in passages],
+    })[:limit]
+    if not fused:
+        return _ilike_fallback(
+            query, limit, filters.universe, filters.product, filters.material_type, filters.status, db
+        )
 
-    where_sql = " AND ".join(where_clauses)
+    results = _hydrate([(h.id, h.score) for h in fused], db)
+    signals = {h.id: h.signals for h in fused}
+    for r in results:
+        r["signals"] = signals.get(r["id"], {})
+    return _attach_passages(results, passages)
 
-    sql = text(f"""
-        SELECT id, 1 - (embedding_vec <=> CAST(:qvec AS vector)) AS similarity
-        FROM materials
-        WHERE {where_sql}
-        ORDER BY embedding_vec <=> CAST(:qvec AS vector)
-        LIMIT :lim
-    """)
 
-    rows = db.execute(sql, params).fetchall()
-    if not rows:
-        return _fulltext_search(query, limit, universe, product, material_type, status_filter, db)
+def _attach_passages(results: List[dict], passages: List[Tuple[int, float, ChunkHit]]) -> List[dict]:
+    """Add the best-matching passage, when there is one, to each result."""
+    best = {mid: hit for mid, _, hit in passages}
+    for r in results:
+        hit = best.get(r["id"])
+        if hit is not None:
+            r["matched_passage"] = passage_dict(hit)
+    return results
 
-    ids = [r[0] for r in rows]
-    scores = {r[0]: float(r[1]) for r in rows}
 
-    materials = db.query(Material).filter(Material.id.in_(ids)).all()
-    mat_map = {m.id: m for m in materials}
+def _hydrate(hits, db: Session, known: Optional[Dict[int, Any]] = None) -> List[dict]:
+    """
+    Summaries for ranked (id, score) pairs, preserving rank order.
+    Rows already fetched with the ranking query can be passed as `known`.
+    """
+    ids = [h[0] for h in hits]
+    scores = dict(hits)
+
+    rows = dict(known or {})
+    missing = [mid for mid in ids if mid not in rows]
+    if missing:
+        rows.update(load_summaries(db, missing))
 
     results = []
     for mid in ids:
-        m = mat_map.get(mid)
+        m = rows.get(mid)
         if m:
-            results.append(_material_to_dict(m, scores.get(mid, 0)))
+            results.append(summary_to_dict(m, scores.get(mid, 0)))
     return results
 
 
@@ -151,51 +575,13 @@ def _fulltext_search(
     db: Session,
 ) -> List[dict]:
     """Fallback: PostgreSQL full-text search using tsvector."""
-    where_clauses = ["search_tsv @@ plainto_tsquery('english', :q)"]
-    params = {"q": query, "lim": limit}
-
-    if universe:
-        where_clauses.append("universe_name ILIKE :universe")
-        params["universe"] = f"%{universe}%"
-    if product:
-        where_clauses.append("product_name ILIKE :product")
-        params["product"] = f"%{product}%"
-    if material_type:
-        where_clauses.append("material_type ILIKE :mtype")
-        params["mtype"] = f"%{material_type}%"
-    if status_filter:
-        where_clauses.append("status = :status")
-        params["status"] = status_filter
-    else:
-        where_clauses.append("status NOT IN ('draft', 'archived')")
-
-    where_sql = " AND ".join(where_clauses)
-
-    sql = text(f"""
-        SELECT id, ts_rank(search_tsv, plainto_tsquery('english', :q)) AS rank
-        FROM materials
-        WHERE {where_sql}
-        ORDER BY rank DESC
-        LIMIT :lim
-    """)
-
-    rows = db.execute(sql, params).fetchall()
+    filters = SearchFilters(universe, product, material_type, status_filter)
+    rows = _fulltext_rows(query, limit, filters, db, columns=SUMMARY_FIELDS)
 
     if not rows:
         return _ilike_fallback(query, limit, universe, product, material_type, status_filter, db)
 
-    ids = [r[0] for r in rows]
-    scores = {r[0]: float(r[1]) for r in rows}
-
-    materials = db.query(Material).filter(Material.id.in_(ids)).all()
-    mat_map = {m.id: m for m in materials}
-
-    results = []
-    for mid in ids:
-        m = mat_map.get(mid)
-        if m:
-            results.append(_material_to_dict(m, scores.get(mid, 0)))
-    return results
+    return [summary_to_dict(r, float(r.rank)) for r in rows]
 
 
 def _ilike_fallback(
@@ -207,22 +593,9 @@ def _ilike_fallback(
     status_filter: Optional[str],
     db: Session,
 ) -> List[dict]:
-    """Last-resort ilike search when tsvector has no matches."""
-    q = db.query(Material)
-
-    kw = f"%{query}%"
-    q = q.filter(
-        or_(
-            Material.name.ilike(kw),
-            Material.description.ilike(kw),
-            Material.product_name.ilike(kw),
-            Material.tags.ilike(kw),
-            Material.keywords.ilike(kw),
-            Material.use_cases.ilike(kw),
-            Material.pain_points.ilike(kw),
-            Material.executive_summary.ilike(kw),
-        )
-    )
+    """Last-resort keyword search when tsvector has no matches, ranked by trigram similarity."""
+    match = trigram_match(db, query, _KEYWORD_COLUMNS)
+    q = db.query(*SUMMARY_COLUMNS, match.score.label("score")).filter(match.condition)
 
     if universe:
         q = q.filter(Material.universe_name.ilike(f"%{universe}%"))
@@ -235,5 +608,5 @@ def _ilike_fallback(
     else:
         q = q.filter(Material.status.notin_(["draft", "archived"]))
 
-    materials = q.limit(limit).all()
-    return [_material_to_dict(m, 0.0) for m in materials]
+    rows = q.order_by(match.score.desc(), Material.created_at.desc()).limit(limit).all()
+    return [summary_to_dict(r, float(r.score or 0.0)) for r in rows]
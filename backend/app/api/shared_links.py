@@ -3,10 +3,10 @@ Shared Links API endpoints - Public and authenticated endpoints for sharing mate
 """
 import secrets
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
-from fastapi.responses import FileResponse
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from starlette.concurrency import run_in_threadpool
 from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.models.user import User
@@ -18,6 +18,8 @@ from app.schemas.shared_link import (
     SharedLinkStats, MaterialShareStats, CustomerShareStats, SharesOverTimeResponse, SharesOverTimeDataPoint
 )
 from app.services.storage import storage_service
+from app.services.file_serving import send_file, serve_material_file
+from app.services.usage_ingest import usage_ingester
 
 router = APIRouter(prefix="/api/shared-links", tags=["shared-links"])
 
@@ -221,40 +223,27 @@ async def get_shared_link_by_token(
             detail="Material not found"
         )
     
-    # Update access tracking
-    shared_link.access_count += 1
-    shared_link.last_accessed_at = datetime.utcnow()
+    # Update access tracking (written in the background by the usage ingester)
+    usage_ingester.increment("shared_links", shared_link.id, "access_count", last_accessed_at=datetime.utcnow())
     
     # Track view event in MaterialUsage for timeline - real customer activity only
     # Skip known bots/prefetchers (email clients, link previews) to avoid phantom views
-    try:
-        ua = (request.headers.get("user-agent") or "").lower()
-        bot_patterns = (
-            "googlebot", "bingbot", "slurp", "duckduckbot", "baiduspider",
-            "yandexbot", "facebookexternalhit", "linkedinbot", "twitterbot",
-            "whatsapp", "telegrambot", "slackbot", "applebot", "discordbot",
-            "bytespider", "petalbot", "semrushbot", "ahrefsbot", "mj12bot",
-            "dotbot", "rogerbot", "screaming frog", "sistrix", "sogou",
-            "exabot", "ia_archiver", "archive.org_bot", "curl", "wget",
-            "python-requests", "go-http-client", "java/", "okhttp"
+    ua = (request.headers.get("user-agent") or "").lower()
+    bot_patterns = (
+        "googlebot", "bingbot", "slurp", "duckduckbot", "baiduspider",
+        "yandexbot", "facebookexternalhit", "linkedinbot", "twitterbot",
+        "whatsapp", "telegrambot", "slackbot", "applebot", "discordbot",
+        "bytespider", "petalbot", "semrushbot", "ahrefsbot", "mj12bot",
+        "dotbot", "rogerbot", "screaming frog", "sistrix", "sogou",
+        "exabot", "ia_archiver", "archive.org_bot", "curl", "wget",
+        "python-requests", "go-http-client", "java/", "okhttp"
+    )
+    is_bot = any(p in ua for p in bot_patterns)
+    if not is_bot:
+        await usage_ingester.record(
+            material.id, shared_link.shared_by_user_id, UsageAction.VIEW.value, request,
+            shared_link_id=shared_link.id,
         )
-        is_bot = any(p in ua for p in bot_patterns)
-        if not is_bot:
-            usage_event = MaterialUsage(
-                material_id=material.id,
-                user_id=shared_link.shared_by_user_id,
-                action=UsageAction.VIEW.value,
-                used_at=datetime.utcnow(),
-                shared_link_id=shared_link.id,
-                ip_address=request.client.host if request.client else None,
-                user_agent=request.headers.get("user-agent")
-            )
-            db.add(usage_event)
-    except Exception as e:
-        import logging
-        logging.error(f"Failed to track view usage: {str(e)}")
-    
-    db.commit()
     
     # Build share URL for response
     from app.core.config import settings
@@ -273,7 +262,8 @@ async def get_shared_link_by_token(
         "file_size": material.file_size,
         "expires_at": shared_link.expires_at,
         "is_active": shared_link.is_active,
-        "access_count": shared_link.access_count,
+        # Includes this access, which is still buffered
+        "access_count": (shared_link.access_count or 0) + 1,
         "download_count": shared_link.download_count,
         "created_at": shared_link.created_at,
         "share_url": share_url
@@ -290,7 +280,6 @@ async def thumbnail_shared_material(
     db: Session = Depends(get_db)
 ):
     """Get thumbnail for shared material. Returns small PNG or 404."""
-    from fastapi.responses import FileResponse
     from app.services.thumbnail_service import ensure_thumbnail
 
     shared_link = db.query(SharedLink).filter(SharedLink.unique_token == token).first()
@@ -301,7 +290,7 @@ async def thumbnail_shared_material(
     if not material or not material.file_path:
         raise HTTPException(status_code=404, detail="Material not available")
 
-    file_path = storage_service.get_file_path(material.file_path)
+    file_path = await run_in_threadpool(storage_service.get_file_path, material.file_path)
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
 
@@ -311,11 +300,7 @@ async def thumbnail_shared_material(
     if not thumb_path or not thumb_path.exists():
         raise HTTPException(status_code=404, detail="Thumbnail not available")
 
-    return FileResponse(
-        path=str(thumb_path),
-        media_type="image/png",
-        headers={"Cache-Control": "public, max-age=86400"},
-    )
+    return send_file(thumb_path, "image/png", {"Cache-Control": "public, max-age=86400"})
 
 
 @router.get(
@@ -325,6 +310,7 @@ async def thumbnail_shared_material(
 )
 async def view_shared_material(
     token: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """View material file via shared link. Returns file for display without tracking download."""
@@ -345,29 +331,7 @@ async def view_shared_material(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Material not found or file not available"
         )
-    file_path = storage_service.get_file_path(material.file_path)
-    if not file_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on server"
-        )
-    file_format = material.file_format or (material.file_name.split('.')[-1] if material.file_name else '')
-    media_type_map = {
-        'pdf': 'application/pdf',
-        'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        'mp4': 'video/mp4', 'webm': 'video/webm', 'mov': 'video/quicktime',
-        'avi': 'video/x-msvideo', 'mkv': 'video/x-matroska',
-    }
-    media_type = media_type_map.get(file_format.lower(), 'application/octet-stream')
-    filename = material.file_name or f"material_{material.id}.{file_format}"
-    return FileResponse(
-        path=str(file_path),
-        filename=filename,
-        media_type=media_type,
-        headers={"Content-Disposition": f'inline; filename="{filename}"'},
-    )
+    return await serve_material_file(request, material, inline=True)
 
 
 @router.get(
@@ -438,68 +402,19 @@ async def download_shared_material(
             detail="File not available for this material"
         )
     
-    # Update access tracking
-    shared_link.access_count += 1
-    shared_link.last_accessed_at = datetime.utcnow()
-    
-    # Update download tracking
-    shared_link.download_count = (shared_link.download_count or 0) + 1
-    shared_link.last_downloaded_at = datetime.utcnow()
-    
-    # Track download usage
-    try:
-        usage_event = MaterialUsage(
-            material_id=material.id,
-            user_id=shared_link.shared_by_user_id,
-            action=UsageAction.DOWNLOAD.value,
-            used_at=datetime.utcnow(),
-            shared_link_id=shared_link.id,
-            ip_address=request.client.host if request.client else None,
-            user_agent=request.headers.get("user-agent")
-        )
-        db.add(usage_event)
-        
-        # Increment usage count
-        material.usage_count = (material.usage_count or 0) + 1
-        material.last_updated = datetime.utcnow()
-    except Exception as e:
-        # Log error but don't fail the download
-        import logging
-        logging.error(f"Failed to track usage: {str(e)}")
-    
-    db.commit()
-    
-    # Get file path and serve
-    file_path = storage_service.get_file_path(material.file_path)
-    if not file_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on server"
-        )
-    
-    # Determine media type based on file format
-    file_format = material.file_format or (material.file_name.split('.')[-1] if '.' in material.file_name else '')
-    media_type_map = {
-        'pdf': 'application/pdf',
-        'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-        'ppt': 'application/vnd.ms-powerpoint',
-        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'doc': 'application/msword',
-        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        'xls': 'application/vnd.ms-excel',
-        'mp4': 'video/mp4', 'webm': 'video/webm', 'mov': 'video/quicktime',
-        'avi': 'video/x-msvideo', 'mkv': 'video/x-matroska',
-    }
-    media_type = media_type_map.get(file_format.lower(), 'application/octet-stream')
-    
-    # Ensure filename is properly formatted (FastAPI FileResponse handles encoding)
-    filename = material.file_name or f"material_{material.id}.{file_format}"
+    # Update access and download tracking (written in the background by the usage ingester)
+    now = datetime.utcnow()
+    usage_ingester.increment("shared_links", shared_link.id, "access_count", last_accessed_at=now)
+    usage_ingester.increment("shared_links", shared_link.id, "download_count", last_downloaded_at=now)
     
-    return FileResponse(
-        path=str(file_path),
-        filename=filename,
-        media_type=media_type
+    # Track download usage and increment the material's usage count
+    await usage_ingester.record(
+        material.id, shared_link.shared_by_user_id, UsageAction.DOWNLOAD.value, request,
+        shared_link_id=shared_link.id,
     )
+    usage_ingester.increment("materials", material.id, "usage_count", last_updated=now)
+    
+    return await serve_material_file(request, material, inline=False)
 
 
 @router.get("/timeline", response_model=List[TimelineEvent])
@@ -42,8 +42,19 @@ class Settings(BaseSettings):
         return v if isinstance(v, list) else ["*"]
     
     # File Storage
-    STORAGE_TYPE: str = "local"  # local, sharepoint, drive
+    STORAGE_TYPE: str = "local"  # local or s3 (S3-compatible object store)
     STORAGE_PATH: str = "./storage"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: str = ""  # e.g. https://s3.gra.io.cloud.ovh.net or http://minio:9000
+    S3_REGION: str = ""
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    FILE_SERVING_OFFLOAD: str = Field(default="none", description="'x-accel' hands file bodies to nginx with X-Accel-Redirect; 'none' streams them from Python")
+    FILE_SERVING_ACCEL_PREFIX: str = Field(default="/protected-files/", description="Internal nginx location aliased to STORAGE_PATH")
+    USAGE_FLUSH_INTERVAL_MS: int = Field(default=500, description="How often buffered usage events and counter increments are written")
+    USAGE_FLUSH_BATCH: int = Field(default=500, description="Buffered usage events that trigger an immediate flush")
+    USAGE_MAX_PENDING: int = Field(default=20000, description="Usage events buffered before record() waits for a flush (oldest are dropped if it fails)")
     
     # Platform
     PLATFORM_URL: str = Field(default="http://localhost:3003", description="Frontend platform URL for email links")
@@ -69,12 +80,47 @@ class Settings(BaseSettings):
     OVH_AI_API_KEY: str = Field(default="", description="OVHcloud AI API Key")
     OVH_AI_MODEL: str = Field(default="Meta-Llama-3_3-70B-Instruct", description="AI model to use")
     OVH_AI_CONFIDENCE_THRESHOLD: float = Field(default=0.9, description="Confidence threshold for auto-apply (0.0-1.0)")
+    OVH_AI_HTTP_MAX_CONNECTIONS: int = Field(default=20, description="Max open connections in the shared OVHcloud AI HTTP client pool")
+    OVH_AI_HTTP_MAX_KEEPALIVE: int = Field(default=10, description="Max idle keep-alive connections kept in the shared OVHcloud AI HTTP client pool")
+    OVH_AI_HTTP_MAX_RETRIES: int = Field(default=2, description="Retries (with jittered backoff) for OVHcloud AI requests on connection errors and 429/502/503/504")
     
     # Embedding / Semantic Search Configuration
     OVH_AI_EMBEDDING_URL: str = Field(default="", description="OVHcloud AI Embedding endpoint URL (OpenAI-compatible /v1/embeddings)")
     OVH_AI_EMBEDDING_MODEL: str = Field(default="", description="Embedding model name (e.g. multilingual-e5-large)")
     EMBEDDING_DIMENSIONS: int = Field(default=384, description="Embedding vector dimensions (384 for fastembed default, override for OVH model)")
     EMBEDDING_PROVIDER: str = Field(default="auto", description="Embedding provider: 'ovh', 'local', or 'auto' (tries OVH first, falls back to local)")
+    EMBEDDING_LOCAL_WORKERS: int = Field(default=2, description="Threads running local (fastembed) embedding inference off the event loop")
+    EMBEDDING_MICROBATCH_MAX_SIZE: int = Field(default=32, description="Max concurrent single-text local embedding requests merged into one model call (1 disables)")
+    EMBEDDING_MICROBATCH_WAIT_MS: int = Field(default=5, description="Max milliseconds a local embedding request waits for others to batch with")
+    EMBEDDING_BATCH_SIZE: int = Field(default=16, description="Initial batch size of the background embedding worker")
+    EMBEDDING_BATCH_MAX_SIZE: int = Field(default=128, description="Upper bound for the embedding worker's adaptive batch size")
+    EMBEDDING_BATCH_TARGET_SECONDS: int = Field(default=4, description="Target duration of one embedding batch; the worker grows or shrinks batches around it")
+    EMBEDDING_CHUNK_WORDS: int = Field(default=200, description="Words per passage window when chunking document text for passage search")
+    EMBEDDING_CHUNK_OVERLAP_WORDS: int = Field(default=50, description="Words shared by consecutive passage windows of the same page or slide")
+    EMBEDDING_QUERY_CACHE_SIZE: int = Field(default=1024, description="Max number of search-query embeddings kept in the in-process LRU cache (0 disables)")
+    EMBEDDING_QUERY_CACHE_TTL: int = Field(default=3600, description="Seconds a cached query embedding stays valid")
+    EMBEDDING_COVERAGE_REFRESH_SECONDS: int = Field(default=300, description="How often the in-process embedding coverage state is re-synced from the database")
+    EMBEDDING_INDEX_TYPE: str = Field(default="hnsw", description="ANN index on materials.embedding_vec: 'hnsw' or 'ivfflat'; applied by migration 024")
+    EMBEDDING_HNSW_M: int = Field(default=16, description="HNSW m (links per node) used when migrations 024 / 028 build the ANN indexes")
+    EMBEDDING_HNSW_EF_CONSTRUCTION: int = Field(default=128, description="HNSW ef_construction used when migrations 024 / 028 build the ANN indexes")
+    EMBEDDING_IVFFLAT_LISTS: int = Field(default=0, description="IVFFlat lists for migration 024; 0 uses embedded rows / 1000 (min 10)")
+    EMBEDDING_HNSW_EF_SEARCH: int = Field(default=100, description="hnsw.ef_search applied to vector queries (higher = better recall, slower)")
+    EMBEDDING_IVFFLAT_PROBES: int = Field(default=10, description="ivfflat.probes applied to vector queries when the index is IVFFlat")
+    EMBEDDING_INDEX_PRECISION: str = Field(default="full", description="What the ANN index stores: 'full' (vector), 'half' (halfvec) or 'binary' (binary_quantize); applied by migration 028")
+    EMBEDDING_INDEX_DIMENSIONS: int = Field(default=0, description="Index only the leading N dimensions (Matryoshka truncation); 0 indexes all of them")
+    EMBEDDING_RESCORE_FACTOR: int = Field(default=4, description="With a compressed index, candidates fetched per result and re-ranked with full-precision vectors")
+    SEARCH_RESULT_CACHE_SIZE: int = Field(default=512, description="Max number of semantic search responses kept in the in-process result cache (0 disables)")
+    SEARCH_RESULT_CACHE_TTL: int = Field(default=300, description="Seconds a cached semantic search response stays valid")
+    SEARCH_CATALOG_SYNC_SECONDS: int = Field(default=10, description="How often the catalog version re-reads the materials fingerprint to see other workers' writes")
+    SIMILAR_MATERIALS_TOP_N: int = Field(default=20, description="Length of each material's cached 'more like this' neighbour list")
+    DEDUP_SHINGLE_WORDS: int = Field(default=5, description="Words per shingle when fingerprinting document text for near-duplicate detection")
+    DEDUP_MINHASH_PERMUTATIONS: int = Field(default=128, description="MinHash signature length; must be a multiple of DEDUP_LSH_BANDS")
+    DEDUP_LSH_BANDS: int = Field(default=32, description="LSH bands per signature (more bands = lower similarity needed to become a candidate)")
+    DEDUP_TEXT_THRESHOLD: float = Field(default=0.8, description="Estimated Jaccard similarity of document shingles above which materials are near-duplicates")
+    DEDUP_VECTOR_THRESHOLD: float = Field(default=0.97, description="Embedding cosine similarity above which materials are near-duplicates")
+    UPLOAD_SESSION_TTL_HOURS: int = Field(default=24, description="Hours an unfinished resumable upload session is kept on disk")
+    UPLOAD_CHUNK_SIZE: int = Field(default=8 * 1024 * 1024, description="Chunk size suggested to clients of the resumable upload API")
+    UPLOAD_MAX_CHUNK_SIZE: int = Field(default=64 * 1024 * 1024, description="Largest single chunk accepted by the resumable upload API")
     
     class Config:
         env_file = "/app/.env"  # Use absolute path for container
@@ -97,6 +143,32 @@ for path in possible_paths:
         env_file_path = path
         break
 
+# Integer settings among the forced .env overrides below
+_INT_ENV_OVERRIDES = {
+    "OVH_AI_HTTP_MAX_CONNECTIONS",
+    "OVH_AI_HTTP_MAX_KEEPALIVE",
+    "OVH_AI_HTTP_MAX_RETRIES",
+    "EMBEDDING_DIMENSIONS",
+    "EMBEDDING_LOCAL_WORKERS",
+    "EMBEDDING_MICROBATCH_MAX_SIZE",
+    "EMBEDDING_MICROBATCH_WAIT_MS",
+    "EMBEDDING_BATCH_SIZE",
+    "EMBEDDING_BATCH_MAX_SIZE",
+    "EMBEDDING_BATCH_TARGET_SECONDS",
+    "EMBEDDING_CHUNK_WORDS",
+    "EMBEDDING_CHUNK_OVERLAP_WORDS",
+    "EMBEDDING_QUERY_CACHE_SIZE",
+    "EMBEDDING_QUERY_CACHE_TTL",
+    "EMBEDDING_COVERAGE_REFRESH_SECONDS",
+    "EMBEDDING_HNSW_M",
+    "EMBEDDING_HNSW_EF_CONSTRUCTION",
+    "EMBEDDING_IVFFLAT_LISTS",
+    "EMBEDDING_HNSW_EF_SEARCH",
+    "EMBEDDING_IVFFLAT_PROBES",
+    "EMBEDDING_INDEX_DIMENSIONS",
+    "EMBEDDING_RESCORE_FACTOR",
+}
+
 if env_file_path and env_file_path.exists():
     with open(env_file_path, "r", encoding="utf-8") as f:
         for line in f:
@@ -109,7 +181,7 @@ if env_file_path and env_file_path.exists():
                 if key.startswith("OVH_AI_") or key.startswith("EMBEDDING_"):
                     if key == "OVH_AI_ENABLED":
                         setattr(_settings, key, value.lower() in ("true", "1", "yes"))
-                    elif key == "EMBEDDING_DIMENSIONS":
+                    elif key in _INT_ENV_OVERRIDES:
                         try:
                             setattr(_settings, key, int(value))
                         except ValueError:
@@ -134,6 +206,11 @@ if env_file_path and env_file_path.exists():
 
 # Auto-construct DATABASE_URL from POSTGRES_* if not explicitly provided
 if not _settings.DATABASE_URL or _settings.DATABASE_URL == "" or "localhost" in _settings.DATABASE_URL:
-    _settings.DATABASE_URL = f"postgresql://{_settings.POSTGRES_USER}:{_settings.POSTGRES_PASSWORD}@{_settings.POSTGRES_HOST}:{_settings.POSTGRES_PORT}/{_settings.POSTGRES_DB}"
+    _settings.DATABASE_URL = f"postgresql+psycopg://{_settings.POSTGRES_USER}:{_settings.POSTGRES_PASSWORD}@{_settings.POSTGRES_HOST}:{_settings.POSTGRES_PORT}/{_settings.POSTGRES_DB}"
+
+# Bare postgresql:// URLs select psycopg2, which can only bind pgvector parameters as text;
+# psycopg 3 sends them in binary (app/core/vector_codec.py). Explicit +driver URLs are kept.
+if _settings.DATABASE_URL.startswith(("postgresql://", "postgres://")):
+    _settings.DATABASE_URL = "postgresql+psycopg://" + _settings.DATABASE_URL.split("://", 1)[1]
 
 settings = _settings
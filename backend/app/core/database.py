@@ -4,6 +4,7 @@ Database configuration and session management
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.vector_codec import register_vector_adapters
 
 # Import all models to ensure relationships are configured
 # Import models in correct order - AICorrection before User
@@ -25,6 +26,7 @@ except ImportError:
     pass
 
 engine = create_engine(settings.DATABASE_URL)
+register_vector_adapters(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
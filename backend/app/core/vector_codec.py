@@ -0,0 +1,159 @@
+"""
+Shared codec for embedding vectors.
+
+Two concerns live here so every call site encodes vectors the same way:
+
+* Query/write parameters for pgvector. Wrap a vector in `Vector` and pass it as
+  a bind parameter. The app connects with psycopg (3) (see DATABASE_URL in
+  app/core/config.py), where a binary dumper sends the pgvector wire format
+  (int16 dim, int16 unused, big-endian float4 values), so nothing is
+  formatted as decimal text. An explicit postgresql+psycopg2:// URL still
+  works: psycopg2 only speaks the text protocol, so there an adapter renders
+  the literal in one vectorised pass instead of a per-float f-string.
+
+* The Material.embedding mirror column. New values are stored as base64 of
+  little-endian float32 ("b64f32:" prefix, ~5.5KB for 1024 dims instead of
+  ~20KB of JSON). Legacy JSON arrays are still decoded.
+"""
+import base64
+import json
+import logging
+import struct
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_PREFIX = "b64f32:"
+
+
+class Vector:
+    """A float32 vector bound as a pgvector parameter."""
+
+    __slots__ = ("array",)
+
+    def __init__(self, values: Union["Vector", np.ndarray, Iterable[float]]):
+        if isinstance(values, Vector):
+            values = values.array
+        self.array = np.ascontiguousarray(values, dtype=np.float32).ravel()
+
+    def __len__(self) -> int:
+        return self.array.shape[0]
+
+    def to_list(self) -> List[float]:
+        return self.array.tolist()
+
+    def to_text(self) -> str:
+        """pgvector text literal, e.g. '[0.1,0.2]'."""
+        return json.dumps(self.array.astype(np.float64).round(8).tolist(), separators=(",", ":"))
+
+    def to_binary(self) -> bytes:
+        """pgvector binary (vector_recv) format."""
+        return struct.pack(">HH", len(self), 0) + self.array.astype(">f4").tobytes()
+
+    @classmethod
+    def from_binary(cls, data: bytes) -> "Vector":
+        dim, _ = struct.unpack_from(">HH", data)
+        return cls(np.frombuffer(data, dtype=">f4", count=dim, offset=4))
+
+
+# ---------------------------------------------------------------------------
+# Material.embedding mirror column
+# ---------------------------------------------------------------------------
+
+def encode_embedding(values: Union[Vector, Iterable[float]]) -> str:
+    """Compact text form for the Material.embedding column."""
+    arr = Vector(values).array.astype("<f4")
+    return EMBEDDING_PREFIX + base64.b64encode(arr.tobytes()).decode("ascii")
+
+
+def decode_embedding(raw: Optional[str]) -> Optional[np.ndarray]:
+    """Decode either the base64 float32 form or a legacy JSON array."""
+    if not raw:
+        return None
+    if raw.startswith(EMBEDDING_PREFIX):
+        data = base64.b64decode(raw[len(EMBEDDING_PREFIX):])
+        return np.frombuffer(data, dtype="<f4").astype(np.float32)
+    try:
+        values = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(values, list) or not values:
+        return None
+    return np.asarray(values, dtype=np.float32)
+
+
+# ---------------------------------------------------------------------------
+# Driver adapters
+# ---------------------------------------------------------------------------
+
+class _Psycopg2VectorAdapter:
+    def __init__(self, vec: Vector):
+        self.vec = vec
+
+    def getquoted(self) -> bytes:
+        return ("'" + self.vec.to_text() + "'::vector").encode("ascii")
+
+
+_psycopg2_registered = False
+
+
+def _register_psycopg2() -> None:
+    global _psycopg2_registered
+    if _psycopg2_registered:
+        return
+    from psycopg2.extensions import register_adapter
+    register_adapter(Vector, _Psycopg2VectorAdapter)
+    _psycopg2_registered = True
+
+
+def _register_psycopg(dbapi_conn) -> None:
+    """Register text and (when pgvector is installed) binary dumpers on a psycopg 3 connection."""
+    from psycopg.adapt import Dumper
+    from psycopg.pq import Format
+    from psycopg.types import TypeInfo
+
+    class VectorTextDumper(Dumper):
+        format = Format.TEXT
+
+        def dump(self, obj):
+            return obj.to_text().encode("ascii")
+
+    dbapi_conn.adapters.register_dumper(Vector, VectorTextDumper)
+
+    try:
+        info = TypeInfo.fetch(dbapi_conn, "vector")
+    except Exception as e:
+        logger.debug("Could not look up pgvector type: %s", e)
+        info = None
+    finally:
+        # Don't hand the pool a connection with the lookup transaction still open
+        if not dbapi_conn.autocommit:
+            dbapi_conn.rollback()
+    if info is None:
+        return
+
+    class VectorBinaryDumper(Dumper):
+        format = Format.BINARY
+        oid = info.oid
+
+        def dump(self, obj):
+            return obj.to_binary()
+
+    # Registered last so it wins for %s (auto-format) placeholders
+    dbapi_conn.adapters.register_dumper(Vector, VectorBinaryDumper)
+
+
+def register_vector_adapters(engine) -> None:
+    """Teach the engine's DBAPI driver how to bind `Vector` parameters."""
+    driver = engine.dialect.driver
+    if driver == "psycopg2":
+        _register_psycopg2()
+    elif driver == "psycopg":
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_conn, _record):
+            _register_psycopg(dbapi_conn)
+    else:
+        logger.warning("No pgvector adapter for driver %s; Vector parameters will fail to bind", driver)
@@ -1,6 +1,8 @@
 """
 Sales Enablement Application - Main FastAPI Application
 """
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
@@ -27,13 +29,41 @@ from app.models.shared_link import SharedLink  # noqa: F401
 from app.models.deal_room import DealRoom, DealRoomMaterial, DealRoomParticipant, ActionPlanItem, RoomMessage  # noqa: F401
 from app.models.customer_message import CustomerMessage  # noqa: F401
 from app.models.material_request import MaterialRequest  # noqa: F401
+from app.models.material_chunk import MaterialChunk  # noqa: F401
+from app.models.material_neighbor import MaterialNeighbor  # noqa: F401
+from app.models.material_fingerprint import MaterialFingerprint, MaterialLshBucket  # noqa: F401
+from app.models.storage_blob import StorageBlob  # noqa: F401
 # AICorrection model may not exist in all deployments
 try:
     from app.models.ai_correction import AICorrection  # noqa: F401
 except ImportError:
     pass
 
+from app.services.http_client import ai_http_client
+from app.services.embedding_service import local_embedding_executor
+from app.services.embedding_pipeline import embedding_pipeline
+from app.services.usage_ingest import usage_ingester
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared pooled client for the OVHcloud AI chat and embedding endpoints
+    await ai_http_client.start()
+    # Load the local embedding model now rather than on the first search
+    await local_embedding_executor.start(preload=settings.EMBEDDING_PROVIDER.lower() != "ovh")
+    # Background worker that embeds new and changed materials
+    await embedding_pipeline.start()
+    # Batched writer for usage events and view/download counters
+    await usage_ingester.start()
+    yield
+    await usage_ingester.close()
+    await embedding_pipeline.close()
+    await local_embedding_executor.close()
+    await ai_http_client.close()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Products & Solutions Enablement API",
     description="""
     API for managing products and solutions enablement materials, tracks, and content.
@@ -89,10 +89,6 @@ class DealRoom(BaseModel):
     def is_valid(self) -> bool:
         return self.is_active and not self.is_expired()
 
-    def record_access(self):
-        self.access_count += 1
-        self.last_accessed_at = datetime.utcnow()
-
 
 class DealRoomParticipant(BaseModel):
     """
@@ -1,7 +1,7 @@
 """
 Material model - represents sales enablement materials
 """
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Enum as SQLEnum, DateTime
+from sqlalchemy import BigInteger, Column, String, Integer, ForeignKey, Text, Enum as SQLEnum, DateTime
 from sqlalchemy.orm import relationship
 from enum import Enum
 from datetime import datetime
@@ -61,7 +61,8 @@ class Material(BaseModel):
     file_path = Column(String(500), nullable=True)  # Nullable to allow materials without files
     file_name = Column(String(255), nullable=True)  # Nullable to allow materials without files
     file_format = Column(String(50))  # pdf, pptx, docx
-    file_size = Column(Integer)  # bytes
+    file_size = Column(BigInteger)  # bytes
+    file_sha256 = Column(String(64), nullable=True)  # checksum computed while the upload was streamed to disk
     
     # Versioning
     version = Column(String(50))
@@ -96,6 +97,7 @@ class Material(BaseModel):
     
     # Semantic search: serialised JSON embedding + raw vector handled via SQL
     embedding = Column(Text, nullable=True)
+    embedding_content_hash = Column(String(64), nullable=True)  # sha256 of the embedded text + model
     search_text = Column(Text, nullable=True)
     
     # Relationships (using string references to avoid circular imports)
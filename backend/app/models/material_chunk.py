@@ -0,0 +1,26 @@
+"""
+Material Chunk model - overlapping windows of a material's extracted file text
+"""
+from sqlalchemy import Column, Integer, ForeignKey, String, Text
+from app.models.base import BaseModel
+
+
+class MaterialChunk(BaseModel):
+    """A passage (slide, page or section window) of a material's document, with its own embedding"""
+    __tablename__ = "material_chunks"
+
+    material_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Order within the material and where the passage comes from ("Slide 4", "Page 2 (1/3)", "Document")
+    chunk_index = Column(Integer, nullable=False)
+    location = Column(String(50), nullable=True)
+    text = Column(Text, nullable=False)
+
+    # Same encoding as Material.embedding; the pgvector column embedding_vec is handled via SQL
+    embedding = Column(Text, nullable=True)
+
+    # Hash of the extracted text + embedding model the chunks were built from
+    source_hash = Column(String(64), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<MaterialChunk(material_id={self.material_id}, chunk_index={self.chunk_index}, location={self.location})>"
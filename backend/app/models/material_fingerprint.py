@@ -0,0 +1,34 @@
+"""
+Material Fingerprint models - MinHash signatures and LSH buckets of document text
+"""
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, LargeBinary, String
+from app.models.base import BaseModel
+
+
+class MaterialFingerprint(BaseModel):
+    """MinHash signature of a material's extracted document text, used for near-duplicate detection"""
+    __tablename__ = "material_fingerprints"
+
+    material_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+
+    # Hash of the extracted text + MinHash parameters the signature was built from
+    source_hash = Column(String(64), nullable=False)
+    # Little-endian uint32 minimum hash per permutation
+    signature = Column(LargeBinary, nullable=False)
+    shingle_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MaterialFingerprint(material_id={self.material_id}, shingles={self.shingle_count})>"
+
+
+class MaterialLshBucket(BaseModel):
+    """One LSH band of a fingerprint; materials sharing a (band, bucket) are near-duplicate candidates"""
+    __tablename__ = "material_lsh_buckets"
+    __table_args__ = (Index("idx_material_lsh_buckets_band_bucket", "band", "bucket"),)
+
+    material_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), nullable=False, index=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f"<MaterialLshBucket(material_id={self.material_id}, band={self.band})>"
@@ -0,0 +1,21 @@
+"""
+Material Neighbor model - precomputed "more like this" lists
+"""
+from sqlalchemy import Column, Float, ForeignKey, Integer, UniqueConstraint
+from app.models.base import BaseModel
+
+
+class MaterialNeighbor(BaseModel):
+    """One entry of a material's cached nearest-neighbour list (by embedding cosine similarity)"""
+    __tablename__ = "material_neighbors"
+    __table_args__ = (UniqueConstraint("material_id", "neighbor_id", name="uq_material_neighbors_pair"),)
+
+    material_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), nullable=False, index=True)
+    neighbor_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # 1-based position in the list and cosine similarity to material_id
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f"<MaterialNeighbor(material_id={self.material_id}, neighbor_id={self.neighbor_id}, rank={self.rank})>"
@@ -61,20 +61,3 @@ class SharedLink(BaseModel):
     def is_valid(self) -> bool:
         """Check if the link is valid (active and not expired)"""
         return self.is_active and not self.is_expired()
-    
-    def record_access(self):
-        """Record that the link was accessed (viewed)"""
-        self.access_count += 1
-        self.last_accessed_at = datetime.utcnow()
-    
-    def record_view(self):
-        """Record that the link was viewed (alias for record_access for clarity)"""
-        self.record_access()
-    
-    def record_download(self):
-        """Record that the document was downloaded"""
-        self.download_count += 1
-        self.last_downloaded_at = datetime.utcnow()
-        # Also increment access count since download implies access
-        self.access_count += 1
-        self.last_accessed_at = datetime.utcnow()
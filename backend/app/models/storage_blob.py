@@ -0,0 +1,18 @@
+"""
+Storage Blob model - reference counts of content-addressed files
+"""
+from sqlalchemy import BigInteger, Column, Integer, String, UniqueConstraint
+from app.models.base import BaseModel
+
+
+class StorageBlob(BaseModel):
+    """One stored file content (by SHA-256) and how many materials reference it"""
+    __tablename__ = "storage_blobs"
+    __table_args__ = (UniqueConstraint("sha256", name="uq_storage_blobs_sha256"),)
+
+    sha256 = Column(String(64), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<StorageBlob(sha256={self.sha256[:12]}..., ref_count={self.ref_count})>"
@@ -233,6 +233,58 @@ class MaterialResponse(MaterialBase):
         from_attributes = True
 
 
+class NearDuplicate(BaseModel):
+    """A material flagged as a near-duplicate by document text and/or embedding similarity"""
+    id: int
+    name: str
+    material_type: Optional[str] = None
+    product_name: Optional[str] = None
+    status: Optional[str] = None
+    usage_count: int = 0
+    updated_at: Optional[str] = None
+    text_similarity: Optional[float] = None
+    vector_similarity: Optional[float] = None
+
+
+class MaterialUploadResponse(MaterialResponse):
+    """Schema for upload response: the material plus duplicate warnings"""
+    warning: Optional[str] = None
+    existing_materials: Optional[List[dict]] = None
+    near_duplicates: List[NearDuplicate] = Field(default_factory=list)
+
+
+class UploadSessionCreate(BaseModel):
+    """Schema for starting a resumable upload: the file plus the POST /upload form fields"""
+    file_name: str = Field(..., min_length=1, max_length=255)
+    total_size: int = Field(..., gt=0, description="Size of the whole file in bytes")
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$", description="Expected checksum, verified on completion")
+    material_type: str
+    audience: str
+    universe_id: Optional[int] = None
+    category_id: Optional[int] = None
+    product_id: Optional[int] = None
+    product_name: Optional[str] = None
+    universe_name: Optional[str] = None
+    segment_ids: Optional[List[int]] = None
+    other_type_description: Optional[str] = None
+    freshness_date: Optional[str] = None
+    pmm_in_charge_id: Optional[int] = None
+    replace_existing: bool = False
+    send_notification: bool = False
+    status: Optional[str] = "draft"
+
+
+class UploadSessionResponse(BaseModel):
+    """Progress of a resumable upload"""
+    session_id: str
+    file_name: str
+    total_size: int
+    received_bytes: int
+    missing_ranges: List[List[int]] = Field(default_factory=list, description="Half-open [start, end) byte ranges not received yet")
+    chunk_size: int
+    expires_at: float
+
+
 class MaterialUpload(BaseModel):
     """Schema for file upload metadata"""
     material_type: str = Field(..., description="Type of material")
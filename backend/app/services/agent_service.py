@@ -18,6 +18,7 @@ from sqlalchemy import or_, and_, desc
 from app.models.user import User
 from app.models.material import Material
 from app.services.ai_service import chat_completion_with_tools
+from app.services.trigram_search import trigram_match, trigram_match_all
 from app.services.agent_tools import (
     get_tools_for_role,
     is_readonly_tool,
@@ -215,32 +216,17 @@ def _detect_share_material_intent(
     words = [w for w in mat_keywords.split() if len(w) > 2]
     if not words:
         return None
-    like_conds = [
-        or_(
-            Material.name.ilike(f"%{w}%"),
-            Material.file_name.ilike(f"%{w}%"),
-            Material.product_name.ilike(f"%{w}%"),
-        )
-        for w in words
-    ]
-    mat = db.query(Material).filter(
-        Material.status.in_(["published", "PUBLISHED"]),
-        and_(*like_conds),
-    ).order_by(desc(Material.created_at)).first()
+    columns = (Material.name, Material.file_name, Material.product_name)
+    score = trigram_match(db, mat_keywords, columns).score
+    published = db.query(Material).filter(Material.status.in_(["published", "PUBLISHED"]))
+    mat = published.filter(trigram_match_all(db, words, columns)).order_by(
+        score.desc(), desc(Material.created_at)
+    ).first()
     if not mat and len(words) > 2:
         # Fallback: try with fewer words (e.g. "Sales Deck" if "Data Platform" typo)
-        like_conds = [
-            or_(
-                Material.name.ilike(f"%{w}%"),
-                Material.file_name.ilike(f"%{w}%"),
-                Material.product_name.ilike(f"%{w}%"),
-            )
-            for w in words[:2]
-        ]
-        mat = db.query(Material).filter(
-            Material.status.in_(["published", "PUBLISHED"]),
-            and_(*like_conds),
-        ).order_by(desc(Material.created_at)).first()
+        mat = published.filter(trigram_match_all(db, words[:2], columns)).order_by(
+            score.desc(), desc(Material.created_at)
+        ).first()
     if not mat:
         return None
     return {
@@ -407,7 +393,7 @@ async def process_message(
         tc_id = tc.get("id", str(uuid.uuid4()))
 
         if is_readonly_tool(fn_name):
-            success, result_text = execute_tool(fn_name, fn_params, user, db)
+            success, result_text = await execute_tool(fn_name, fn_params, user, db)
             session.messages.append({
                 "role": "tool",
                 "tool_call_id": tc_id,
@@ -466,7 +452,7 @@ async def process_message(
                 tc_id = tc.get("id", str(uuid.uuid4()))
 
                 if is_readonly_tool(fn_name):
-                    success, result_text = execute_tool(fn_name, fn_params, user, db)
+                    success, result_text = await execute_tool(fn_name, fn_params, user, db)
                     session.messages.append({
                         "role": "tool",
                         "tool_call_id": tc_id,
@@ -528,7 +514,7 @@ async def confirm_action(
     if not pa or pa.action_id != action_id:
         return {"message": "No matching pending action found.", "session_id": session_id}
 
-    success, result_text = execute_tool(pa.tool_name, pa.parameters, user, db)
+    success, result_text = await execute_tool(pa.tool_name, pa.parameters, user, db)
 
     session.messages.append({
         "role": "tool",
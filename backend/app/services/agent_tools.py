@@ -18,6 +18,12 @@ from app.models.user import User
 from app.models.material import Material
 from app.models.material_request import MaterialRequest, MaterialRequestStatus, MaterialRequestCloseReason
 from app.models.shared_link import SharedLink
+from app.core.vector_codec import Vector
+from app.services.embedding_coverage import embedding_coverage
+from app.services.embedding_service import embed_query
+from app.services.trigram_search import trigram_match, trigram_match_all
+from app.services.material_summary import SUMMARY_FIELDS, summary_options
+from app.services.vector_index import ann_search_sql, apply_search_tuning
 
 logger = logging.getLogger(__name__)
 
@@ -568,7 +574,7 @@ def is_readonly_tool(tool_name: str) -> bool:
 # Tool executors
 # ---------------------------------------------------------------------------
 
-def execute_tool(
+async def execute_tool(
     tool_name: str,
     params: Dict[str, Any],
     user: User,
@@ -582,13 +588,19 @@ def execute_tool(
     if not executor:
         return False, f"Unknown tool: {tool_name}"
     try:
-        return executor(params, user, db)
+        return await executor(params, user, db)
     except Exception as e:
         logger.error(f"Error executing tool {tool_name}: {e}", exc_info=True)
         return False, f"Error executing {tool_name}: {str(e)}"
 
 
-def _exec_search_materials(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+_KEYWORD_COLUMNS = (
+    Material.name, Material.file_name, Material.product_name,
+    Material.universe_name, Material.description,
+)
+
+
+async def _exec_search_materials(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     query = params.get("query", "")
     mat_type = params.get("material_type")
     universe = params.get("universe_name")
@@ -597,37 +609,11 @@ def _exec_search_materials(params: Dict, user: User, db: Session) -> Tuple[bool,
     # Try semantic search first
     if query:
         try:
-            embedded_count = db.execute(
-                text("SELECT count(*) FROM materials WHERE embedding_vec IS NOT NULL")
-            ).scalar()
-            if embedded_count and embedded_count > 0:
-                import asyncio
-                from app.services.embedding_service import embed_text
-                
-                # Handle async call from sync context
-                # Check if there's a running event loop (FastAPI context)
-                try:
-                    loop = asyncio.get_running_loop()
-                    # We're in an async context - run in a thread with new event loop
-                    import concurrent.futures
-                    def run_async():
-                        new_loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(new_loop)
-                        try:
-                            return new_loop.run_until_complete(embed_text(query))
-                        finally:
-                            new_loop.close()
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(run_async)
-                        qvec = future.result(timeout=30)
-                except RuntimeError:
-                    # No event loop running - safe to use asyncio.run
-                    qvec = asyncio.run(embed_text(query))
-                
-                vec_str = "[" + ",".join(f"{v:.8f}" for v in qvec) + "]"
-
-                where_parts = ["embedding_vec IS NOT NULL", "status NOT IN ('draft', 'archived')"]
-                sql_params: Dict = {"qvec": vec_str, "lim": limit}
+            if embedding_coverage.has_vectors(db):
+                qvec = await embed_query(query)
+
+                where_parts = ["status NOT IN ('draft', 'archived')"]
+                sql_params: Dict = {"qvec": Vector(qvec)}
                 if mat_type:
                     where_parts.append("material_type ILIKE :mtype")
                     sql_params["mtype"] = f"%{mat_type}%"
@@ -635,68 +621,40 @@ def _exec_search_materials(params: Dict, user: User, db: Session) -> Tuple[bool,
                     where_parts.append("universe_name ILIKE :uni")
                     sql_params["uni"] = f"%{universe}%"
 
-                rows = db.execute(
-                    text(f"""
-                        SELECT id, 1 - (embedding_vec <=> CAST(:qvec AS vector)) AS similarity
-                        FROM materials
-                        WHERE {" AND ".join(where_parts)}
-                        ORDER BY embedding_vec <=> CAST(:qvec AS vector)
-                        LIMIT :lim
-                    """),
-                    sql_params,
-                ).fetchall()
+                sql, ann_params = ann_search_sql(SUMMARY_FIELDS, "materials", where_parts, limit)
+                sql_params.update(ann_params)
+                apply_search_tuning(db, candidates=ann_params.get("ann_candidates", 0))
+                rows = db.execute(text(sql), sql_params).fetchall()
 
                 if rows:
-                    ids = [r[0] for r in rows]
-                    materials = db.query(Material).filter(Material.id.in_(ids)).all()
-                    mat_map = {m.id: m for m in materials}
-                    lines = [f"Found {len(ids)} material(s) (semantic search):"]
-                    for row in rows:
-                        m = mat_map.get(row[0])
-                        if m:
-                            sim = round(float(row[1]) * 100, 1)
-                            lines.append(f"- ID {m.id}: \"{m.name}\" ({m.material_type or 'N/A'}) — {m.product_name or 'N/A'} [{m.universe_name or 'N/A'}] — relevance: {sim}%")
+                    lines = [f"Found {len(rows)} material(s) (semantic search):"]
+                    for m in rows:
+                        sim = round(float(m.similarity) * 100, 1)
+                        lines.append(f"- ID {m.id}: \"{m.name}\" ({m.material_type or 'N/A'}) — {m.product_name or 'N/A'} [{m.universe_name or 'N/A'}] — relevance: {sim}%")
                     return True, "\n".join(lines)
         except Exception as e:
             logger = logging.getLogger(__name__)
             logger.warning(f"Semantic search failed in agent, falling back to keyword search: {e}", exc_info=True)
 
-    # Keyword fallback
-    q = db.query(Material).filter(Material.status != "ARCHIVED")
+    # Keyword fallback, ranked by trigram similarity to the whole query
+    q = db.query(Material).options(summary_options()).filter(Material.status != "ARCHIVED")
+    order_by = [desc(Material.created_at)]
     if query:
         normalized_query = " ".join(query.split())
-        query_words = normalized_query.replace("-", " ").replace("_", " ").split()
-        normalized_nospace = normalized_query.replace(" ", "").replace("-", "").replace("_", "").lower()
-
-        word_conditions = []
-        for word in query_words:
-            if len(word) > 2:
-                wl = f"%{word}%"
-                word_conditions.append(or_(
-                    Material.name.ilike(wl), Material.file_name.ilike(wl),
-                    Material.product_name.ilike(wl), Material.universe_name.ilike(wl),
-                    Material.description.ilike(wl),
-                ))
-
-        search_filters = [
-            func.lower(func.replace(func.replace(func.replace(Material.name, ' ', ''), '-', ''), '_', '')).like(f"%{normalized_nospace}%"),
-            func.lower(func.replace(func.replace(func.replace(Material.file_name, ' ', ''), '-', ''), '_', '')).like(f"%{normalized_nospace}%"),
-        ]
-        if word_conditions:
-            search_filters.append(and_(*word_conditions))
-        simple_like = f"%{normalized_query}%"
-        search_filters.append(or_(
-            Material.name.ilike(simple_like), Material.file_name.ilike(simple_like),
-            Material.product_name.ilike(simple_like), Material.universe_name.ilike(simple_like),
-            Material.description.ilike(simple_like),
-        ))
+        query_words = [w for w in normalized_query.replace("-", " ").replace("_", " ").split() if len(w) > 2]
+
+        match = trigram_match(db, normalized_query, _KEYWORD_COLUMNS)
+        search_filters = [match.condition]
+        if query_words:
+            search_filters.append(trigram_match_all(db, query_words, _KEYWORD_COLUMNS))
         q = q.filter(or_(*search_filters))
+        order_by.insert(0, match.score.desc())
     if mat_type:
         q = q.filter(Material.material_type.ilike(f"%{mat_type}%"))
     if universe:
         q = q.filter(Material.universe_name.ilike(f"%{universe}%"))
 
-    materials = q.order_by(desc(Material.created_at)).limit(limit).all()
+    materials = q.order_by(*order_by).limit(limit).all()
     if not materials:
         return True, "No materials found matching your search."
     lines = [f"Found {len(materials)} material(s):"]
@@ -705,7 +663,7 @@ def _exec_search_materials(params: Dict, user: User, db: Session) -> Tuple[bool,
     return True, "\n".join(lines)
 
 
-def _exec_get_material_details(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_material_details(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     mid = params.get("material_id")
     mat = db.query(Material).filter(Material.id == mid).first()
     if not mat:
@@ -720,7 +678,7 @@ def _exec_get_material_details(params: Dict, user: User, db: Session) -> Tuple[b
     return True, json.dumps(info, indent=2, default=str)
 
 
-def _exec_list_my_customers(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_my_customers(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     customers = db.query(User).filter(
         and_(User.role == "customer", or_(
             User.assigned_sales_id == user.id, User.created_by_id == user.id,
@@ -748,7 +706,7 @@ def _exec_list_my_customers(params: Dict, user: User, db: Session) -> Tuple[bool
     return True, "\n".join(lines)
 
 
-def _exec_list_my_requests(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_my_requests(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     q = db.query(MaterialRequest).filter(MaterialRequest.requester_id == user.id)
     sf = params.get("status_filter")
     if sf:
@@ -766,7 +724,7 @@ def _exec_list_my_requests(params: Dict, user: User, db: Session) -> Tuple[bool,
     return True, "\n".join(lines)
 
 
-def _exec_list_shared_materials(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_shared_materials(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     links = db.query(SharedLink).filter(
         SharedLink.shared_by_user_id == user.id
     ).order_by(desc(SharedLink.created_at)).limit(20).all()
@@ -780,7 +738,7 @@ def _exec_list_shared_materials(params: Dict, user: User, db: Session) -> Tuple[
     return True, "\n".join(lines)
 
 
-def _exec_request_material_from_pmm(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_request_material_from_pmm(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     req = MaterialRequest(
         requester_id=user.id,
         material_type=params.get("material_type", "other"),
@@ -795,7 +753,7 @@ def _exec_request_material_from_pmm(params: Dict, user: User, db: Session) -> Tu
     return True, f"Material request #{req.id} created successfully (status: pending). The PMM team will be notified."
 
 
-def _exec_share_material_with_customer(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_share_material_with_customer(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     import secrets as _secrets
     mid = params.get("material_id")
     mat = None
@@ -871,7 +829,7 @@ def _exec_share_material_with_customer(params: Dict, user: User, db: Session) ->
     return True, msg
 
 
-def _exec_send_message_to_customer(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_send_message_to_customer(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     try:
         from app.models.customer_message import CustomerMessage
     except ImportError:
@@ -972,7 +930,7 @@ def _exec_send_message_to_customer(params: Dict, user: User, db: Session) -> Tup
     return True, f"Message sent to {customer.full_name} ({customer.email})."
 
 
-def _exec_list_my_sales_contacts(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_my_sales_contacts(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """List sales contacts for the current customer (users who shared materials with them)."""
     if user.role != "customer":
         return False, "This tool is only available for customers."
@@ -996,7 +954,7 @@ def _exec_list_my_sales_contacts(params: Dict, user: User, db: Session) -> Tuple
     return True, "\n".join(lines)
 
 
-def _exec_send_message_to_sales_contact(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_send_message_to_sales_contact(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Customer sends a message to their sales contact."""
     if user.role != "customer":
         return False, "This tool is only available for customers."
@@ -1030,7 +988,7 @@ def _exec_send_message_to_sales_contact(params: Dict, user: User, db: Session) -
     return True, f"Message sent to {sales.full_name} ({sales.email})."
 
 
-def _exec_list_material_requests(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_material_requests(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     q = db.query(MaterialRequest)
     if params.get("assigned_to_me"):
         q = q.filter(MaterialRequest.assigned_to_id == user.id)
@@ -1056,7 +1014,7 @@ def _exec_list_material_requests(params: Dict, user: User, db: Session) -> Tuple
     return True, "\n".join(lines)
 
 
-def _exec_acknowledge_request(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_acknowledge_request(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     rid = params.get("request_id")
     req = db.query(MaterialRequest).filter(MaterialRequest.id == rid).first()
     if not req:
@@ -1076,7 +1034,7 @@ def _exec_acknowledge_request(params: Dict, user: User, db: Session) -> Tuple[bo
     return True, f"Request #{rid} acknowledged and assigned to you.{' ETA: ' + eta if eta else ''}"
 
 
-def _exec_deliver_request(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_deliver_request(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     rid = params.get("request_id")
     req = db.query(MaterialRequest).filter(MaterialRequest.id == rid).first()
     if not req:
@@ -1092,7 +1050,7 @@ def _exec_deliver_request(params: Dict, user: User, db: Session) -> Tuple[bool,
     return True, f"Request #{rid} marked as delivered with material \"{mat.name}\" (ID {dmid})."
 
 
-def _exec_close_request(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_close_request(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     rid = params.get("request_id")
     req = db.query(MaterialRequest).filter(MaterialRequest.id == rid).first()
     if not req:
@@ -1119,7 +1077,7 @@ def _exec_close_request(params: Dict, user: User, db: Session) -> Tuple[bool, st
     return True, f"Request #{rid} closed (reason: {reason_str})."
 
 
-def _exec_reopen_request(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_reopen_request(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     rid = params.get("request_id")
     req = db.query(MaterialRequest).filter(MaterialRequest.id == rid).first()
     if not req:
@@ -1136,7 +1094,7 @@ def _exec_reopen_request(params: Dict, user: User, db: Session) -> Tuple[bool, s
     return True, f"Request #{rid} reopened (status: pending)."
 
 
-def _exec_list_pmm_users(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_pmm_users(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     pmms = db.query(User).filter(User.role == "pmm", User.is_active == True).all()
     if not pmms:
         return True, "No active PMM users found."
@@ -1150,7 +1108,7 @@ def _exec_list_pmm_users(params: Dict, user: User, db: Session) -> Tuple[bool, s
 # NEW tool executors
 # ---------------------------------------------------------------------------
 
-def _exec_check_customer_engagement(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_check_customer_engagement(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Check engagement: shared/viewed/downloaded events for a customer or material.
     Uses both SharedLink counters and MaterialUsage records for a complete picture."""
 
@@ -1225,7 +1183,7 @@ def _exec_check_customer_engagement(params: Dict, user: User, db: Session) -> Tu
     return True, "\n".join(lines)
 
 
-def _exec_get_sharing_stats(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_sharing_stats(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Get sharing overview statistics."""
     start_date = params.get("start_date")
     end_date = params.get("end_date")
@@ -1267,7 +1225,7 @@ def _exec_get_sharing_stats(params: Dict, user: User, db: Session) -> Tuple[bool
     return True, "\n".join(lines)
 
 
-def _exec_get_executive_summary(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_executive_summary(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Get or generate executive summary for a material."""
     mid = params.get("material_id")
     mat = db.query(Material).filter(Material.id == mid).first()
@@ -1278,7 +1236,7 @@ def _exec_get_executive_summary(params: Dict, user: User, db: Session) -> Tuple[
     return True, f"No executive summary available yet for \"{mat.name}\". The summary can be generated from the material detail page in the UI."
 
 
-def _exec_list_enablement_tracks(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_enablement_tracks(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     try:
         from app.models.track import Track
     except ImportError:
@@ -1296,7 +1254,7 @@ def _exec_list_enablement_tracks(params: Dict, user: User, db: Session) -> Tuple
     return True, "\n".join(lines)
 
 
-def _exec_get_track_details(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_track_details(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     try:
         from app.models.track import Track
     except ImportError:
@@ -1309,7 +1267,7 @@ def _exec_get_track_details(params: Dict, user: User, db: Session) -> Tuple[bool
     return True, json.dumps(info, indent=2, default=str)
 
 
-def _exec_list_product_releases(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_product_releases(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     try:
         from app.models.product_release import ProductRelease
     except ImportError:
@@ -1332,7 +1290,7 @@ def _exec_list_product_releases(params: Dict, user: User, db: Session) -> Tuple[
     return True, "\n".join(lines)
 
 
-def _exec_list_marketing_updates(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_marketing_updates(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     try:
         from app.models.marketing_update import MarketingUpdate
     except ImportError:
@@ -1355,7 +1313,7 @@ def _exec_list_marketing_updates(params: Dict, user: User, db: Session) -> Tuple
     return True, "\n".join(lines)
 
 
-def _exec_get_notifications(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_notifications(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     try:
         from app.models.notification import Notification, notification_recipients
     except ImportError:
@@ -1376,7 +1334,7 @@ def _exec_get_notifications(params: Dict, user: User, db: Session) -> Tuple[bool
     return True, "\n".join(lines)
 
 
-def _exec_get_dashboard_summary(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_dashboard_summary(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Summarize key dashboard metrics depending on role."""
     total_materials = db.query(Material).filter(Material.status != "ARCHIVED").count()
     published = db.query(Material).filter(Material.status.in_(["published", "PUBLISHED"])).count()
@@ -1405,7 +1363,7 @@ def _exec_get_dashboard_summary(params: Dict, user: User, db: Session) -> Tuple[
     return True, "\n".join(lines)
 
 
-def _exec_get_material_health(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_material_health(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Get material health/freshness information."""
     mid = params.get("material_id")
     if mid:
@@ -1431,7 +1389,7 @@ def _exec_get_material_health(params: Dict, user: User, db: Session) -> Tuple[bo
     return True, "\n".join(lines)
 
 
-def _exec_list_products(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_list_products(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     try:
         from app.models.product import Product, Universe, Category
     except ImportError:
@@ -1462,7 +1420,7 @@ def _exec_list_products(params: Dict, user: User, db: Session) -> Tuple[bool, st
     return True, "\n".join(lines)
 
 
-def _exec_search_by_use_case(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_search_by_use_case(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Search materials by use case, pain point, or discovery keywords."""
     keywords = params.get("keywords", "")
     use_case = params.get("use_case", "")
@@ -1491,7 +1449,7 @@ def _exec_search_by_use_case(params: Dict, user: User, db: Session) -> Tuple[boo
     return True, "\n".join(lines)
 
 
-def _exec_get_conversations(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_conversations(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Get sales message conversations."""
     try:
         from app.models.customer_message import CustomerMessage
@@ -1522,7 +1480,7 @@ def _exec_get_conversations(params: Dict, user: User, db: Session) -> Tuple[bool
     return True, "\n".join(lines)
 
 
-def _exec_get_usage_analytics(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
+async def _exec_get_usage_analytics(params: Dict, user: User, db: Session) -> Tuple[bool, str]:
     """Get material usage analytics."""
     from app.models.usage import MaterialUsage, UsageAction
     days = params.get("days", 30)
@@ -5,6 +5,7 @@ import httpx
 import logging
 from typing import Optional, List, Dict, Any
 from app.core.config import settings
+from app.services.http_client import ai_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -55,35 +56,35 @@ async def chat_completion(
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.post(
-                settings.OVH_AI_ENDPOINT_URL,
-                json=payload,
-                headers=headers
-            )
-
-            if response.status_code == 200:
-                content_type = response.headers.get("content-type", "").lower()
-                if "application/json" not in content_type:
-                    logger.error(f"Unexpected content type: {content_type}")
-                    return None
+        response = await ai_http_client.post(
+            "chat",
+            settings.OVH_AI_ENDPOINT_URL,
+            json=payload,
+            headers=headers
+        )
+
+        if response.status_code == 200:
+            content_type = response.headers.get("content-type", "").lower()
+            if "application/json" not in content_type:
+                logger.error(f"Unexpected content type: {content_type}")
+                return None
 
-                try:
-                    result = response.json()
-                except Exception as e:
-                    logger.error(f"Failed to parse JSON: {str(e)}")
-                    return None
+            try:
+                result = response.json()
+            except Exception as e:
+                logger.error(f"Failed to parse JSON: {str(e)}")
+                return None
 
-                if "choices" in result and len(result["choices"]) > 0:
-                    choice = result["choices"][0]
-                    message = choice.get("message", {})
-                    content = message.get("content", "").strip()
-                    if content:
-                        return content
-                elif "text" in result:
-                    return result.get("text", "").strip()
-            else:
-                logger.error(f"AI endpoint returned status {response.status_code}")
+            if "choices" in result and len(result["choices"]) > 0:
+                choice = result["choices"][0]
+                message = choice.get("message", {})
+                content = message.get("content", "").strip()
+                if content:
+                    return content
+            elif "text" in result:
+                return result.get("text", "").strip()
+        else:
+            logger.error(f"AI endpoint returned status {response.status_code}")
 
     except httpx.TimeoutException:
         logger.error("Timeout while calling OVHcloud AI Endpoint")
@@ -149,29 +150,29 @@ async def chat_completion_with_tools(
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
-            response = await client.post(
-                settings.OVH_AI_ENDPOINT_URL,
-                json=payload,
-                headers=headers,
-            )
-
-            if response.status_code == 200:
-                content_type = response.headers.get("content-type", "").lower()
-                if "application/json" not in content_type:
-                    logger.error(f"Unexpected content type from AI: {content_type}")
-                    return None
+        response = await ai_http_client.post(
+            "chat_tools",
+            settings.OVH_AI_ENDPOINT_URL,
+            json=payload,
+            headers=headers,
+        )
+
+        if response.status_code == 200:
+            content_type = response.headers.get("content-type", "").lower()
+            if "application/json" not in content_type:
+                logger.error(f"Unexpected content type from AI: {content_type}")
+                return None
 
-                try:
-                    result = response.json()
-                except Exception as e:
-                    logger.error(f"Failed to parse JSON: {str(e)}")
-                    return None
+            try:
+                result = response.json()
+            except Exception as e:
+                logger.error(f"Failed to parse JSON: {str(e)}")
+                return None
 
-                if "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0].get("message")
-            else:
-                logger.error(f"AI endpoint returned status {response.status_code}: {response.text[:500]}")
+            if "choices" in result and len(result["choices"]) > 0:
+                return result["choices"][0].get("message")
+        else:
+            logger.error(f"AI endpoint returned status {response.status_code}: {response.text[:500]}")
 
     except httpx.TimeoutException:
         logger.error("Timeout while calling OVHcloud AI Endpoint (tools)")
@@ -262,88 +263,87 @@ Executive Summary:"""
             "Content-Type": "application/json"
         }
         
-        # Follow redirects and set timeout
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            try:
-                response = await client.post(
-                    settings.OVH_AI_ENDPOINT_URL,
-                    json=payload,
-                    headers=headers
-                )
-            except httpx.TimeoutException:
-                logger.error("Timeout (30s) while calling OVHcloud AI Endpoint")
-                return None
-            except httpx.RequestError as e:
-                logger.error(f"Request error while calling OVHcloud AI Endpoint: {str(e)}")
+        try:
+            response = await ai_http_client.post(
+                "summary",
+                settings.OVH_AI_ENDPOINT_URL,
+                json=payload,
+                headers=headers
+            )
+        except httpx.TimeoutException:
+            logger.error("Timeout (30s) while calling OVHcloud AI Endpoint")
+            return None
+        except httpx.RequestError as e:
+            logger.error(f"Request error while calling OVHcloud AI Endpoint: {str(e)}")
+            return None
+        
+        # Log response details for debugging
+        print(f"[DEBUG] AI endpoint response status: {response.status_code}", flush=True)
+        print(f"[DEBUG] Response URL after redirects: {response.url}", flush=True)
+        logger.info(f"AI endpoint response status: {response.status_code}")
+        logger.info(f"Final response URL: {response.url}")
+        logger.info(f"AI endpoint response headers: {dict(response.headers)}")
+        
+        if response.status_code == 200:
+            # Check if response is JSON
+            content_type = response.headers.get("content-type", "").lower()
+            if "application/json" not in content_type:
+                logger.error(f"Unexpected content type: {content_type}")
+                logger.error(f"Response URL: {response.url}")
+                logger.error(f"Response preview (first 500 chars): {response.text[:500]}")
+                print(f"[ERROR] AI endpoint returned HTML instead of JSON. Status: {response.status_code}, URL: {response.url}", flush=True)
                 return None
             
-            # Log response details for debugging
-            print(f"[DEBUG] AI endpoint response status: {response.status_code}", flush=True)
-            print(f"[DEBUG] Response URL after redirects: {response.url}", flush=True)
-            logger.info(f"AI endpoint response status: {response.status_code}")
-            logger.info(f"Final response URL: {response.url}")
-            logger.info(f"AI endpoint response headers: {dict(response.headers)}")
+            try:
+                result = response.json()
+            except Exception as e:
+                logger.error(f"Failed to parse JSON response: {str(e)}. Response preview: {response.text[:500]}")
+                return None
             
-            if response.status_code == 200:
-                # Check if response is JSON
-                content_type = response.headers.get("content-type", "").lower()
-                if "application/json" not in content_type:
-                    logger.error(f"Unexpected content type: {content_type}")
-                    logger.error(f"Response URL: {response.url}")
-                    logger.error(f"Response preview (first 500 chars): {response.text[:500]}")
-                    print(f"[ERROR] AI endpoint returned HTML instead of JSON. Status: {response.status_code}, URL: {response.url}", flush=True)
-                    return None
-                
-                try:
-                    result = response.json()
-                except Exception as e:
-                    logger.error(f"Failed to parse JSON response: {str(e)}. Response preview: {response.text[:500]}")
-                    return None
+            # Extract the summary from the response
+            # OVHcloud AI Endpoint uses OpenAI-compatible format: {"choices": [{"message": {"content": "..."}}]}
+            if "choices" in result and len(result["choices"]) > 0:
+                choice = result["choices"][0]
+                # Handle both OpenAI format and direct content format
+                if "message" in choice:
+                    message = choice.get("message", {})
+                    summary = message.get("content", "").strip()
+                elif "text" in choice:
+                    summary = choice.get("text", "").strip()
+                else:
+                    # Try direct content field
+                    summary = choice.get("content", "").strip()
                 
-                # Extract the summary from the response
-                # OVHcloud AI Endpoint uses OpenAI-compatible format: {"choices": [{"message": {"content": "..."}}]}
-                if "choices" in result and len(result["choices"]) > 0:
-                    choice = result["choices"][0]
-                    # Handle both OpenAI format and direct content format
-                    if "message" in choice:
-                        message = choice.get("message", {})
-                        summary = message.get("content", "").strip()
-                    elif "text" in choice:
-                        summary = choice.get("text", "").strip()
-                    else:
-                        # Try direct content field
-                        summary = choice.get("content", "").strip()
-                    
-                    if summary:
-                        logger.info(f"Successfully generated executive summary for material: {material_name}")
-                        return summary
-                    else:
-                        logger.warning("AI response did not contain summary content")
-                elif "text" in result:
-                    # Direct text response format
-                    summary = result.get("text", "").strip()
-                    if summary:
-                        logger.info(f"Successfully generated executive summary for material: {material_name}")
-                        return summary
+                if summary:
+                    logger.info(f"Successfully generated executive summary for material: {material_name}")
+                    return summary
                 else:
-                    logger.warning(f"Unexpected AI response format: {result}")
-            elif response.status_code == 301 or response.status_code == 302:
-                redirect_location = response.headers.get('Location', 'Not provided')
-                logger.error(f"AI endpoint returned redirect ({response.status_code})")
-                logger.error(f"Original URL: {settings.OVH_AI_ENDPOINT_URL}")
-                logger.error(f"Redirect location: {redirect_location}")
-                print(f"[ERROR] Endpoint URL is incorrect - got redirect {response.status_code} to: {redirect_location}", flush=True)
-                print(f"[ERROR] The endpoint URL '{settings.OVH_AI_ENDPOINT_URL}' appears to be incorrect.", flush=True)
-                print(f"[ERROR] OVHcloud AI Endpoints require a specific endpoint URL format.", flush=True)
-                print(f"[ERROR] Please check your OVHcloud console for the correct endpoint URL.", flush=True)
+                    logger.warning("AI response did not contain summary content")
+            elif "text" in result:
+                # Direct text response format
+                summary = result.get("text", "").strip()
+                if summary:
+                    logger.info(f"Successfully generated executive summary for material: {material_name}")
+                    return summary
             else:
-                logger.error(f"AI endpoint returned status {response.status_code}")
-                logger.error(f"Request URL: {response.url}")
-                logger.error(f"Response headers: {dict(response.headers)}")
-                logger.error(f"Response content type: {response.headers.get('content-type', 'unknown')}")
-                logger.error(f"Response preview (first 500 chars): {response.text[:500]}")
-                print(f"[ERROR] AI endpoint status {response.status_code}. Response type: {response.headers.get('content-type', 'unknown')}", flush=True)
-                
+                logger.warning(f"Unexpected AI response format: {result}")
+        elif response.status_code == 301 or response.status_code == 302:
+            redirect_location = response.headers.get('Location', 'Not provided')
+            logger.error(f"AI endpoint returned redirect ({response.status_code})")
+            logger.error(f"Original URL: {settings.OVH_AI_ENDPOINT_URL}")
+            logger.error(f"Redirect location: {redirect_location}")
+            print(f"[ERROR] Endpoint URL is incorrect - got redirect {response.status_code} to: {redirect_location}", flush=True)
+            print(f"[ERROR] The endpoint URL '{settings.OVH_AI_ENDPOINT_URL}' appears to be incorrect.", flush=True)
+            print(f"[ERROR] OVHcloud AI Endpoints require a specific endpoint URL format.", flush=True)
+            print(f"[ERROR] Please check your OVHcloud console for the correct endpoint URL.", flush=True)
+        else:
+            logger.error(f"AI endpoint returned status {response.status_code}")
+            logger.error(f"Request URL: {response.url}")
+            logger.error(f"Response headers: {dict(response.headers)}")
+            logger.error(f"Response content type: {response.headers.get('content-type', 'unknown')}")
+            logger.error(f"Response preview (first 500 chars): {response.text[:500]}")
+            print(f"[ERROR] AI endpoint status {response.status_code}. Response type: {response.headers.get('content-type', 'unknown')}", flush=True)
+            
     except httpx.TimeoutException:
         logger.error("Timeout while calling OVHcloud AI Endpoint")
     except httpx.RequestError as e:
@@ -0,0 +1,189 @@
+"""
+Content-addressed blob backends.
+
+Uploaded files are stored once per distinct content, keyed by SHA-256 and
+sharded by the first two byte pairs of the hash:
+
+    blobs/3f/a9/3fa9c0...e1
+
+The same deck uploaded for two products is one blob, and renaming or
+re-categorising a material never moves a file. Materials reference blobs by
+that relative key in Material.file_path; StorageService keeps a reference count
+per blob in storage_blobs and deletes the object when the last material
+referencing it goes away.
+
+STORAGE_TYPE selects the backend:
+
+    local   blobs live under STORAGE_PATH (default)
+    s3      blobs live in an S3-compatible bucket (AWS, MinIO, OVH, ...);
+            files are served and extracted from a read-through cache under
+            STORAGE_PATH/.blob_cache
+"""
+import logging
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blobs"
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound"}
+
+
+def blob_key(sha256: str) -> str:
+    """Sharded relative key of a blob, e.g. blobs/3f/a9/3fa9..."""
+    sha256 = sha256.lower()
+    if not _SHA256.match(sha256):
+        raise ValueError(f"Not a SHA-256 hex digest: {sha256!r}")
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def blob_sha256(relative_path: Optional[str]) -> Optional[str]:
+    """The hash of a blob key, or None for legacy folder-based paths."""
+    if not relative_path:
+        return None
+    parts = relative_path.replace("\\", "/").split("/")
+    if len(parts) == 4 and parts[0] == BLOB_PREFIX and _SHA256.match(parts[3]) \
+            and parts[1] == parts[3][:2] and parts[2] == parts[3][2:4]:
+        return parts[3]
+    return None
+
+
+class BlobBackend(ABC):
+    """
+    Where blob bytes live. Keys are the relative paths returned by blob_key().
+    Methods may block on network I/O; call them from a threadpool in async code.
+    """
+
+    @abstractmethod
+    def put(self, key: str, source: Path) -> None:
+        """Store `source` under `key`, consuming the file. No-op upload if the blob already exists."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def local_path(self, key: str) -> Path:
+        """A local file with the blob's bytes, for FileResponse and text extraction."""
+
+
+class LocalBlobBackend(BlobBackend):
+    """Blobs as files under `root` (STORAGE_PATH)."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def put(self, key: str, source: Path) -> None:
+        target = self.root / key
+        if target.exists():
+            source.unlink(missing_ok=True)
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).exists()
+
+    def delete(self, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+
+class S3BlobBackend(BlobBackend):
+    """
+    Blobs as objects in an S3-compatible bucket, with a local read-through cache.
+
+    `client` is a boto3 S3 client (or anything with the same upload_file /
+    download_file / head_object / delete_object methods); one is created from
+    the S3_* settings when omitted. Uploads use boto3's managed multipart
+    transfer, so large files are never held in memory.
+    """
+
+    def __init__(self, bucket: str, cache_dir: Path, prefix: str = "", client=None):
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self.prefix = prefix.strip("/")
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("STORAGE_TYPE=s3 requires the boto3 package") from e
+            from app.core.config import settings
+
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=settings.S3_ENDPOINT_URL or None,
+                region_name=settings.S3_REGION or None,
+                aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+                aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+            )
+        return self._client
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, source: Path) -> None:
+        if not self.exists(key):
+            self.client.upload_file(str(source), self.bucket, self._object_key(key))
+        # Keep the bytes we already have as the cached copy
+        cached = self.cache_dir / key
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, cached)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except Exception as e:
+            code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+            if code in _NOT_FOUND_CODES:
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        (self.cache_dir / key).unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> Path:
+        cached = self.cache_dir / key
+        if not cached.exists():
+            # Download next to the final name and rename, so readers never see a partial file
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(prefix=".fetch-", dir=cached.parent)
+            os.close(fd)
+            try:
+                self.client.download_file(self.bucket, self._object_key(key), temp_name)
+                os.replace(temp_name, cached)
+            except BaseException:
+                Path(temp_name).unlink(missing_ok=True)
+                raise
+        return cached
+
+
+def create_backend(storage_type: str, storage_path: Path) -> BlobBackend:
+    """The backend selected by STORAGE_TYPE."""
+    from app.core.config import settings
+
+    storage_type = (storage_type or "local").lower()
+    if storage_type == "local":
+        return LocalBlobBackend(storage_path)
+    if storage_type == "s3":
+        if not settings.S3_BUCKET:
+            raise ValueError("STORAGE_TYPE=s3 requires S3_BUCKET")
+        return S3BlobBackend(settings.S3_BUCKET, storage_path / ".blob_cache", prefix=settings.S3_PREFIX)
+    raise ValueError(f"Unknown STORAGE_TYPE {storage_type!r}; expected 'local' or 's3'")
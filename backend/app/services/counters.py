@@ -0,0 +1,119 @@
+"""
+Atomic usage counters and their reconciliation from material_usage.
+
+The denormalised counters below used to be bumped with ORM read-modify-write
+(`link.access_count += 1; db.commit()`), which loses increments when two
+requests hit the same row and keeps its row lock for the rest of the request.
+They are now only ever changed with
+
+    UPDATE <table> SET <counter> = COALESCE(<counter>, 0) + :n WHERE id = :id
+
+summed in memory by the usage ingester and applied per flush
+(`apply_increments`).
+
+`reconcile_counters` recomputes them from the material_usage event log, for
+drift left by crashes, dropped buffered increments or the old code:
+
+    materials.usage_count        downloads, plus deal-room views
+    shared_links.download_count  downloads through the link
+    shared_links.access_count    views and downloads through the link
+
+deal_rooms.access_count counts room page opens, which are not usage events,
+so it has no source to be recomputed from and is left alone. Link views from
+bots were counted in access_count but never logged, so reconciling drops them.
+
+Table and column names are interpolated into SQL; only the ones listed in
+COUNTER_COLUMNS / TIMESTAMP_COLUMNS are accepted.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+COUNTER_COLUMNS = {
+    "materials": ("usage_count",),
+    "shared_links": ("access_count", "download_count"),
+    "deal_rooms": ("access_count",),
+}
+TIMESTAMP_COLUMNS = {
+    "materials": ("last_updated",),
+    "shared_links": ("last_accessed_at", "last_downloaded_at"),
+    "deal_rooms": ("last_accessed_at",),
+}
+
+RowKey = Tuple[str, int]
+
+# Counter -> its value recomputed from material_usage, correlated on the counter's row
+RECONCILE_COUNTS = {
+    ("materials", "usage_count"): """
+        SELECT COUNT(*) FROM material_usage u WHERE u.material_id = materials.id
+        AND (u.action = 'download' OR (u.action = 'view' AND u.deal_room_id IS NOT NULL))
+    """,
+    ("shared_links", "download_count"): """
+        SELECT COUNT(*) FROM material_usage u WHERE u.shared_link_id = shared_links.id
+        AND u.action = 'download'
+    """,
+    ("shared_links", "access_count"): """
+        SELECT COUNT(*) FROM material_usage u WHERE u.shared_link_id = shared_links.id
+        AND u.action IN ('view', 'download')
+    """,
+}
+
+
+def validate(table: str, counters=(), timestamps=()) -> None:
+    for column in counters:
+        if column not in COUNTER_COLUMNS.get(table, ()):
+            raise ValueError(f"{table}.{column} is not a usage counter")
+    for column in timestamps:
+        if column not in TIMESTAMP_COLUMNS.get(table, ()):
+            raise ValueError(f"{table}.{column} is not a usage timestamp")
+
+
+def apply_increments(
+    db: Session,
+    counters: Mapping[RowKey, Mapping[str, int]],
+    timestamps: Mapping[RowKey, Mapping[str, datetime]] = {},
+) -> None:
+    """
+    Add per-row counter deltas and set last_* timestamps, one executemany
+    UPDATE per (table, columns) shape. Does not commit.
+    """
+    grouped: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for (table, row_id), columns in counters.items():
+        stamps = timestamps.get((table, row_id), {})
+        validate(table, columns, stamps)
+        shape = (table, tuple(sorted(columns)), tuple(sorted(stamps)))
+        grouped[shape].append({"row_id": row_id, **columns, **stamps})
+    for (table, columns, stamps), params in grouped.items():
+        assignments = [f"{c} = COALESCE({c}, 0) + :{c}" for c in columns]
+        assignments += [f"{c} = :{c}" for c in stamps]
+        db.execute(text(f"UPDATE {table} SET {', '.join(assignments)} WHERE id = :row_id"), params)
+
+
+def reconcile_counters(db: Session, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Set every counter in RECONCILE_COUNTS to its count in material_usage.
+    Each counter is fixed with one correlated UPDATE rather than read into
+    Python and written back, so concurrent increments are not overwritten
+    with stale values. Returns the number of rows corrected per
+    "table.column" (with dry_run, the number that would be). Commits unless
+    dry_run.
+    """
+    corrected: Dict[str, int] = {}
+    for (table, column), count in RECONCILE_COUNTS.items():
+        drifted = f"COALESCE({column}, -1) <> ({count})"
+        if dry_run:
+            rows = db.execute(text(f"SELECT COUNT(*) FROM {table} WHERE {drifted}")).scalar()
+        else:
+            rows = db.execute(text(f"UPDATE {table} SET {column} = ({count}) WHERE {drifted}")).rowcount
+        corrected[f"{table}.{column}"] = rows
+        if rows:
+            logger.info("%s.%s: %d rows %s", table, column, rows, "drifted" if dry_run else "reconciled")
+    if not dry_run:
+        db.commit()
+    return corrected
@@ -0,0 +1,310 @@
+"""
+Near-duplicate detection for materials.
+
+Two independent signals flag near-duplicates across the whole catalog:
+
+- Document text: each uploaded document's extracted text is cut into word
+  shingles (DEDUP_SHINGLE_WORDS) and summarised by a MinHash signature
+  (DEDUP_MINHASH_PERMUTATIONS). The fraction of equal signature slots
+  estimates the Jaccard similarity of two documents' shingle sets. Signatures
+  are split into DEDUP_LSH_BANDS bands and each band is hashed to a bucket;
+  materials sharing any (band, bucket) are candidates, found through the
+  (band, bucket) index rather than by comparing every pair.
+- Embeddings: the cached "more like this" lists (material_neighbors) give
+  every material's nearest neighbours by stored vector.
+
+Pairs above DEDUP_TEXT_THRESHOLD or DEDUP_VECTOR_THRESHOLD are near-duplicates.
+Fingerprints are computed at upload and by the embedding pipeline's document
+jobs, and only rebuilt when the text or MinHash parameters change.
+"""
+import hashlib
+import logging
+import re
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.material import Material
+from app.models.material_fingerprint import MaterialFingerprint, MaterialLshBucket
+from app.services.file_extraction import extract_pages_from_file
+from app.services.material_chunks import is_chunkable
+from app.services.material_neighbors import close_pairs, neighbor_scores
+from app.services.material_summary import load_summaries, status_value
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_BLOCK_SHINGLES = 4096
+_WORD = re.compile(r"\w+")
+
+
+# -- signatures ----------------------------------------------------------
+
+def shingle_hashes(body: str, size: int) -> np.ndarray:
+    """32-bit hashes of the distinct `size`-word shingles of normalised text."""
+    words = _WORD.findall(body.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    size = max(1, min(size, len(words)))
+    hashes = {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+@lru_cache(maxsize=4)
+def _permutations(count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Fixed (a, b) of the hash family (a*x + b) mod p; derived from hashes so stored signatures stay comparable."""
+    def draw(label: str, i: int) -> int:
+        digest = hashlib.blake2b(f"{label}{i}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % (int(_MERSENNE_PRIME) - 1) + 1
+
+    a = np.array([draw("a", i) for i in range(count)], dtype=np.uint64)
+    b = np.array([draw("b", i) for i in range(count)], dtype=np.uint64)
+    return a, b
+
+
+def minhash_signature(hashes: np.ndarray, permutations: int) -> np.ndarray:
+    """Minimum of each permuted hash over the shingle set, as uint32."""
+    a, b = _permutations(permutations)
+    signature = np.full(permutations, _MAX_HASH, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for start in range(0, len(hashes), _BLOCK_SHINGLES):
+            block = hashes[start:start + _BLOCK_SHINGLES, None]
+            permuted = ((block * a + b) % _MERSENNE_PRIME) & _MAX_HASH
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def lsh_buckets(signature: np.ndarray, bands: int) -> List[Tuple[int, int]]:
+    """(band, signed 64-bit bucket) per band of the signature."""
+    rows = len(signature) // bands
+    return [
+        (band, int.from_bytes(
+            hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            "little", signed=True,
+        ))
+        for band in range(bands)
+    ]
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    if len(a) != len(b) or not len(a):
+        return 0.0
+    return float(np.mean(a == b))
+
+
+def _decode(signature: bytes) -> np.ndarray:
+    return np.frombuffer(signature, dtype="<u4")
+
+
+def _minhash_params() -> Tuple[int, int, int]:
+    permutations = settings.DEDUP_MINHASH_PERMUTATIONS
+    bands = settings.DEDUP_LSH_BANDS
+    if bands <= 0 or permutations % bands:
+        raise ValueError("DEDUP_MINHASH_PERMUTATIONS must be a positive multiple of DEDUP_LSH_BANDS")
+    return settings.DEDUP_SHINGLE_WORDS, permutations, bands
+
+
+# -- fingerprints ----------------------------------------------------------
+
+def store_fingerprint(db: Session, material_id: int, body: str) -> bool:
+    """Stage a material's signature and LSH buckets. Returns False if unchanged or empty; caller commits."""
+    shingle, permutations, bands = _minhash_params()
+    digest = hashlib.sha256(f"{shingle}/{permutations}/{bands}\n{body}".encode("utf-8")).hexdigest()
+    current = db.query(MaterialFingerprint).filter(MaterialFingerprint.material_id == material_id).first()
+    if current is not None and current.source_hash == digest:
+        return False
+    hashes = shingle_hashes(body, shingle)
+    if not len(hashes):
+        return False
+
+    signature = minhash_signature(hashes, permutations)
+    if current is None:
+        current = MaterialFingerprint(material_id=material_id)
+        db.add(current)
+    current.source_hash = digest
+    current.signature = signature.astype("<u4").tobytes()
+    current.shingle_count = len(hashes)
+
+    db.query(MaterialLshBucket).filter(MaterialLshBucket.material_id == material_id).delete(
+        synchronize_session=False
+    )
+    db.add_all(
+        MaterialLshBucket(material_id=material_id, band=band, bucket=bucket)
+        for band, bucket in lsh_buckets(signature, bands)
+    )
+    return True
+
+
+async def fingerprint_material(
+    material: Material,
+    db: Session,
+    pages: Optional[Sequence[Tuple[str, str]]] = None,
+) -> bool:
+    """(Re)fingerprint a material's document; `pages` avoids a second extraction when the caller has them."""
+    if not is_chunkable(material):
+        return False
+    if pages is None:
+        pages = await extract_pages_from_file(
+            await run_in_threadpool(storage_service.get_file_path, material.file_path), material.file_format
+        )
+    if not pages:
+        return False
+    changed = store_fingerprint(db, material.id, "\n".join(body for _, body in pages))
+    if changed:
+        db.commit()
+    return changed
+
+
+# -- lookups ---------------------------------------------------------------
+
+def _signatures(db: Session, material_ids: Iterable[int]) -> Dict[int, np.ndarray]:
+    ids = list(material_ids)
+    if not ids:
+        return {}
+    rows = db.query(MaterialFingerprint.material_id, MaterialFingerprint.signature).filter(
+        MaterialFingerprint.material_id.in_(ids)
+    ).all()
+    return {r[0]: _decode(r[1]) for r in rows}
+
+
+def text_duplicates(db: Session, material_id: int, threshold: float) -> Dict[int, float]:
+    """Materials whose document text is at least `threshold` similar (estimated Jaccard)."""
+    candidates = [r[0] for r in db.execute(text("""
+        SELECT DISTINCT other.material_id
+        FROM material_lsh_buckets own
+        JOIN material_lsh_buckets other
+          ON other.band = own.band AND other.bucket = own.bucket AND other.material_id <> own.material_id
+        WHERE own.material_id = :mid
+    """), {"mid": material_id})]
+    if not candidates:
+        return {}
+    signatures = _signatures(db, [material_id, *candidates])
+    own = signatures.get(material_id)
+    if own is None:
+        return {}
+    scores = {mid: estimated_jaccard(own, sig) for mid, sig in signatures.items() if mid != material_id}
+    return {mid: score for mid, score in scores.items() if score >= threshold}
+
+
+def _member(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "material_type": row.material_type,
+        "product_name": row.product_name,
+        "status": status_value(row.status),
+        "usage_count": row.usage_count or 0,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+
+def find_near_duplicates(db: Session, material_id: int, include_archived: bool = False) -> List[Dict[str, Any]]:
+    """Near-duplicates of one material by document text and by embedding, most similar first."""
+    by_text = text_duplicates(db, material_id, settings.DEDUP_TEXT_THRESHOLD)
+    by_vector = dict(neighbor_scores(db, material_id, settings.DEDUP_VECTOR_THRESHOLD))
+    summaries = load_summaries(db, set(by_text) | set(by_vector))
+
+    results = []
+    for mid, row in summaries.items():
+        if not include_archived and status_value(row.status) == "archived":
+            continue
+        results.append({
+            **_member(row),
+            "text_similarity": round(by_text[mid], 4) if mid in by_text else None,
+            "vector_similarity": round(by_vector[mid], 4) if mid in by_vector else None,
+        })
+    results.sort(key=lambda r: max(r["text_similarity"] or 0.0, r["vector_similarity"] or 0.0), reverse=True)
+    return results
+
+
+def _text_pairs(db: Session, threshold: float) -> Dict[Tuple[int, int], float]:
+    """Every candidate pair sharing an LSH bucket, verified against the signatures."""
+    pairs = [(r[0], r[1]) for r in db.execute(text("""
+        SELECT DISTINCT a.material_id, b.material_id
+        FROM material_lsh_buckets a
+        JOIN material_lsh_buckets b
+          ON b.band = a.band AND b.bucket = a.bucket AND b.material_id > a.material_id
+    """))]
+    signatures = _signatures(db, {mid for pair in pairs for mid in pair})
+    verified = {}
+    for a, b in pairs:
+        if a in signatures and b in signatures:
+            score = estimated_jaccard(signatures[a], signatures[b])
+            if score >= threshold:
+                verified[(a, b)] = score
+    return verified
+
+
+def _clusters(pairs: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    """Connected components of the duplicate graph (union-find)."""
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        parent[find(a)] = find(b)
+    groups: Dict[int, List[int]] = {}
+    for x in list(parent):
+        groups.setdefault(find(x), []).append(x)
+    return [sorted(g) for g in groups.values()]
+
+
+def duplicate_report(db: Session, include_archived: bool = False) -> Dict[str, Any]:
+    """
+    Groups of near-duplicate materials across the catalog. Each group suggests
+    keeping its most used, then most recently updated, member and archiving the rest.
+    """
+    text_pairs = _text_pairs(db, settings.DEDUP_TEXT_THRESHOLD)
+    vector_pairs = {(a, b): score for a, b, score in close_pairs(db, settings.DEDUP_VECTOR_THRESHOLD)}
+
+    summaries = load_summaries(db, {mid for pair in (*text_pairs, *vector_pairs) for mid in pair})
+    visible = {
+        mid for mid, row in summaries.items()
+        if include_archived or status_value(row.status) != "archived"
+    }
+    edges = [pair for pair in {*text_pairs, *vector_pairs} if pair[0] in visible and pair[1] in visible]
+
+    groups = []
+    for members in _clusters(edges):
+        rows = [summaries[mid] for mid in members]
+        keep = max(rows, key=lambda r: (r.usage_count or 0, r.updated_at or datetime.min))
+        member_ids = set(members)
+        groups.append({
+            "size": len(rows),
+            "suggested_keep_id": keep.id,
+            "archive_candidate_ids": [r.id for r in rows if r.id != keep.id],
+            "members": [_member(r) for r in rows],
+            "pairs": [
+                {
+                    "material_ids": [a, b],
+                    "text_similarity": round(text_pairs[(a, b)], 4) if (a, b) in text_pairs else None,
+                    "vector_similarity": round(vector_pairs[(a, b)], 4) if (a, b) in vector_pairs else None,
+                }
+                for a, b in sorted(edges) if a in member_ids
+            ],
+        })
+    groups.sort(key=lambda g: g["size"], reverse=True)
+    return {
+        "text_threshold": settings.DEDUP_TEXT_THRESHOLD,
+        "vector_threshold": settings.DEDUP_VECTOR_THRESHOLD,
+        "group_count": len(groups),
+        "duplicate_count": sum(len(g["archive_candidate_ids"]) for g in groups),
+        "groups": groups,
+    }
@@ -0,0 +1,109 @@
+"""
+Embedding coverage tracker.
+
+Keeps an in-process view of how many materials have a pgvector embedding so
+search endpoints can choose between vector and full-text mode without running
+a count(*) over materials on every request.
+
+The state is updated by the code paths that write vectors or create/delete
+materials, and re-synced from the database at most every
+EMBEDDING_COVERAGE_REFRESH_SECONDS to pick up writes made by other workers or
+by scripts such as scripts/regenerate_embeddings.py.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCoverage:
+    """Counts of materials vs. materials with a populated embedding_vec."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.total = 0
+        self.vector_available = True
+        self._embedded_ids: Set[int] = set()
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    # -- database sync -----------------------------------------------------
+
+    def refresh(self, db: Session) -> None:
+        """Reload coverage from the database."""
+        try:
+            total = db.execute(text("SELECT count(*) FROM materials")).scalar() or 0
+            embedded_ids = {
+                row[0]
+                for row in db.execute(
+                    text("SELECT id FROM materials WHERE embedding_vec IS NOT NULL")
+                ).fetchall()
+            }
+            vector_available = True
+        except Exception as e:
+            # embedding_vec is missing when the pgvector migration was never applied
+            logger.warning("Could not read embedding coverage, assuming no vectors: %s", e)
+            db.rollback()
+            total = self.total
+            embedded_ids = set()
+            vector_available = False
+
+        with self._lock:
+            self.total = total
+            self._embedded_ids = embedded_ids
+            self.vector_available = vector_available
+            self._refreshed_at = time.monotonic()
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Refresh only if the cached state is missing or older than the refresh interval."""
+        refreshed_at = self._refreshed_at
+        if refreshed_at is None or time.monotonic() - refreshed_at > self.refresh_seconds:
+            self.refresh(db)
+
+    # -- write hooks -------------------------------------------------------
+
+    def mark_created(self, material_id: int) -> None:
+        with self._lock:
+            self.total += 1
+
+    def mark_deleted(self, material_id: int) -> None:
+        with self._lock:
+            self.total = max(self.total - 1, 0)
+            self._embedded_ids.discard(material_id)
+
+    def mark_embedded(self, material_id: int) -> None:
+        with self._lock:
+            self._embedded_ids.add(material_id)
+
+    # -- reads -------------------------------------------------------------
+
+    @property
+    def embedded(self) -> int:
+        return len(self._embedded_ids)
+
+    def has_vectors(self, db: Session) -> bool:
+        """True when vector search can return anything; the search-mode decision."""
+        self.ensure_fresh(db)
+        return self.vector_available and self.embedded > 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            embedded = len(self._embedded_ids)
+            age = time.monotonic() - self._refreshed_at if self._refreshed_at is not None else None
+            return {
+                "vector_available": self.vector_available,
+                "total_materials": self.total,
+                "vector_embedded": embedded,
+                "vector_coverage_ratio": round(embedded / self.total, 4) if self.total else 0.0,
+                "seconds_since_refresh": round(age, 1) if age is not None else None,
+            }
+
+
+embedding_coverage = EmbeddingCoverage(refresh_seconds=settings.EMBEDDING_COVERAGE_REFRESH_SECONDS)
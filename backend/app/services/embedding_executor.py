@@ -0,0 +1,126 @@
+"""
+Off-loop executor for local (fastembed / ONNX) embedding inference.
+
+Inference runs on a dedicated thread pool - onnxruntime releases the GIL, so
+threads give real parallelism without loading a model copy per process - and
+the event loop stays free for downloads, share links and everything else.
+
+Concurrent single-text requests (search queries) are micro-batched: they are
+held for at most `max_wait_ms` or until `max_batch` texts are queued, then
+embedded with one model call and fanned back out to their callers.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingExecutor:
+    """Thread-pool embedding runner with micro-batching of single-text calls."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        warmup_fn: Optional[Callable[[], Any]] = None,
+        workers: int = 2,
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.embed_fn = embed_fn
+        self.warmup_fn = warmup_fn
+        self.workers = max(1, workers)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embedding")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self._warmup: Optional[asyncio.Future] = None
+        self.calls = 0
+        self.batched_texts = 0
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self, preload: bool = True) -> None:
+        """Bind to the running loop and load the model in the background."""
+        self._loop = asyncio.get_running_loop()
+        if preload and self.warmup_fn is not None and self._warmup is None:
+            self._warmup = self._loop.run_in_executor(self._pool, self.warmup_fn)
+            self._warmup.add_done_callback(self._log_warmup)
+
+    @staticmethod
+    def _log_warmup(fut: asyncio.Future) -> None:
+        if not fut.cancelled() and fut.exception() is not None:
+            logger.warning("Local embedding model preload failed: %s", fut.exception())
+
+    async def close(self) -> None:
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pool.shutdown(wait=False)
+        # Fresh (lazily-threaded) pool so a restarted lifespan can keep using it
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embedding")
+        self._loop = None
+
+    # -- embedding ---------------------------------------------------------
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            # Scripts and tests run without the app lifespan
+            self._loop = loop
+        if len(texts) != 1 or self.max_batch <= 1 or loop is not self._loop:
+            self.calls += 1
+            self.batched_texts += len(texts)
+            return await loop.run_in_executor(self._pool, self.embed_fn, texts)
+
+        fut = loop.create_future()
+        self._pending.append((texts[0], fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return [await fut]
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = self._loop.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.calls += 1
+        self.batched_texts += len(batch)
+        try:
+            vecs = await self._loop.run_in_executor(self._pool, self.embed_fn, [t for t, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), vec in zip(batch, vecs):
+            if not fut.done():
+                fut.set_result(vec)
+
+    # -- monitoring --------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        warmup = self._warmup
+        return {
+            "workers": self.workers,
+            "max_batch": self.max_batch,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "model_preloaded": bool(warmup and warmup.done() and not warmup.cancelled() and warmup.exception() is None),
+            "pending": len(self._pending),
+            "model_calls": self.calls,
+            "texts_embedded": self.batched_texts,
+            "avg_batch_size": round(self.batched_texts / self.calls, 2) if self.calls else 0.0,
+        }
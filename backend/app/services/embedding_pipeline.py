@@ -0,0 +1,364 @@
+"""
+Incremental embedding pipeline.
+
+Each material stores `embedding_content_hash`, a hash of its
+build_material_text output and the model that actually embedded it. Create, update and
+upload paths call `enqueue_if_changed`, which only queues materials whose
+hash differs from the stored one; `scan` does the same for the whole table
+(at startup and from POST /api/embeddings/generate).
+
+After each batch the "more like this" lists it affects are refreshed
+(material_neighbors).
+
+Uploaded documents are also queued for passage chunking (material_chunks)
+and near-duplicate fingerprinting (material_fingerprints), from one extraction.
+Uploads hand over the pages they already extracted for the upload-time
+near-duplicate check (`enqueue_extracted`), so the document is read once.
+Chunk jobs run one material at a time after the pending material batch, since
+a single deck can produce dozens of passages.
+
+A single background worker drains the dirty set in batches. The batch size
+adapts to the provider: it doubles while full batches finish well inside
+EMBEDDING_BATCH_TARGET_SECONDS and halves when they run over or fail.
+
+Batches embedded by the "auto" mode's local fallback while OVH is
+configured are stored (search keeps working) but hashed as the local model,
+and queued again after FALLBACK_RETRY_SECONDS so they move to OVH vectors
+once it recovers. Without OVH configured, "auto" simply means local.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import exists, func, or_, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.vector_codec import Vector, encode_embedding
+from app.models.material import Material
+from app.models.material_chunk import MaterialChunk
+from app.models.material_fingerprint import MaterialFingerprint
+from app.services.embedding_coverage import embedding_coverage
+from app.services.embedding_service import (
+    build_material_text, content_hash, embed_texts_with_provider, preferred_provider,
+)
+from app.services.in_memory_vector_index import in_memory_vector_index
+from app.services.duplicate_detection import fingerprint_material
+from app.services.file_extraction import extract_pages_from_file
+from app.services.material_chunks import CHUNKABLE_FORMATS, build_material_chunks, is_chunkable
+from app.services.material_neighbors import refresh_neighbors
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+MIN_TEXT_LENGTH = 10
+MAX_ATTEMPTS = 3
+THROUGHPUT_WINDOW = 20  # batches
+FALLBACK_RETRY_SECONDS = 300
+
+# Columns read by build_material_text
+_TEXT_COLUMNS = (
+    "id", "name", "product_name", "universe_name", "description",
+    "tags", "keywords", "use_cases", "pain_points", "executive_summary",
+)
+
+
+def store_embedding(material: Material, vec, db: Session) -> None:
+    """Stage the embedding mirror and, when pgvector is available, the embedding_vec column."""
+    material.embedding = encode_embedding(vec)
+    if embedding_coverage.vector_available:
+        db.execute(
+            text("UPDATE materials SET embedding_vec = :vec WHERE id = :mid"),
+            {"vec": Vector(vec), "mid": material.id},
+        )
+
+
+def after_embedding_commit(material: Material, vec) -> None:
+    """Propagate a committed embedding to the in-process search state."""
+    if embedding_coverage.vector_available:
+        embedding_coverage.mark_embedded(material.id)
+    in_memory_vector_index.upsert(material, vec)
+
+
+def needs_embedding(material: Material) -> bool:
+    return (
+        material.embedding is None
+        or material.embedding_content_hash != content_hash(build_material_text(material))
+    )
+
+
+class EmbeddingPipeline:
+    """Dirty-set queue plus an adaptive-batch background embedding worker."""
+
+    def __init__(self, initial_batch: int, max_batch: int, target_seconds: float):
+        self.batch_size = max(1, initial_batch)
+        self.max_batch = max(self.batch_size, max_batch)
+        self.target_seconds = target_seconds
+        self._dirty: Set[int] = set()
+        self._chunk_dirty: Set[int] = set()
+        self._pages: Dict[int, List[Tuple[str, str]]] = {}
+        self._attempts: Dict[int, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_progress = 0
+        self._batches: Deque[Tuple[int, float]] = deque(maxlen=THROUGHPUT_WINDOW)
+        self.embedded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.chunked = 0
+        self.chunk_failed = 0
+        self.last_error: Optional[str] = None
+        self.last_batch_at: Optional[float] = None
+
+    # -- queueing ----------------------------------------------------------
+
+    def enqueue(self, material_ids: Iterable[int]) -> int:
+        before = len(self._dirty)
+        self._dirty.update(material_ids)
+        added = len(self._dirty) - before
+        if added and self._wakeup is not None:
+            self._wakeup.set()
+        return added
+
+    def enqueue_chunks(self, material_ids: Iterable[int]) -> int:
+        """Queue materials whose uploaded document should be (re)chunked."""
+        material_ids = list(material_ids)
+        for mid in material_ids:
+            # The file may have changed since any pages were handed over
+            self._pages.pop(mid, None)
+        before = len(self._chunk_dirty)
+        self._chunk_dirty.update(material_ids)
+        added = len(self._chunk_dirty) - before
+        if added and self._wakeup is not None:
+            self._wakeup.set()
+        return added
+
+    def enqueue_extracted(self, material_id: int, pages: Sequence[Tuple[str, str]]) -> None:
+        """Queue an uploaded document for chunking with pages the caller already extracted."""
+        self.enqueue_chunks([material_id])
+        self._pages[material_id] = list(pages)
+
+    def enqueue_if_changed(self, material: Material) -> bool:
+        """Queue a material whose embedding text changed since it was last embedded."""
+        if not needs_embedding(material):
+            return False
+        self.enqueue([material.id])
+        return True
+
+    def scan(self, db: Session, force: bool = False) -> int:
+        """Queue every material that is missing an embedding or whose content changed."""
+        if force:
+            ids = [r[0] for r in db.query(Material.id).all()]
+            # Clear stored hashes so unchanged rows are not skipped by the worker. Plain SQL
+            # so the ORM's updated_at onupdate doesn't mark the whole catalog as modified.
+            db.execute(text("UPDATE materials SET embedding_content_hash = NULL"))
+            db.commit()
+        else:
+            # Only the text fields and hash; the embedding itself is never loaded
+            rows = db.query(
+                *(getattr(Material, c) for c in _TEXT_COLUMNS),
+                Material.embedding_content_hash,
+                Material.embedding.is_(None).label("missing"),
+            ).all()
+            ids = [
+                r.id for r in rows
+                if r.missing or r.embedding_content_hash != content_hash(build_material_text(r))
+            ]
+        self._scan_chunks(db, force)
+        return self.enqueue(ids)
+
+    def _scan_chunks(self, db: Session, force: bool) -> None:
+        """Queue documents with no chunks or fingerprint yet (all documents when forced)."""
+        query = db.query(Material.id).filter(
+            Material.file_path.isnot(None),
+            func.lower(Material.file_format).in_(CHUNKABLE_FORMATS),
+        )
+        if not force:
+            query = query.filter(or_(
+                ~exists().where(MaterialChunk.material_id == Material.id),
+                ~exists().where(MaterialFingerprint.material_id == Material.id),
+            ))
+        try:
+            self.enqueue_chunks(r[0] for r in query.all())
+        except Exception as e:
+            # material_chunks / material_fingerprints are missing until migrations 027 / 030 run
+            logger.warning("Chunk scan skipped: %s", e)
+            db.rollback()
+
+    # -- worker ------------------------------------------------------------
+
+    async def start(self, scan_on_start: bool = True) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        if self._dirty or self._chunk_dirty:
+            self._wakeup.set()
+        if scan_on_start:
+            db = SessionLocal()
+            try:
+                queued = self.scan(db)
+                if queued:
+                    logger.info("Queued %d materials with stale or missing embeddings", queued)
+            except Exception as e:
+                logger.warning("Initial embedding scan failed: %s", e)
+            finally:
+                db.close()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            if not self._dirty and not self._chunk_dirty:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if not self._dirty:
+                await self._run_chunk_job(self._chunk_dirty.pop())
+                continue
+            batch = [self._dirty.pop() for _ in range(min(self.batch_size, len(self._dirty)))]
+            try:
+                await self._process(batch)
+            except asyncio.CancelledError:
+                self._dirty.update(batch)
+                raise
+            except Exception as e:
+                logger.error("Embedding batch of %d failed: %s", len(batch), e)
+                self.last_error = str(e)
+                self._retry(batch)
+                self.batch_size = max(1, self.batch_size // 2)
+                await asyncio.sleep(1.0)
+
+    async def _run_chunk_job(self, material_id: int) -> None:
+        pages = self._pages.pop(material_id, None)
+        db = SessionLocal()
+        try:
+            material = db.query(Material).filter(Material.id == material_id).first()
+            if material is not None and is_chunkable(material):
+                if pages is None:
+                    pages = await extract_pages_from_file(
+                        await run_in_threadpool(storage_service.get_file_path, material.file_path),
+                        material.file_format,
+                    )
+                if pages:
+                    self.chunked += await build_material_chunks(material, db, pages)
+                    await fingerprint_material(material, db, pages)
+        except asyncio.CancelledError:
+            self._chunk_dirty.add(material_id)
+            raise
+        except Exception as e:
+            # Not retried: a document that fails to extract fails again; the next scan picks it up
+            logger.error("Chunking material %s failed: %s", material_id, e)
+            db.rollback()
+            self.chunk_failed += 1
+            self.last_error = str(e)
+        finally:
+            db.close()
+
+    def _retry(self, batch: List[int]) -> None:
+        for mid in batch:
+            attempts = self._attempts.get(mid, 0) + 1
+            if attempts >= MAX_ATTEMPTS:
+                self._attempts.pop(mid, None)
+                self.failed += 1
+            else:
+                self._attempts[mid] = attempts
+                self._dirty.add(mid)
+
+    async def _process(self, batch: List[int]) -> None:
+        self._in_progress = len(batch)
+        db = SessionLocal()
+        try:
+            embedding_coverage.ensure_fresh(db)
+            materials = db.query(Material).filter(Material.id.in_(batch)).all()
+
+            todo = []
+            for m in materials:
+                body = build_material_text(m)
+                digest = content_hash(body)
+                if m.embedding is not None and m.embedding_content_hash == digest:
+                    self.skipped += 1
+                elif not body or len(body.strip()) < MIN_TEXT_LENGTH:
+                    # Nothing worth embedding; remember the hash so it isn't retried
+                    m.embedding_content_hash = digest
+                    self.skipped += 1
+                else:
+                    todo.append((m, body, digest))
+
+            if not todo:
+                db.commit()
+                return
+
+            started = time.perf_counter()
+            vecs, provider = await embed_texts_with_provider([body for _, body, _ in todo])
+            elapsed = time.perf_counter() - started
+            for (m, body, digest), vec in zip(todo, vecs):
+                store_embedding(m, vec, db)
+                m.embedding_content_hash = content_hash(body, provider)
+            db.commit()
+
+            for (m, _, _), vec in zip(todo, vecs):
+                after_embedding_commit(m, vec)
+                self._attempts.pop(m.id, None)
+            refresh_neighbors(db, [m.id for m, _, _ in todo])
+            self.embedded += len(todo)
+            self._batches.append((len(todo), elapsed))
+            self.last_batch_at = time.time()
+            self._adapt(len(batch), elapsed)
+            # Only differs when "auto" has OVH configured but had to fall back
+            if provider != preferred_provider():
+                self._requeue_later([m.id for m, _, _ in todo])
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            self._in_progress = 0
+            db.close()
+
+    def _requeue_later(self, material_ids: List[int]) -> None:
+        """Queue fallback-embedded materials again once the preferred provider may be back."""
+        asyncio.get_running_loop().call_later(FALLBACK_RETRY_SECONDS, self.enqueue, material_ids)
+
+    def _adapt(self, size: int, elapsed: float) -> None:
+        if elapsed > self.target_seconds and self.batch_size > 1:
+            self.batch_size = max(1, self.batch_size // 2)
+        elif size >= self.batch_size and elapsed < self.target_seconds / 2:
+            self.batch_size = min(self.max_batch, self.batch_size * 2)
+
+    # -- monitoring --------------------------------------------------------
+
+    def progress(self) -> Dict[str, Any]:
+        texts = sum(n for n, _ in self._batches)
+        seconds = sum(t for _, t in self._batches)
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "queued": len(self._dirty),
+            "in_progress": self._in_progress,
+            "embedded": self.embedded,
+            "skipped_unchanged": self.skipped,
+            "failed": self.failed,
+            "chunks_queued": len(self._chunk_dirty),
+            "chunks_written": self.chunked,
+            "chunk_failed": self.chunk_failed,
+            "batch_size": self.batch_size,
+            "throughput_per_sec": round(texts / seconds, 2) if seconds else 0.0,
+            "last_batch_at": self.last_batch_at,
+            "last_error": self.last_error,
+        }
+
+
+embedding_pipeline = EmbeddingPipeline(
+    initial_batch=settings.EMBEDDING_BATCH_SIZE,
+    max_batch=settings.EMBEDDING_BATCH_MAX_SIZE,
+    target_seconds=settings.EMBEDDING_BATCH_TARGET_SECONDS,
+)
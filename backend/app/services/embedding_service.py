@@ -6,27 +6,37 @@ Supports two providers:
   - "local" : fastembed with BAAI/bge-small-en-v1.5 (ONNX, 384 dims)
   - "auto"  : tries OVH first, falls back to local
 """
+import hashlib
 import json
 import logging
-from typing import List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
-import httpx
 import numpy as np
 
 from app.core.config import settings
+from app.services.http_client import ai_http_client
+from app.services.embedding_executor import EmbeddingExecutor
 
 logger = logging.getLogger(__name__)
 
+LOCAL_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+
 _local_model = None
+_local_model_lock = threading.Lock()
 
 
 def _get_local_model():
     global _local_model
     if _local_model is None:
-        from fastembed import TextEmbedding
-        logger.info("Loading local embedding model (BAAI/bge-small-en-v1.5)...")
-        _local_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-        logger.info("Local embedding model loaded.")
+        with _local_model_lock:
+            if _local_model is None:
+                from fastembed import TextEmbedding
+                logger.info("Loading local embedding model (%s)...", LOCAL_MODEL_NAME)
+                _local_model = TextEmbedding(model_name=LOCAL_MODEL_NAME)
+                logger.info("Local embedding model loaded.")
     return _local_model
 
 
@@ -72,8 +82,7 @@ async def _embed_ovh(texts: List[str]) -> Optional[List[List[float]]]:
             "Authorization": f"Bearer {settings.OVH_AI_API_KEY}",
             "Content-Type": "application/json",
         }
-        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
-            resp = await client.post(settings.OVH_AI_EMBEDDING_URL, json=payload, headers=headers)
+        resp = await ai_http_client.post("embeddings", settings.OVH_AI_EMBEDDING_URL, json=payload, headers=headers)
 
         if resp.status_code != 200:
             logger.warning("OVH embedding endpoint returned %s: %s", resp.status_code, resp.text[:300])
@@ -88,16 +97,27 @@ async def _embed_ovh(texts: List[str]) -> Optional[List[List[float]]]:
 
 
 def _embed_local(texts: List[str]) -> List[List[float]]:
-    """Generate embeddings using the local fastembed model."""
+    """Generate embeddings using the local fastembed model. Blocking; runs on the executor."""
     model = _get_local_model()
-    results = list(model.embed(texts))
+    results = list(model.embed(texts, batch_size=max(len(texts), 1)))
     return [emb.tolist() if isinstance(emb, np.ndarray) else list(emb) for emb in results]
 
 
-async def embed_texts(texts: List[str]) -> List[List[float]]:
+local_embedding_executor = EmbeddingExecutor(
+    _embed_local,
+    warmup_fn=_get_local_model,
+    workers=settings.EMBEDDING_LOCAL_WORKERS,
+    max_batch=settings.EMBEDDING_MICROBATCH_MAX_SIZE,
+    max_wait_ms=settings.EMBEDDING_MICROBATCH_WAIT_MS,
+)
+
+
+async def embed_texts_with_provider(texts: List[str]) -> Tuple[List[List[float]], str]:
     """
     Embed a list of texts using the configured provider.
-    Returns a list of float vectors, one per input text.
+    Returns the vectors, one per input text, and the provider that produced
+    them ("ovh" or "local"; in "auto" mode with OVH configured, local means
+    OVH failed).
     """
     provider = settings.EMBEDDING_PROVIDER.lower()
 
@@ -105,21 +125,187 @@ async def embed_texts(texts: List[str]) -> List[List[float]]:
         result = await _embed_ovh(texts)
         if result is None:
             raise RuntimeError("OVH embedding endpoint failed and provider is set to 'ovh'")
-        return result
+        return result, "ovh"
 
     if provider == "local":
-        return _embed_local(texts)
+        return await local_embedding_executor.embed(texts), "local"
 
     # "auto": try OVH first, fall back to local
     result = await _embed_ovh(texts)
     if result is not None:
-        return result
+        return result, "ovh"
 
     logger.info("OVH embedding unavailable, falling back to local model")
-    return _embed_local(texts)
+    return await local_embedding_executor.embed(texts), "local"
+
+
+async def embed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embed a list of texts using the configured provider.
+    Returns a list of float vectors, one per input text.
+    """
+    vecs, _ = await embed_texts_with_provider(texts)
+    return vecs
 
 
 async def embed_text(text: str) -> List[float]:
     """Embed a single text string."""
     results = await embed_texts([text])
     return results[0]
+
+
+# ---------------------------------------------------------------------------
+# Query embedding cache
+# ---------------------------------------------------------------------------
+
+class QueryEmbeddingCache:
+    """
+    Size-bounded LRU cache with a per-entry TTL for search-query embeddings.
+
+    Keys are (normalized query, provider, model) of the preferred provider
+    (see preferred_provider), so switching provider or model never serves a
+    vector from the wrong embedding space.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Tuple[float, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, vec = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(vec)
+
+    def put(self, key: Tuple[str, str, str], vec: List[float]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, tuple(vec))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    maxsize=settings.EMBEDDING_QUERY_CACHE_SIZE,
+    ttl=settings.EMBEDDING_QUERY_CACHE_TTL,
+)
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a cache entry."""
+    return " ".join(text.split()).lower()
+
+
+def ovh_configured() -> bool:
+    """Whether the OVH embedding endpoint has a URL and key; _embed_ovh is a no-op otherwise."""
+    return bool(settings.OVH_AI_EMBEDDING_URL and settings.OVH_AI_API_KEY)
+
+
+def preferred_provider() -> str:
+    """
+    The provider vectors should come from: "auto" prefers OVH when it is
+    configured and otherwise uses the local model, as embed_texts does.
+    """
+    provider = settings.EMBEDDING_PROVIDER.lower()
+    if provider == "local" or (provider != "ovh" and not ovh_configured()):
+        return "local"
+    return "ovh"
+
+
+def _provider_model(provider: str) -> str:
+    return LOCAL_MODEL_NAME if provider == "local" else settings.OVH_AI_EMBEDDING_MODEL or "default"
+
+
+def _query_cache_key(text: str) -> Tuple[str, str, str]:
+    provider = preferred_provider()
+    return normalize_query(text), provider, _provider_model(provider)
+
+
+def content_hash(text: str, provider: Optional[str] = None) -> str:
+    """
+    Hash of a material's embedding text and the model that embedded it;
+    changes when either does. Pass the provider that actually produced the
+    vector (from embed_texts_with_provider) when storing; the default, the
+    preferred provider, is what an up-to-date embedding should match. A
+    vector from the "auto" mode's local fallback while OVH is configured
+    therefore reads as stale and is re-embedded once OVH answers again.
+    """
+    provider = provider or preferred_provider()
+    return hashlib.sha256(f"{provider}|{_provider_model(provider)}\n{text}".encode("utf-8")).hexdigest()
+
+
+async def embed_query(text: str) -> List[float]:
+    """
+    Embed a search query, reusing a cached vector when the same query was seen recently.
+    Use embed_text for material content, which should always be embedded fresh.
+
+    Normalization only builds the cache key; the query is embedded as typed.
+    Vectors from the "auto" mode's local fallback while OVH is configured are
+    not cached, so search recovers as soon as OVH answers again.
+    """
+    key = _query_cache_key(text)
+    cached = query_embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
+    vecs, provider = await embed_texts_with_provider([text])
+    if provider == key[1]:
+        query_embedding_cache.put(key, vecs[0])
+    return vecs[0]
+
+
+async def embed_queries(texts: List[str]) -> Tuple[List[List[float]], int]:
+    """
+    Embed several search queries: cached ones are reused and the rest are
+    embedded together in one embed_texts call.
+    Returns the vectors (in input order) and how many had to be embedded.
+    """
+    keys = [_query_cache_key(t) for t in texts]
+    vecs: List[Optional[List[float]]] = [query_embedding_cache.get(k) for k in keys]
+
+    # Duplicate queries in one batch are embedded once, as first typed
+    missing: Dict[Tuple[str, str, str], str] = {}
+    for text, key, vec in zip(texts, keys, vecs):
+        if vec is None:
+            missing.setdefault(key, text)
+    if missing:
+        embedded, provider = await embed_texts_with_provider(list(missing.values()))
+        fresh = dict(zip(missing, embedded))
+        for key, vec in fresh.items():
+            if provider == key[1]:
+                query_embedding_cache.put(key, vec)
+        vecs = [vec if vec is not None else fresh[key] for key, vec in zip(keys, vecs)]
+    return vecs, len(missing)
@@ -1,9 +1,10 @@
 """
 File extraction service for extracting text from various document formats
 """
+import asyncio
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 import io
 
 logger = logging.getLogger(__name__)
@@ -59,6 +60,28 @@ async def extract_text_from_file(file_path: Path, file_format: str) -> Optional[
     Returns:
         Extracted text content or None if extraction fails
     """
+    pages = await extract_pages_from_file(file_path, file_format)
+    if not pages:
+        return None
+    return "\n\n".join(
+        f"{location}:\n{text}" if location.startswith("Slide") else text
+        for location, text in pages
+    )
+
+
+async def extract_pages_from_file(file_path: Path, file_format: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Extract text per page (PDF), slide (PPTX) or whole document (DOCX)
+    
+    Parsing runs in a worker thread so large documents don't block the event loop.
+    
+    Args:
+        file_path: Path to the file
+        file_format: File format (pdf, docx, pptx, etc.)
+        
+    Returns:
+        List of (location, text) pairs such as ("Slide 3", "...") or None if extraction fails
+    """
     if not file_path.exists():
         logger.error(f"File not found: {file_path}")
         return None
@@ -67,11 +90,11 @@ async def extract_text_from_file(file_path: Path, file_format: str) -> Optional[
     
     try:
         if file_format_lower == "pdf":
-            return await _extract_from_pdf(file_path)
+            return await asyncio.to_thread(_extract_from_pdf, file_path)
         elif file_format_lower in ["docx", "doc"]:
-            return await _extract_from_docx(file_path)
+            return await asyncio.to_thread(_extract_from_docx, file_path)
         elif file_format_lower in ["pptx", "ppt"]:
-            return await _extract_from_pptx(file_path)
+            return await asyncio.to_thread(_extract_from_pptx, file_path)
         else:
             logger.warning(f"Unsupported file format for text extraction: {file_format}")
             return None
@@ -80,24 +103,24 @@ async def extract_text_from_file(file_path: Path, file_format: str) -> Optional[
         return None
 
 
-async def _extract_from_pdf(file_path: Path) -> Optional[str]:
-    """Extract text from PDF file"""
+def _extract_from_pdf(file_path: Path) -> Optional[List[Tuple[str, str]]]:
+    """Extract text from PDF file, one entry per page"""
     try:
         import PyPDF2
         
-        text_parts = []
+        pages = []
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
             for page_num, page in enumerate(pdf_reader.pages):
                 try:
                     text = page.extract_text()
                     if text:
-                        text_parts.append(text)
+                        pages.append((f"Page {page_num + 1}", text))
                 except Exception as e:
                     logger.warning(f"Error extracting text from PDF page {page_num}: {str(e)}")
                     continue
         
-        return "\n\n".join(text_parts) if text_parts else None
+        return pages or None
     except ImportError:
         logger.error("PyPDF2 is not installed. Install it with: pip install PyPDF2")
         return None
@@ -106,8 +129,8 @@ async def _extract_from_pdf(file_path: Path) -> Optional[str]:
         return None
 
 
-async def _extract_from_docx(file_path: Path) -> Optional[str]:
-    """Extract text from DOCX file"""
+def _extract_from_docx(file_path: Path) -> Optional[List[Tuple[str, str]]]:
+    """Extract text from DOCX file (no page boundaries, so a single entry)"""
     try:
         from docx import Document
         
@@ -128,7 +151,7 @@ async def _extract_from_docx(file_path: Path) -> Optional[str]:
                 if row_text:
                     text_parts.append(" | ".join(row_text))
         
-        return "\n\n".join(text_parts) if text_parts else None
+        return [("Document", "\n\n".join(text_parts))] if text_parts else None
     except ImportError:
         logger.error("python-docx is not installed. Install it with: pip install python-docx")
         return None
@@ -137,13 +160,13 @@ async def _extract_from_docx(file_path: Path) -> Optional[str]:
         return None
 
 
-async def _extract_from_pptx(file_path: Path) -> Optional[str]:
-    """Extract text from PPTX file"""
+def _extract_from_pptx(file_path: Path) -> Optional[List[Tuple[str, str]]]:
+    """Extract text from PPTX file, one entry per slide"""
     try:
         from pptx import Presentation
         
         prs = Presentation(file_path)
-        text_parts = []
+        slides = []
         
         for slide_num, slide in enumerate(prs.slides):
             slide_text = []
@@ -152,9 +175,9 @@ async def _extract_from_pptx(file_path: Path) -> Optional[str]:
                     slide_text.append(shape.text.strip())
             
             if slide_text:
-                text_parts.append(f"Slide {slide_num + 1}:\n" + "\n".join(slide_text))
+                slides.append((f"Slide {slide_num + 1}", "\n".join(slide_text)))
         
-        return "\n\n".join(text_parts) if text_parts else None
+        return slides or None
     except ImportError:
         logger.error("python-pptx is not installed. Install it with: pip install python-pptx")
         return None
@@ -0,0 +1,159 @@
+"""
+Serving material files with HTTP validators and byte ranges.
+
+Every view/download endpoint (materials, shared links, deal rooms) goes through
+serve_material_file, which adds:
+
+    ETag            strong, the stored SHA-256 of the content (Material.file_sha256);
+                    files uploaded before checksums were stored get a weak
+                    validator from size and mtime instead
+    Last-Modified   the file's mtime
+    304             when If-None-Match (or, without it, If-Modified-Since) matches
+    206             Range / If-Range requests, so video seeking and PDF.js
+                    progressive loading fetch only the bytes they need
+                    (handled by Starlette's FileResponse)
+
+With FILE_SERVING_OFFLOAD=x-accel, send_file answers with an empty response
+carrying X-Accel-Redirect instead, after the endpoint has done its access
+checks and tracking, and nginx sends the body from an internal location
+mapped onto STORAGE_PATH (see nginx/nginx-https.conf); Python workers then
+never stream file bytes. nginx serves Range requests itself, and the
+internal location re-emits the ETag computed here.
+"""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.search_cache import etag_matches
+from app.services.storage import storage_service
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "ppt": "application/vnd.ms-powerpoint",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "doc": "application/msword",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "xls": "application/vnd.ms-excel",
+    "mp4": "video/mp4", "webm": "video/webm", "mov": "video/quicktime",
+    "avi": "video/x-msvideo", "mkv": "video/x-matroska",
+}
+
+# Authenticated or token-gated content: browsers may keep it but must revalidate
+CACHE_CONTROL = "private, no-cache"
+
+
+def material_file_format(material) -> str:
+    if material.file_format:
+        return material.file_format
+    name = material.file_name or ""
+    return name.rsplit(".", 1)[-1] if "." in name else ""
+
+
+def material_filename(material) -> str:
+    """Original file name, or the material name with the file's extension."""
+    if material.file_name:
+        return material.file_name
+    if material.file_format:
+        base_name = material.name.rsplit(".", 1)[0] if "." in material.name else material.name
+        return f"{base_name}.{material.file_format}"
+    return material.name
+
+
+def content_disposition(filename: str, inline: bool = False) -> str:
+    kind = "inline" if inline else "attachment"
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{kind}; filename*=utf-8''{quoted}"
+    return f'{kind}; filename="{filename}"'
+
+
+def accel_redirect_uri(path: Path) -> Optional[str]:
+    """Internal nginx URI for a file under STORAGE_PATH, or None when offload is off or not possible."""
+    if (settings.FILE_SERVING_OFFLOAD or "none").lower() != "x-accel":
+        return None
+    try:
+        relative = Path(path).resolve().relative_to(storage_service.storage_path.resolve())
+    except ValueError:
+        return None
+    return settings.FILE_SERVING_ACCEL_PREFIX.rstrip("/") + "/" + quote(relative.as_posix())
+
+
+def send_file(
+    path: Path,
+    media_type: str,
+    headers: Dict[str, str],
+    filename: Optional[str] = None,
+    inline: bool = False,
+    stat_result: Optional[os.stat_result] = None,
+) -> Response:
+    """Send a stored file: offloaded to nginx when enabled, streamed by FileResponse otherwise."""
+    uri = accel_redirect_uri(path)
+    if uri is not None:
+        headers = {**headers, "X-Accel-Redirect": uri}
+        if filename:
+            headers["Content-Disposition"] = content_disposition(filename, inline)
+        return Response(media_type=media_type, headers=headers)
+    return FileResponse(
+        path=str(path),
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result,
+        content_disposition_type="inline" if inline else "attachment",
+    )
+
+
+def file_etag(sha256: Optional[str], stat_result: os.stat_result) -> str:
+    if sha256:
+        return f'"{sha256}"'
+    return f'W/"{stat_result.st_size:x}-{int(stat_result.st_mtime):x}"'
+
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """RFC 7232 precedence: If-None-Match when present, else If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def serve_material_file(request: Request, material, inline: bool = False) -> Response:
+    """Response for a material's stored file with validators, 304 and Range support; 404 if missing."""
+    path: Path = await run_in_threadpool(storage_service.get_file_path, material.file_path)
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except OSError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found on server")
+
+    etag = file_etag(material.file_sha256, stat_result)
+    headers: Dict[str, str] = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+    if not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    file_format = material_file_format(material)
+    return send_file(
+        path,
+        MEDIA_TYPES.get(file_format.lower(), "application/octet-stream"),
+        headers,
+        filename=material_filename(material),
+        inline=inline,
+        stat_result=stat_result,
+    )
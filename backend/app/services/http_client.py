@@ -0,0 +1,202 @@
+"""
+Shared async HTTP client for the OVHcloud AI endpoints (chat and embeddings).
+
+One pooled httpx.AsyncClient is opened in the application lifespan and reused
+by every call, so LLM and embedding requests skip the DNS lookup and TLS
+handshake a fresh client would pay each time. HTTP/2 is used when the `h2`
+package is installed (httpx[http2]); otherwise connections are HTTP/1.1
+keep-alive.
+
+Requests are retried with full-jitter exponential backoff on connection
+failures and on 429/502/503/504. Read timeouts are not retried: the request
+may already be running on the model server and a retry would double the wait.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+RETRY_EXCEPTIONS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    httpx.RemoteProtocolError,
+)
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+# Per-endpoint total timeouts (seconds); connect is capped separately
+ENDPOINT_TIMEOUTS = {
+    "chat": 30.0,
+    "chat_tools": 60.0,
+    "summary": 30.0,
+    "embeddings": 60.0,
+}
+CONNECT_TIMEOUT = 5.0
+
+
+def _http2_supported() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class AIHttpClient:
+    """Lifespan-managed pooled client with retries and request statistics."""
+
+    def __init__(self, max_connections: int, max_keepalive: int, max_retries: int):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.max_retries = max_retries
+        self.http2 = _http2_supported()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._in_flight = 0
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=60.0,
+            ),
+            timeout=httpx.Timeout(30.0, connect=CONNECT_TIMEOUT),
+        )
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = self._new_client()
+            self._loop = asyncio.get_running_loop()
+            logger.info(
+                "AI HTTP client started (http2=%s, max_connections=%d)",
+                self.http2, self.max_connections,
+            )
+
+    async def close(self) -> None:
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+    async def _get_client(self) -> Optional[httpx.AsyncClient]:
+        """The shared client, or None when called from a loop that doesn't own it."""
+        if self._client is None:
+            # Scripts and tests run without the app lifespan
+            await self.start()
+        if self._loop is not asyncio.get_running_loop():
+            return None
+        return self._client
+
+    # -- requests ----------------------------------------------------------
+
+    async def post(
+        self,
+        endpoint: str,
+        url: str,
+        *,
+        json: Any,
+        headers: Dict[str, str],
+    ) -> httpx.Response:
+        """POST with retries. Raises the last httpx error if every attempt fails."""
+        timeout = httpx.Timeout(ENDPOINT_TIMEOUTS.get(endpoint, 30.0), connect=CONNECT_TIMEOUT)
+        stats = self._stats.setdefault(
+            endpoint, {"requests": 0, "retries": 0, "errors": 0, "total_ms": 0.0}
+        )
+        client = await self._get_client()
+        one_off = client is None
+        if one_off:
+            client = self._new_client()
+
+        started = time.perf_counter()
+        self._in_flight += 1
+        stats["requests"] += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                try:
+                    response = await client.post(url, json=json, headers=headers, timeout=timeout)
+                except RETRY_EXCEPTIONS as e:
+                    if last_attempt:
+                        stats["errors"] += 1
+                        raise
+                    logger.warning("%s request failed (%s), retrying", endpoint, e)
+                    retry_after = None
+                except httpx.HTTPError:
+                    stats["errors"] += 1
+                    raise
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                        if response.status_code >= 400:
+                            stats["errors"] += 1
+                        return response
+                    logger.warning("%s endpoint returned %s, retrying", endpoint, response.status_code)
+                    retry_after = response.headers.get("retry-after")
+
+                stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        finally:
+            self._in_flight -= 1
+            stats["total_ms"] += (time.perf_counter() - started) * 1000
+            if one_off:
+                await client.aclose()
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    # -- monitoring --------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {
+            name: {
+                "requests": int(s["requests"]),
+                "retries": int(s["retries"]),
+                "errors": int(s["errors"]),
+                "avg_ms": round(s["total_ms"] / s["requests"], 1) if s["requests"] else 0.0,
+            }
+            for name, s in self._stats.items()
+        }
+        return {
+            "started": self._client is not None,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive,
+            "in_flight": self._in_flight,
+            **self._pool_stats(),
+            "endpoints": endpoints,
+        }
+
+    def _pool_stats(self) -> Dict[str, int]:
+        # httpx has no public pool API; read httpcore's pool defensively
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if getattr(c, "is_idle", lambda: False)()),
+        }
+
+
+ai_http_client = AIHttpClient(
+    max_connections=settings.OVH_AI_HTTP_MAX_CONNECTIONS,
+    max_keepalive=settings.OVH_AI_HTTP_MAX_KEEPALIVE,
+    max_retries=settings.OVH_AI_HTTP_MAX_RETRIES,
+)
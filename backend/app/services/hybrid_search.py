@@ -0,0 +1,42 @@
+"""
+Reciprocal-rank fusion (RRF) for combining ranked retrieval signals.
+
+Each signal (vector similarity, full-text rank, ...) contributes
+1 / (k + rank) for every document it returned, so documents found by several
+signals rise to the top without having to calibrate the raw scores against
+each other. k=60 is the constant from Cormack et al. and the usual default.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+RRF_K = 60
+
+
+class FusedHit(NamedTuple):
+    id: int
+    score: float
+    signals: Dict[str, Dict[str, float]]
+
+
+def reciprocal_rank_fusion(
+    ranked: Dict[str, Sequence[Tuple[int, float]]],
+    k: int = RRF_K,
+    weights: Optional[Dict[str, float]] = None,
+) -> List[FusedHit]:
+    """
+    Fuse ranked (id, score) lists keyed by signal name.
+
+    Returns hits ordered by fused score. `signals` holds each contributing
+    signal's 1-based rank and raw score, so callers can show why a result matched.
+    """
+    fused: Dict[int, float] = {}
+    signals: Dict[int, Dict[str, Dict[str, float]]] = {}
+    for name, hits in ranked.items():
+        weight = (weights or {}).get(name, 1.0)
+        for rank, (doc_id, score) in enumerate(hits, start=1):
+            if name in signals.get(doc_id, {}):
+                continue
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+            signals.setdefault(doc_id, {})[name] = {"rank": rank, "score": round(float(score), 4)}
+
+    order = sorted(fused, key=lambda d: (-fused[d], min(s["rank"] for s in signals[d].values())))
+    return [FusedHit(d, round(fused[d], 6), signals[d]) for d in order]
@@ -0,0 +1,249 @@
+"""
+In-process NumPy vector search over Material.embedding.
+
+Used by semantic search when the pgvector extension (and so embedding_vec) is
+not available - local dev, tests, or a database without the extension - so
+search still ranks by cosine similarity instead of dropping to ILIKE.
+
+Vectors are kept L2-normalised in one contiguous float32 matrix, so a query is
+a single matrix-vector product followed by argpartition for the top-k.
+Metadata filters are evaluated as boolean masks over parallel arrays.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.vector_codec import decode_embedding
+
+logger = logging.getLogger(__name__)
+
+_HIDDEN_STATUSES = ("draft", "archived")
+
+
+def _status_value(status) -> str:
+    if status is None:
+        return ""
+    return str(getattr(status, "value", status)).lower()
+
+
+class InMemoryVectorIndex:
+    """Contiguous float32 cosine index with incremental upsert/remove."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.dim: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._universe = np.zeros(0, dtype=object)
+        self._product = np.zeros(0, dtype=object)
+        self._material_type = np.zeros(0, dtype=object)
+        self._status = np.zeros(0, dtype=object)
+        self._row_of: Dict[int, int] = {}
+        self._size = 0
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    # -- loading -----------------------------------------------------------
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def load(self, db: Session) -> None:
+        """(Re)build the index from every material with a stored embedding."""
+        from app.models.material import Material
+
+        rows = db.query(
+            Material.id,
+            Material.embedding,
+            Material.universe_name,
+            Material.product_name,
+            Material.material_type,
+            Material.status,
+        ).filter(Material.embedding.isnot(None)).all()
+
+        parsed = []
+        for row in rows:
+            vec = decode_embedding(row.embedding)
+            if vec is not None and vec.size:
+                parsed.append((row, vec))
+
+        with self._lock:
+            self._reset(0, 0)
+            if parsed:
+                # Mixed dimensions happen after a provider switch; keep the dominant one.
+                dim = Counter(len(v) for _, v in parsed).most_common(1)[0][0]
+                kept = [(r, v) for r, v in parsed if len(v) == dim]
+                if len(kept) < len(parsed):
+                    logger.warning(
+                        "In-memory vector index skipped %d embeddings with dimension != %d",
+                        len(parsed) - len(kept), dim,
+                    )
+                self._reset(len(kept), dim)
+                for r, v in kept:
+                    self._put(r.id, v, r.universe_name, r.product_name, r.material_type, r.status)
+            self._loaded_at = time.monotonic()
+        logger.info("In-memory vector index loaded with %d vectors", self._size)
+
+    def ensure_loaded(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds:
+            self.load(db)
+
+    def has_vectors(self, db: Session) -> bool:
+        self.ensure_loaded(db)
+        return self._size > 0
+
+    # -- incremental updates ----------------------------------------------
+
+    def upsert(self, material, vec: List[float]) -> None:
+        """Insert or replace a material's vector. No-op until the index is first used."""
+        with self._lock:
+            if not self.loaded:
+                return
+            if self.dim is None or self._size == 0:
+                self._reset(16, len(vec))
+            if len(vec) != self.dim:
+                return
+            self._put(
+                material.id, vec, material.universe_name, material.product_name,
+                material.material_type, material.status,
+            )
+
+    def remove(self, material_id: int) -> None:
+        """Drop a material by moving the last row into its slot."""
+        with self._lock:
+            row = self._row_of.pop(material_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                moved_id = int(self._ids[last])
+                for arr in (self._matrix, self._ids, self._universe, self._product, self._material_type, self._status):
+                    arr[row] = arr[last]
+                self._row_of[moved_id] = row
+            self._size = last
+
+    # -- search ------------------------------------------------------------
+
+    def search(
+        self,
+        query_vec: List[float],
+        k: int,
+        universe: Optional[str] = None,
+        product: Optional[str] = None,
+        material_type: Optional[str] = None,
+        status_filter: Optional[str] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return up to k (material_id, cosine similarity) pairs, best first."""
+        q = np.asarray(query_vec, dtype=np.float32)
+        norm = float(np.linalg.norm(q))
+        with self._lock:
+            n = self._size
+            if n == 0 or q.shape != (self.dim,) or norm == 0.0 or k <= 0:
+                return []
+            scores = self._matrix[:n] @ (q / norm)
+            mask = self._filter_mask(n, universe, product, material_type, status_filter)
+            ids = self._ids[:n]
+
+        candidates = int(mask.sum())
+        if candidates == 0:
+            return []
+        scores = np.where(mask, scores, -np.inf)
+        k = min(k, candidates)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def vector(self, material_id: int) -> Optional[np.ndarray]:
+        """A copy of a material's normalised vector, or None if it isn't indexed."""
+        with self._lock:
+            row = self._row_of.get(material_id)
+            return None if row is None else self._matrix[row].copy()
+
+    def neighbors(self, material_id: int, k: int) -> List[Tuple[int, float]]:
+        """Top-k materials most similar to an indexed one, any status, excluding itself."""
+        with self._lock:
+            row = self._row_of.get(material_id)
+            n = self._size
+            if row is None or k <= 0 or n < 2:
+                return []
+            scores = self._matrix[:n] @ self._matrix[row]
+            ids = self._ids[:n].copy()
+        scores[row] = -np.inf
+        k = min(k, n - 1)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def _filter_mask(self, n, universe, product, material_type, status_filter) -> np.ndarray:
+        """Boolean mask mirroring the SQL filters (ILIKE substring, status equality)."""
+        mask = np.ones(n, dtype=bool)
+        for needle, column in (
+            (universe, self._universe),
+            (product, self._product),
+            (material_type, self._material_type),
+        ):
+            if needle:
+                needle = needle.lower()
+                mask &= np.fromiter((needle in v for v in column[:n]), dtype=bool, count=n)
+        statuses = self._status[:n]
+        if status_filter:
+            mask &= statuses == status_filter.lower()
+        else:
+            mask &= ~np.isin(statuses, _HIDDEN_STATUSES)
+        return mask
+
+    # -- internals ---------------------------------------------------------
+
+    def _reset(self, capacity: int, dim: int) -> None:
+        self.dim = dim or None
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._universe = np.empty(capacity, dtype=object)
+        self._product = np.empty(capacity, dtype=object)
+        self._material_type = np.empty(capacity, dtype=object)
+        self._status = np.empty(capacity, dtype=object)
+        self._row_of = {}
+        self._size = 0
+
+    def _grow(self) -> None:
+        capacity = max(16, 2 * len(self._ids))
+        pad = capacity - len(self._ids)
+        self._matrix = np.ascontiguousarray(
+            np.vstack([self._matrix, np.zeros((pad, self.dim), dtype=np.float32)])
+        )
+        self._ids = np.concatenate([self._ids, np.zeros(pad, dtype=np.int64)])
+        self._universe = np.concatenate([self._universe, np.empty(pad, dtype=object)])
+        self._product = np.concatenate([self._product, np.empty(pad, dtype=object)])
+        self._material_type = np.concatenate([self._material_type, np.empty(pad, dtype=object)])
+        self._status = np.concatenate([self._status, np.empty(pad, dtype=object)])
+
+    def _put(self, material_id, vec, universe_name, product_name, material_type, status) -> None:
+        row = self._row_of.get(material_id)
+        if row is None:
+            if self._size == len(self._ids):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._row_of[material_id] = row
+        v = np.asarray(vec, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        self._matrix[row] = v / norm if norm else v
+        self._ids[row] = material_id
+        self._universe[row] = (universe_name or "").lower()
+        self._product[row] = (product_name or "").lower()
+        self._material_type[row] = (material_type or "").lower()
+        self._status[row] = _status_value(status)
+
+
+in_memory_vector_index = InMemoryVectorIndex(refresh_seconds=settings.EMBEDDING_COVERAGE_REFRESH_SECONDS)
@@ -0,0 +1,252 @@
+"""
+Passage-level (chunk) embeddings of a material's document text.
+
+The file is split per page / slide by file_extraction.extract_pages_from_file,
+each page is cut into overlapping word windows, and every window is embedded
+on its own and stored in material_chunks. Search can then match text that
+only appears inside a deck or PDF and point at the slide or page it came from.
+
+Chunks carry a source hash (extracted text + embedding model), so a material
+is only re-chunked when its document or the model changes.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.vector_codec import Vector, decode_embedding, encode_embedding
+from app.models.material import Material
+from app.models.material_chunk import MaterialChunk
+from app.services.embedding_coverage import embedding_coverage
+from app.services.embedding_service import content_hash, embed_texts_with_provider
+from app.services.file_extraction import extract_pages_from_file
+from app.services.storage import storage_service
+from app.services.vector_index import ann_search_sql, apply_search_tuning
+
+logger = logging.getLogger(__name__)
+
+CHUNKABLE_FORMATS = {"pdf", "docx", "doc", "pptx", "ppt"}
+
+
+class Chunk(NamedTuple):
+    location: str
+    text: str
+
+
+class ChunkHit(NamedTuple):
+    chunk_id: int
+    material_id: int
+    location: Optional[str]
+    text: str
+    score: float
+
+
+def chunk_pages(
+    pages: Sequence[Tuple[str, str]],
+    window: int,
+    overlap: int,
+) -> List[Chunk]:
+    """
+    Split (location, text) pages into overlapping word windows.
+    Windows never cross a page boundary; a page that needs several windows
+    gets "(i/n)" appended to its location.
+    """
+    step = max(1, window - overlap)
+    chunks: List[Chunk] = []
+    for location, body in pages:
+        words = body.split()
+        if not words:
+            continue
+        starts = list(range(0, max(len(words) - overlap, 1), step))
+        for i, start in enumerate(starts, start=1):
+            label = location if len(starts) == 1 else f"{location} ({i}/{len(starts)})"
+            chunks.append(Chunk(label[:50], " ".join(words[start:start + window])))
+    return chunks
+
+
+def chunk_source_hash(pages: Sequence[Tuple[str, str]], provider: Optional[str] = None) -> str:
+    body = "\n\n".join(f"{loc}\n{txt}" for loc, txt in pages)
+    return content_hash(
+        f"{settings.EMBEDDING_CHUNK_WORDS}/{settings.EMBEDDING_CHUNK_OVERLAP_WORDS}\n{body}", provider
+    )
+
+
+def is_chunkable(material: Material) -> bool:
+    fmt = (material.file_format or "").lower()
+    return bool(material.file_path) and fmt in CHUNKABLE_FORMATS
+
+
+async def build_material_chunks(
+    material: Material,
+    db: Session,
+    pages: Optional[Sequence[Tuple[str, str]]] = None,
+) -> int:
+    """
+    (Re)build a material's chunks if its document changed. Returns the number of chunks written.
+    `pages` avoids a second extraction when the caller already has them.
+    """
+    if not is_chunkable(material):
+        return 0
+    if pages is None:
+        pages = await extract_pages_from_file(
+            await run_in_threadpool(storage_service.get_file_path, material.file_path), material.file_format
+        )
+    if not pages:
+        return 0
+
+    digest = chunk_source_hash(pages)
+    current = db.query(MaterialChunk.source_hash).filter(
+        MaterialChunk.material_id == material.id
+    ).first()
+    if current is not None and current[0] == digest:
+        return 0
+
+    chunks = chunk_pages(pages, settings.EMBEDDING_CHUNK_WORDS, settings.EMBEDDING_CHUNK_OVERLAP_WORDS)
+    # The material name gives each passage its context without being stored in it
+    inputs = [f"{material.name}. {c.location}: {c.text}" for c in chunks]
+    vecs: List[List[float]] = []
+    providers = set()
+    batch = max(1, settings.EMBEDDING_BATCH_SIZE)
+    for i in range(0, len(inputs), batch):
+        batch_vecs, provider = await embed_texts_with_provider(inputs[i:i + batch])
+        vecs.extend(batch_vecs)
+        providers.add(provider)
+    if len(providers) > 1:
+        # Passages from two models are not comparable; the next scan rebuilds them
+        raise RuntimeError("Embedding provider changed while chunking the document")
+    # Hashed as the model that answered, so fallback passages are rebuilt later
+    digest = chunk_source_hash(pages, providers.pop()) if providers else digest
+
+    db.query(MaterialChunk).filter(MaterialChunk.material_id == material.id).delete(
+        synchronize_session=False
+    )
+    rows = [
+        MaterialChunk(
+            material_id=material.id,
+            chunk_index=i,
+            location=c.location,
+            text=c.text,
+            embedding=encode_embedding(vec),
+            source_hash=digest,
+        )
+        for i, (c, vec) in enumerate(zip(chunks, vecs))
+    ]
+    db.add_all(rows)
+    db.flush()
+    if embedding_coverage.vector_available and rows:
+        db.execute(
+            text("UPDATE material_chunks SET embedding_vec = :vec WHERE id = :cid"),
+            [{"vec": Vector(vec), "cid": row.id} for row, vec in zip(rows, vecs)],
+        )
+    db.commit()
+    chunk_coverage.mark_present()
+    return len(rows)
+
+
+def search_chunks(
+    db: Session,
+    query_vec: List[float],
+    limit: int,
+    filters,
+    material_id: Optional[int] = None,
+) -> List[ChunkHit]:
+    """
+    Best-matching passages, best first.
+    `filters` is a semantic_search.SearchFilters; its clauses apply to the joined material.
+    """
+    where_clauses, params = filters.sql()
+    if material_id is not None:
+        where_clauses.append("c.material_id = :chunk_material_id")
+        params["chunk_material_id"] = material_id
+
+    if embedding_coverage.vector_available:
+        sql, ann_params = ann_search_sql(
+            ["c.id", "c.material_id", "c.location", "c.text"],
+            "material_chunks c JOIN materials ON materials.id = c.material_id",
+            where_clauses,
+            limit,
+            vector_column="c.embedding_vec",
+        )
+        params.update(ann_params, qvec=Vector(query_vec))
+        apply_search_tuning(db, candidates=ann_params.get("ann_candidates", 0))
+        rows = db.execute(text(sql), params).fetchall()
+        return [ChunkHit(r[0], r[1], r[2], r[3], float(r[4])) for r in rows]
+
+    # Without pgvector: score the filtered chunks' stored embeddings in NumPy
+    rows = db.execute(text(f"""
+        SELECT c.id, c.material_id, c.location, c.text, c.embedding
+        FROM material_chunks c
+        JOIN materials ON materials.id = c.material_id
+        WHERE {" AND ".join(where_clauses + ["c.embedding IS NOT NULL"])}
+    """), params).fetchall()
+    q = np.asarray(query_vec, dtype=np.float32)
+    q_norm = float(np.linalg.norm(q)) or 1.0
+    scored = []
+    for r in rows:
+        vec = decode_embedding(r[4])
+        if vec is None or vec.shape != q.shape:
+            continue
+        norm = float(np.linalg.norm(vec)) or 1.0
+        scored.append(ChunkHit(r[0], r[1], r[2], r[3], float(vec @ q) / (norm * q_norm)))
+    scored.sort(key=lambda h: h.score, reverse=True)
+    return scored[:limit]
+
+
+def aggregate_by_material(hits: Iterable[ChunkHit]) -> List[Tuple[int, float, ChunkHit]]:
+    """Max-pool passage hits into (material_id, score, best passage), best first."""
+    best: Dict[int, ChunkHit] = {}
+    for h in hits:
+        if h.material_id not in best or h.score > best[h.material_id].score:
+            best[h.material_id] = h
+    return sorted(
+        ((mid, h.score, h) for mid, h in best.items()),
+        key=lambda t: t[1],
+        reverse=True,
+    )
+
+
+def passage_dict(hit: ChunkHit, snippet_chars: int = 400) -> dict:
+    return {
+        "chunk_id": hit.chunk_id,
+        "location": hit.location,
+        "text": hit.text if len(hit.text) <= snippet_chars else hit.text[:snippet_chars].rsplit(" ", 1)[0] + "…",
+        "score": round(hit.score, 4),
+    }
+
+
+class ChunkCoverage:
+    """Whether any chunks exist, re-checked at most every refresh_seconds."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._present = False
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def has_chunks(self, db: Session) -> bool:
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at > self.refresh_seconds:
+            try:
+                present = bool(db.execute(text("SELECT EXISTS (SELECT 1 FROM material_chunks)")).scalar())
+            except Exception as e:
+                # material_chunks is missing until migration 027 runs
+                logger.debug("Could not check material_chunks: %s", e)
+                db.rollback()
+                present = False
+            with self._lock:
+                self._present = present
+                self._checked_at = time.monotonic()
+        return self._present
+
+    def mark_present(self) -> None:
+        with self._lock:
+            self._present = True
+
+
+chunk_coverage = ChunkCoverage(refresh_seconds=settings.EMBEDDING_COVERAGE_REFRESH_SECONDS)
@@ -0,0 +1,209 @@
+"""
+Precomputed "more like this" lists.
+
+Each material's top SIMILAR_MATERIALS_TOP_N neighbours by cosine similarity
+of the stored embeddings are kept in material_neighbors, so related-content
+panels are a single indexed read: no query embedding and no ANN search.
+Lists are computed from the stored vectors (a LATERAL ANN query per material
+with pgvector, the in-memory index otherwise) and ignore status; hidden
+materials are filtered out when a list is read.
+
+When embeddings change, `refresh_neighbors` drops every list the change can
+affect - the changed materials' own lists, lists that contain them, lists
+that are not full yet, and lists whose weakest entry the changed material now
+beats - and recomputes the changed materials' lists. Dropped lists are rebuilt
+on their next read.
+"""
+import logging
+from datetime import datetime
+from typing import Iterable, List, Set, Tuple
+
+import numpy as np
+from sqlalchemy import exists, func, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.material import Material
+from app.models.material_neighbor import MaterialNeighbor
+from app.services.embedding_coverage import embedding_coverage
+from app.services.in_memory_vector_index import in_memory_vector_index
+from app.services.material_summary import SUMMARY_FIELDS
+from app.services.vector_index import ann_search_sql, apply_search_tuning
+
+logger = logging.getLogger(__name__)
+
+
+def _values_sql(ids: List[int], prefix: str) -> Tuple[str, dict]:
+    """A VALUES list of integer binds, e.g. for joining a set of material ids."""
+    params = {f"{prefix}{i}": mid for i, mid in enumerate(ids)}
+    return ", ".join(f"(:{name})" for name in params), params
+
+
+def _delete_lists(db: Session, material_ids: Iterable[int]) -> None:
+    db.query(MaterialNeighbor).filter(
+        MaterialNeighbor.material_id.in_(list(material_ids))
+    ).delete(synchronize_session=False)
+
+
+def compute_neighbors(db: Session, material_ids: Iterable[int]) -> int:
+    """Replace the neighbour lists of `material_ids`. Returns the number of rows written; caller commits."""
+    ids = sorted(set(material_ids))
+    if not ids:
+        return 0
+    top_n = settings.SIMILAR_MATERIALS_TOP_N
+    embedding_coverage.ensure_fresh(db)
+    if embedding_coverage.vector_available:
+        ann_sql, ann_params = ann_search_sql(
+            ["id"], "materials", ["id <> s.id"], top_n, query_vector="s.embedding_vec",
+        )
+        values, params = _values_sql(ids, "mid")
+        apply_search_tuning(db, candidates=ann_params.get("ann_candidates", top_n))
+        _delete_lists(db, ids)
+        result = db.execute(text(f"""
+            INSERT INTO material_neighbors (material_id, neighbor_id, rank, score, created_at, updated_at)
+            SELECT s.id, nb.id,
+                   row_number() OVER (PARTITION BY s.id ORDER BY nb.similarity DESC),
+                   nb.similarity, now(), now()
+            FROM (VALUES {values}) AS src(mid)
+            JOIN materials s ON s.id = src.mid AND s.embedding_vec IS NOT NULL
+            CROSS JOIN LATERAL ({ann_sql}) nb
+        """), {**params, **ann_params})
+        return result.rowcount or 0
+
+    in_memory_vector_index.ensure_loaded(db)
+    _delete_lists(db, ids)
+    now = datetime.utcnow()
+    rows = [
+        {
+            "material_id": mid, "neighbor_id": nid, "rank": rank, "score": score,
+            "created_at": now, "updated_at": now,
+        }
+        for mid in ids
+        for rank, (nid, score) in enumerate(in_memory_vector_index.neighbors(mid, top_n), start=1)
+    ]
+    if rows:
+        db.bulk_insert_mappings(MaterialNeighbor, rows)
+    return len(rows)
+
+
+def invalidate_neighbors(db: Session, material_ids: Iterable[int]) -> Set[int]:
+    """Delete every cached list a change to `material_ids` can affect. Returns the owners; caller commits."""
+    ids = sorted(set(material_ids))
+    if not ids:
+        return set()
+    top_n = settings.SIMILAR_MATERIALS_TOP_N
+
+    stale = set(ids)
+    stale.update(
+        r[0] for r in db.query(MaterialNeighbor.material_id)
+        .filter(MaterialNeighbor.neighbor_id.in_(ids)).distinct()
+    )
+
+    if embedding_coverage.vector_available:
+        values, params = _values_sql(ids, "cid")
+        rows = db.execute(text(f"""
+            SELECT DISTINCT f.material_id
+            FROM (
+                SELECT material_id, min(score) AS floor, count(*) AS entries
+                FROM material_neighbors GROUP BY material_id
+            ) f
+            JOIN materials m ON m.id = f.material_id
+            CROSS JOIN (VALUES {values}) AS changed(mid)
+            JOIN materials x ON x.id = changed.mid
+            WHERE x.embedding_vec IS NOT NULL
+              AND (f.entries < :top_n OR 1 - (m.embedding_vec <=> x.embedding_vec) > f.floor)
+        """), {**params, "top_n": top_n}).fetchall()
+        stale.update(r[0] for r in rows)
+    else:
+        in_memory_vector_index.ensure_loaded(db)
+        changed = [v for v in (in_memory_vector_index.vector(mid) for mid in ids) if v is not None]
+        if changed:
+            floors = db.query(
+                MaterialNeighbor.material_id,
+                func.min(MaterialNeighbor.score),
+                func.count(MaterialNeighbor.id),
+            ).group_by(MaterialNeighbor.material_id).all()
+            changed_matrix = np.vstack(changed)
+            for owner, floor, entries in floors:
+                vec = in_memory_vector_index.vector(owner)
+                if entries < top_n or (vec is not None and float((changed_matrix @ vec).max()) > floor):
+                    stale.add(owner)
+
+    _delete_lists(db, stale)
+    return stale
+
+
+def refresh_neighbors(db: Session, material_ids: Iterable[int]) -> None:
+    """After new embeddings are committed: drop affected lists and rebuild the changed materials' own."""
+    ids = list(material_ids)
+    if not ids:
+        return
+    try:
+        invalidate_neighbors(db, ids)
+        compute_neighbors(db, ids)
+        db.commit()
+    except Exception as e:
+        # The lists are a cache; a failed refresh is rebuilt on read
+        logger.warning("Refreshing neighbour lists for %d materials failed: %s", len(ids), e)
+        db.rollback()
+
+
+def get_neighbors(db: Session, material_id: int, limit: int) -> List[Tuple[object, float]]:
+    """(summary row, similarity) of a material's nearest visible neighbours, computing the list if missing."""
+    sql = text(f"""
+        SELECT {", ".join(f"m.{f}" for f in SUMMARY_FIELDS)}, n.score AS similarity
+        FROM material_neighbors n
+        JOIN materials m ON m.id = n.neighbor_id
+        WHERE n.material_id = :mid AND m.status NOT IN ('draft', 'archived')
+        ORDER BY n.rank
+        LIMIT :lim
+    """)
+    params = {"mid": material_id, "lim": limit}
+    rows = db.execute(sql, params).fetchall()
+    if not rows and _ensure_list(db, material_id):
+        rows = db.execute(sql, params).fetchall()
+    return [(r, float(r.similarity)) for r in rows]
+
+
+def _ensure_list(db: Session, material_id: int) -> bool:
+    """Compute a material's list if none is cached. Returns True if one was written."""
+    cached = db.query(MaterialNeighbor.id).filter(MaterialNeighbor.material_id == material_id).first()
+    if cached is None and compute_neighbors(db, [material_id]):
+        db.commit()
+        return True
+    return False
+
+
+def neighbor_scores(db: Session, material_id: int, min_score: float) -> List[Tuple[int, float]]:
+    """(neighbour id, similarity) of every cached neighbour at least `min_score` similar, any status."""
+    _ensure_list(db, material_id)
+    rows = db.query(MaterialNeighbor.neighbor_id, MaterialNeighbor.score).filter(
+        MaterialNeighbor.material_id == material_id,
+        MaterialNeighbor.score >= min_score,
+    ).order_by(MaterialNeighbor.rank).all()
+    return [(r[0], float(r[1])) for r in rows]
+
+
+def close_pairs(db: Session, min_score: float, batch_size: int = 200) -> List[Tuple[int, int, float]]:
+    """
+    (a, b, similarity) with a < b for every pair of materials at least `min_score`
+    similar. Lists missing for embedded materials are computed first.
+    """
+    missing = [
+        r[0] for r in db.query(Material.id).filter(
+            Material.embedding.isnot(None),
+            ~exists().where(MaterialNeighbor.material_id == Material.id),
+        )
+    ]
+    for i in range(0, len(missing), batch_size):
+        compute_neighbors(db, missing[i:i + batch_size])
+        db.commit()
+
+    best = {}
+    rows = db.query(MaterialNeighbor.material_id, MaterialNeighbor.neighbor_id, MaterialNeighbor.score).filter(
+        MaterialNeighbor.score >= min_score
+    )
+    for a, b, score in rows:
+        key = (min(a, b), max(a, b))
+        best[key] = max(best.get(key, 0.0), float(score))
+    return [(a, b, score) for (a, b), score in best.items()]
@@ -0,0 +1,103 @@
+"""
+Lightweight material summaries for listings.
+
+Search, discovery, dashboards and agent tools only show a handful of material
+fields, but loading full Material rows also pulls the embedding text (~20 KB
+per 1024-dim vector), search_text and executive_summary. These helpers select
+only the summary columns:
+
+- SUMMARY_COLUMNS / SUMMARY_FIELDS for column queries and raw SQL select lists
+  (so ranking queries can return the summary in the same round-trip),
+- summary_options() for ORM queries that need Material instances,
+- load_summaries() to hydrate ranked ids,
+- summary_to_dict() to serialize either kind of row for API responses.
+
+Rows from column queries and raw SQL expose the same attribute names as
+Material, so callers can treat them interchangeably.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session, load_only
+
+from app.models.material import Material
+
+SUMMARY_COLUMNS = (
+    Material.id,
+    Material.name,
+    Material.material_type,
+    Material.audience,
+    Material.product_name,
+    Material.universe_name,
+    Material.description,
+    Material.status,
+    Material.file_format,
+    Material.file_size,
+    Material.tags,
+    Material.keywords,
+    Material.use_cases,
+    Material.pain_points,
+    Material.usage_count,
+    Material.health_score,
+    Material.owner_id,
+    Material.created_at,
+    Material.updated_at,
+)
+SUMMARY_FIELDS = tuple(c.key for c in SUMMARY_COLUMNS)
+
+
+def summary_options():
+    """Loader option restricting a Material query to the summary columns."""
+    return load_only(*SUMMARY_COLUMNS)
+
+
+def load_summaries(db: Session, ids: Iterable[int]) -> Dict[int, Any]:
+    """Summary rows for `ids`, keyed by id. Missing ids are simply absent."""
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = db.query(*SUMMARY_COLUMNS).filter(Material.id.in_(ids)).all()
+    return {r.id: r for r in rows}
+
+
+def status_value(status) -> Optional[str]:
+    """Status as its lowercase value, whether loaded as MaterialStatus or a raw SQL string."""
+    if status is None:
+        return None
+    return str(getattr(status, "value", status)).lower()
+
+
+def json_list(raw) -> List[Any]:
+    """Decode a JSON-array text column, tolerating empty or malformed values."""
+    if not raw:
+        return []
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    return value if isinstance(value, list) else []
+
+
+def summary_to_dict(m, score: float = 0.0) -> dict:
+    """Serialize a Material or a summary row, with a similarity score."""
+    return {
+        "id": m.id,
+        "name": m.name,
+        "material_type": m.material_type,
+        "audience": m.audience,
+        "product_name": m.product_name,
+        "universe_name": m.universe_name,
+        "description": m.description,
+        "status": status_value(m.status),
+        "file_format": m.file_format,
+        "file_size": m.file_size,
+        "tags": m.tags,
+        "keywords": m.keywords,
+        "use_cases": m.use_cases,
+        "pain_points": m.pain_points,
+        "usage_count": m.usage_count,
+        "owner_id": m.owner_id,
+        "created_at": m.created_at.isoformat() if m.created_at else None,
+        "updated_at": m.updated_at.isoformat() if m.updated_at else None,
+        "similarity_score": round(score, 4),
+    }
@@ -0,0 +1,181 @@
+"""
+Search result cache and catalog version.
+
+Identical searches (same normalized query, filters, mode and limit) are served
+from an in-process LRU instead of re-running embed -> ANN -> hydrate. Entries
+are keyed on the catalog version, so any change to what search can return
+makes older entries unreachable rather than stale.
+
+The catalog version combines:
+- a local counter, bumped after every commit in this process that wrote a
+  Material or MaterialChunk (ORM flushes and bulk query.update/delete), and
+- a database fingerprint (row count + latest updated_at of materials),
+  re-read at most every SEARCH_CATALOG_SYNC_SECONDS so writes made by other
+  workers or scripts invalidate this worker's entries too.
+
+Each cached payload carries an ETag derived from its content, so the value is
+the same on every worker and repeated searches can be answered with 304.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CATALOG_TABLES = {"materials", "material_chunks"}
+_DIRTY_KEY = "catalog_dirty"
+
+
+class CatalogVersion:
+    """Process-local write counter plus a periodically synced database fingerprint."""
+
+    def __init__(self, sync_seconds: float):
+        self.sync_seconds = sync_seconds
+        self._counter = 0
+        self._fingerprint = ""
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def bump(self) -> None:
+        with self._lock:
+            self._counter += 1
+
+    def current(self, db: Session) -> str:
+        synced_at = self._synced_at
+        if synced_at is None or time.monotonic() - synced_at > self.sync_seconds:
+            self._sync(db)
+        return f"{self._counter}:{self._fingerprint}"
+
+    def _sync(self, db: Session) -> None:
+        try:
+            count, latest = db.execute(
+                text("SELECT count(*), max(updated_at) FROM materials")
+            ).one()
+            fingerprint = f"{count}@{latest.isoformat() if latest else '-'}"
+        except Exception as e:
+            logger.debug("Could not read catalog fingerprint: %s", e)
+            db.rollback()
+            fingerprint = self._fingerprint
+        with self._lock:
+            self._fingerprint = fingerprint
+            self._synced_at = time.monotonic()
+
+
+catalog_version = CatalogVersion(sync_seconds=settings.SEARCH_CATALOG_SYNC_SECONDS)
+
+
+def _touches_catalog(instances) -> bool:
+    return any(getattr(obj, "__tablename__", None) in _CATALOG_TABLES for obj in instances)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_catalog_flush(session, flush_context) -> None:
+    if _touches_catalog(session.new) or _touches_catalog(session.dirty) or _touches_catalog(session.deleted):
+        session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_catalog_bulk(orm_execute_state) -> None:
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.local_table.name in _CATALOG_TABLES:
+            orm_execute_state.session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_catalog_version(session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        catalog_version.bump()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_catalog_mark(session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
+
+
+def payload_etag(payload: Any) -> str:
+    """
+    Weak ETag of a payload's content. Weak because equivalent requests
+    (e.g. queries differing only in case) share the entry but echo their own query.
+    """
+    body = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return 'W/"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+
+class SearchResultCache:
+    """Size-bounded LRU with a per-entry TTL mapping search keys to (etag, payload)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: Hashable, payload: Any) -> str:
+        """Store a payload and return its ETag."""
+        etag = payload_etag(payload)
+        if self.maxsize <= 0:
+            return etag
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, etag, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return etag
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+search_result_cache = SearchResultCache(
+    maxsize=settings.SEARCH_RESULT_CACHE_SIZE,
+    ttl=settings.SEARCH_RESULT_CACHE_TTL,
+)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 7232 weak comparison against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == opaque for t in if_none_match.split(","))
@@ -1,11 +1,46 @@
 """
 File storage service - handles file uploads and storage
+
+New uploads are content-addressed blobs (see blob_store) with a reference
+count per blob; materials uploaded before that keep their folder-based paths,
+which get_file_path and delete_file still resolve.
 """
+import hashlib
+import logging
 import os
 import shutil
+import tempfile
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.models.storage_blob import StorageBlob
+from app.services.blob_store import blob_key, blob_sha256, create_backend
+
+logger = logging.getLogger(__name__)
+
+# Bytes copied per read when streaming an upload to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """Raised while streaming an upload that exceeds the allowed size"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"File exceeds maximum allowed size of {max_size} bytes")
+        self.max_size = max_size
+
+
+class PendingUpload(NamedTuple):
+    """An upload fully written to a temp file, not yet stored as a blob"""
+    temp_path: Path
+    folder_path: Path
+    size: int
+    sha256: str
+
 
 class StorageService:
     """Handles file storage operations"""
@@ -13,6 +48,9 @@ class StorageService:
     def __init__(self):
         self.storage_path = Path(settings.STORAGE_PATH)
         self.storage_path.mkdir(parents=True, exist_ok=True)
+        # Uploads are received here, on the same filesystem as local blobs
+        self.staging_path = self.storage_path / ".staging"
+        self.blobs = create_backend(settings.STORAGE_TYPE, self.storage_path)
         
         # Create folder structure
         self._create_folder_structure()
@@ -43,7 +81,7 @@ class StorageService:
             (self.storage_path / folder).mkdir(parents=True, exist_ok=True)
     
     def get_folder_path(self, material_type: str, audience: str, product_name: Optional[str] = None, universe_name: Optional[str] = None) -> Path:
-        """Get the folder path for a material based on type and audience"""
+        """Get the folder path for a material based on type and audience (layout of pre-blob uploads)"""
         if audience == "internal":
             if material_type == "product_brief":
                 if product_name:
@@ -93,20 +131,116 @@ class StorageService:
         
         return str(file_path.relative_to(self.storage_path))
     
+    async def receive_upload(self, upload, max_size: int, folder_path: Optional[Path] = None) -> PendingUpload:
+        """
+        Stream an UploadFile to a temp file in `folder_path` (the staging folder
+        by default) chunk by chunk, enforcing `max_size` and hashing as it goes,
+        so memory stays flat for any file size. The temp file is removed if
+        anything fails.
+        """
+        folder_path = folder_path or self.staging_path
+        folder_path.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=folder_path)
+        digest = hashlib.sha256()
+        size = 0
+
+        def write(out, chunk: bytes) -> None:
+            digest.update(chunk)
+            out.write(chunk)
+
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLargeError(max_size)
+                    await run_in_threadpool(write, out, chunk)
+                await run_in_threadpool(out.flush)
+                await run_in_threadpool(os.fsync, out.fileno())
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+        return PendingUpload(Path(temp_name), folder_path, size, digest.hexdigest())
+
+    def commit_upload(self, db: Session, pending: PendingUpload) -> str:
+        """
+        Store a received upload as a blob and count one more reference to it;
+        returns the blob key for Material.file_path. If the content is already
+        stored the temp file is simply dropped. The reference is counted in the
+        caller's transaction, before the bytes are stored, so a concurrent
+        release of the same blob either sees it or has already removed it.
+        """
+        now = datetime.utcnow()
+        db.execute(text("""
+            INSERT INTO storage_blobs (sha256, size, ref_count, created_at, updated_at)
+            VALUES (:sha256, :size, 1, :now, :now)
+            ON CONFLICT (sha256) DO UPDATE
+            SET ref_count = storage_blobs.ref_count + 1, updated_at = :now
+        """), {"sha256": pending.sha256, "size": pending.size, "now": now})
+        key = blob_key(pending.sha256)
+        self.blobs.put(key, pending.temp_path)
+        return key
+
+    def discard_upload(self, pending: Optional[PendingUpload]) -> None:
+        """Remove a received upload that was never committed (no-op once committed)"""
+        if pending is not None:
+            pending.temp_path.unlink(missing_ok=True)
+
     def get_file_path(self, relative_path: str) -> Path:
-        """Get full file path from relative path"""
+        """Get full file path from relative path (a local copy for remote blobs)"""
+        if blob_sha256(relative_path):
+            return self.blobs.local_path(relative_path)
         return self.storage_path / relative_path
     
     def file_exists(self, relative_path: str) -> bool:
         """Check if file exists"""
+        if blob_sha256(relative_path):
+            return self.blobs.exists(relative_path)
         return (self.storage_path / relative_path).exists()
     
     def delete_file(self, relative_path: str) -> bool:
-        """Delete a file"""
+        """Delete a legacy folder-based file (blobs are released with release_file)"""
+        if blob_sha256(relative_path):
+            return False
         file_path = self.storage_path / relative_path
         if file_path.exists():
             file_path.unlink()
             return True
         return False
 
+    def release_file(self, db: Session, relative_path: str) -> Optional[str]:
+        """
+        Drop one material's reference to its file, in the caller's transaction.
+        Returns the blob hash when that was the last reference; pass it to
+        purge_blob after committing. Legacy files are deleted right away.
+        """
+        sha256 = blob_sha256(relative_path)
+        if sha256 is None:
+            self.delete_file(relative_path)
+            return None
+        remaining = db.execute(text("""
+            UPDATE storage_blobs SET ref_count = ref_count - 1, updated_at = :now
+            WHERE sha256 = :sha256
+            RETURNING ref_count
+        """), {"sha256": sha256, "now": datetime.utcnow()}).scalar()
+        if remaining is not None and remaining > 0:
+            return None
+        db.query(StorageBlob).filter(StorageBlob.sha256 == sha256).delete(synchronize_session=False)
+        return sha256
+
+    def purge_blob(self, db: Session, sha256: Optional[str]) -> None:
+        """Delete a released blob's bytes unless a new upload referenced it meanwhile"""
+        if not sha256:
+            return
+        if db.query(StorageBlob.id).filter(StorageBlob.sha256 == sha256).first() is not None:
+            return
+        try:
+            self.blobs.delete(blob_key(sha256))
+        except Exception as e:
+            # An orphaned blob only costs space; the next upload of it reuses it
+            logger.warning("Failed to delete blob %s: %s", sha256, e)
+
 storage_service = StorageService()
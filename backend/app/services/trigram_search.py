@@ -0,0 +1,71 @@
+"""
+Trigram keyword matching shared by the ILIKE-style fallbacks.
+
+With pg_trgm installed (migration 025), a term matches a column when it is a
+substring (ILIKE '%term%') or when pg_trgm's word similarity clears its
+threshold (`term <% column`), so near misses like "clickhouse managed" or
+"kubernetes" typos still match. Both forms are served by the GIN trigram
+indexes, and the word-similarity score is exposed for ranking.
+
+Without pg_trgm (SQLite in tests, databases where the migration was not run)
+the match degrades to plain ILIKE and the score to a constant, so callers
+keep working and fall back to their secondary ordering.
+"""
+import logging
+import threading
+from typing import NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, func, literal, or_, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+logger = logging.getLogger(__name__)
+
+_available: Optional[bool] = None
+_lock = threading.Lock()
+
+
+class TrigramMatch(NamedTuple):
+    condition: ColumnElement
+    score: ColumnElement
+
+
+def trigram_available(db: Session) -> bool:
+    """Whether pg_trgm is installed. Checked once per process."""
+    global _available
+    if _available is not None:
+        return _available
+    with _lock:
+        if _available is None:
+            available = False
+            if db.get_bind().dialect.name == "postgresql":
+                try:
+                    available = bool(db.execute(
+                        text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                    ).scalar())
+                except Exception as e:
+                    logger.warning("Could not check for pg_trgm, using ILIKE matching: %s", e)
+                    db.rollback()
+            _available = available
+    return _available
+
+
+def trigram_match(db: Session, term: str, columns: Sequence[ColumnElement]) -> TrigramMatch:
+    """Match `term` against any of `columns`; score is the best word similarity."""
+    like = f"%{term}%"
+    if not trigram_available(db):
+        return TrigramMatch(or_(*(c.ilike(like) for c in columns)), literal(0.0))
+
+    term_lit = literal(term)
+    condition = or_(*(
+        or_(c.ilike(like), term_lit.op("<%")(c))
+        for c in columns
+    ))
+    scores = [func.word_similarity(term_lit, func.coalesce(c, "")) for c in columns]
+    score = scores[0] if len(scores) == 1 else func.greatest(*scores)
+    return TrigramMatch(condition, score)
+
+
+def trigram_match_all(db: Session, terms: Sequence[str], columns: Sequence[ColumnElement]) -> ColumnElement:
+    """Every term must match at least one of `columns`."""
+    return and_(*(trigram_match(db, t, columns).condition for t in terms))
@@ -0,0 +1,251 @@
+"""
+Resumable chunked uploads.
+
+A client creates a session with the file name, total size and the same
+metadata as POST /api/materials/upload, PUTs byte ranges at explicit offsets
+(in any order, in parallel, retrying any that fail) and then completes it.
+
+Everything lives on disk under STORAGE_PATH/.upload_sessions/<id>/, so sessions
+survive restarts and are shared by all workers:
+
+    session.json   name, size, expected checksum, metadata, owner, expiry
+    data           the file itself, preallocated; each chunk is written in place
+    ranges/        one empty marker per stored chunk, named "<offset>-<end>"
+
+Markers are only created after a chunk is fully written and fsynced, so the
+received ranges are exactly what is safely on disk. Completing a session hard
+links `data` into the staging folder (same filesystem as storage) from where
+it is stored as a blob, so the file is never copied or read into memory; only
+the checksum pass reads it.
+"""
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.storage import PendingUpload, storage_service
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+_HASH_BLOCK = 1024 * 1024
+
+
+class UploadSessionError(ValueError):
+    """Invalid use of an upload session (bad offset, incomplete file, checksum mismatch, ...)"""
+
+
+class UploadSessionBusy(UploadSessionError):
+    """The session is already being completed by another request"""
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Union of half-open [start, end) ranges, sorted."""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(received: List[Tuple[int, int]], total: int) -> List[Tuple[int, int]]:
+    """Gaps of [0, total) not covered by the (merged) received ranges."""
+    gaps, cursor = [], 0
+    for start, end in received:
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < total:
+        gaps.append((cursor, total))
+    return gaps
+
+
+class UploadSessionStore:
+    """Upload sessions as directories under `root`."""
+
+    def __init__(self, root: Path, ttl_seconds: float):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+
+    # -- sessions ------------------------------------------------------------
+
+    def create(
+        self,
+        owner_id: int,
+        file_name: str,
+        total_size: int,
+        metadata: Dict[str, Any],
+        sha256: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        self.purge_expired()
+        session_id = secrets.token_urlsafe(18)
+        path = self.root / session_id
+        (path / "ranges").mkdir(parents=True)
+        with open(path / "data", "wb") as f:
+            f.truncate(total_size)  # sparse: no disk is used until chunks arrive
+        now = time.time()
+        session = {
+            "session_id": session_id,
+            "owner_id": owner_id,
+            "file_name": file_name,
+            "total_size": total_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "metadata": metadata,
+            "created_at": now,
+            "expires_at": now + self.ttl_seconds,
+        }
+        self._write_json(path / "session.json", session)
+        return session
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if not _SESSION_ID.match(session_id or ""):
+            return None
+        try:
+            with open(self.root / session_id / "session.json") as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if session["expires_at"] < time.time():
+            self.delete(session_id)
+            return None
+        return session
+
+    def delete(self, session_id: str) -> None:
+        if _SESSION_ID.match(session_id or ""):
+            shutil.rmtree(self.root / session_id, ignore_errors=True)
+
+    def purge_expired(self) -> int:
+        """Remove sessions past their expiry; returns how many were removed."""
+        removed = 0
+        if not self.root.exists():
+            return 0
+        for path in self.root.iterdir():
+            try:
+                with open(path / "session.json") as f:
+                    expired = json.load(f)["expires_at"] < time.time()
+            except (OSError, ValueError, KeyError):
+                # Half-created session: expire it by age
+                expired = time.time() - path.stat().st_mtime > self.ttl_seconds
+            if expired:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    # -- chunks ----------------------------------------------------------------
+
+    def received(self, session: Dict[str, Any]) -> List[Tuple[int, int]]:
+        ranges = []
+        for marker in (self.root / session["session_id"] / "ranges").iterdir():
+            start, _, end = marker.name.partition("-")
+            ranges.append((int(start), int(end)))
+        return merge_ranges(ranges)
+
+    def progress(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        received = self.received(session)
+        return {
+            "session_id": session["session_id"],
+            "file_name": session["file_name"],
+            "total_size": session["total_size"],
+            "received_bytes": sum(end - start for start, end in received),
+            "missing_ranges": [list(r) for r in missing_ranges(received, session["total_size"])],
+            "chunk_size": settings.UPLOAD_CHUNK_SIZE,
+            "expires_at": session["expires_at"],
+        }
+
+    async def write_chunk(self, session: Dict[str, Any], offset: int, body: AsyncIterator[bytes]) -> int:
+        """
+        Write a streamed request body at `offset`. Chunks may arrive in any
+        order and concurrently; a retried chunk simply overwrites its range.
+        """
+        total = session["total_size"]
+        if offset < 0 or offset >= total:
+            raise UploadSessionError(f"offset must be within [0, {total})")
+        path = self.root / session["session_id"]
+        fd = await run_in_threadpool(os.open, path / "data", os.O_WRONLY)
+        written = 0
+        try:
+            async for piece in body:
+                if not piece:
+                    continue
+                if offset + written + len(piece) > total:
+                    raise UploadSessionError("chunk extends past the declared file size")
+                if written + len(piece) > settings.UPLOAD_MAX_CHUNK_SIZE:
+                    raise UploadSessionError(f"chunks are limited to {settings.UPLOAD_MAX_CHUNK_SIZE} bytes")
+                await run_in_threadpool(os.pwrite, fd, piece, offset + written)
+                written += len(piece)
+            await run_in_threadpool(os.fsync, fd)
+        finally:
+            os.close(fd)
+        if written:
+            (path / "ranges" / f"{offset}-{offset + written}").touch()
+        return written
+
+    # -- completion --------------------------------------------------------------
+
+    def begin_complete(self, session: Dict[str, Any]) -> None:
+        """Claim the session for completion so concurrent completes can't create two materials."""
+        try:
+            fd = os.open(self.root / session["session_id"] / "completing", os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise UploadSessionBusy("upload session is already being completed")
+        os.close(fd)
+
+    def end_complete(self, session: Dict[str, Any]) -> None:
+        (self.root / session["session_id"] / "completing").unlink(missing_ok=True)
+
+    async def assemble(self, session: Dict[str, Any], folder_path: Path) -> PendingUpload:
+        """
+        Expose the finished file as a PendingUpload in `folder_path` (hard link,
+        falling back to a streamed copy across filesystems) after checking that
+        every byte arrived and the checksum matches. The session keeps its data
+        until it is deleted, so a failed completion can be retried.
+        """
+        gaps = missing_ranges(self.received(session), session["total_size"])
+        if gaps:
+            raise UploadSessionError(f"upload is incomplete; missing byte ranges {gaps[:5]}")
+        data = self.root / session["session_id"] / "data"
+        digest = await run_in_threadpool(_sha256_file, data)
+        if session.get("sha256") and digest != session["sha256"]:
+            raise UploadSessionError("checksum mismatch; re-upload the file")
+
+        folder_path.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=folder_path)
+        os.close(fd)
+        os.unlink(temp_name)
+        try:
+            os.link(data, temp_name)
+        except OSError:
+            await run_in_threadpool(shutil.copyfile, data, temp_name)
+        return PendingUpload(Path(temp_name), folder_path, session["total_size"], digest)
+
+    @staticmethod
+    def _write_json(path: Path, payload: Dict[str, Any]) -> None:
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(payload, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+upload_sessions = UploadSessionStore(
+    root=storage_service.storage_path / ".upload_sessions",
+    ttl_seconds=settings.UPLOAD_SESSION_TTL_HOURS * 3600,
+)
@@ -0,0 +1,282 @@
+"""
+Buffered usage-event ingestion.
+
+View/download/track endpoints used to insert a MaterialUsage row and bump
+counters (materials.usage_count, shared_links.access_count, ...) with a
+read-modify-write and a commit before responding. They now hand both to
+`usage_ingester`, which keeps them in memory and a background task writes them:
+
+    events     one multi-row INSERT into material_usage per flush
+    counters   summed per row and applied with counters.apply_increments
+               (UPDATE ... SET c = c + :n), so concurrent workers never lose
+               increments; last_* timestamps take the latest value seen
+               since the previous flush
+
+Deduplicated events (a sales user re-opening the same material within a
+minute, ...) are checked twice: in-process when recorded, which drops most
+repeats without any query, and against material_usage when flushed
+(INSERT ... SELECT ... WHERE NOT EXISTS over the dedupe window), so several
+uvicorn workers do not double-count them. Two workers flushing the same
+repeat at the same instant can still both insert it.
+
+A flush runs every USAGE_FLUSH_INTERVAL_MS, or as soon as USAGE_FLUSH_BATCH
+events are waiting. Backpressure: once USAGE_MAX_PENDING events are buffered
+(e.g. the database is slow or down), `record` waits for a flush before
+accepting more, and if that flush fails the oldest events are dropped and
+counted. Whatever is still buffered is flushed on shutdown (lifespan close).
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.usage import MaterialUsage
+from app.services.counters import RowKey, apply_increments, validate
+
+logger = logging.getLogger(__name__)
+
+# Inserts an event unless the same (material, user, action) was stored since :dedupe_since
+_DEDUPED_INSERT = text("""
+    INSERT INTO material_usage (
+        material_id, user_id, action, used_at, shared_link_id, deal_room_id,
+        ip_address, user_agent, created_at, updated_at
+    )
+    SELECT :material_id, :user_id, :action, :used_at, :shared_link_id, :deal_room_id,
+        :ip_address, :user_agent, :used_at, :used_at
+    WHERE NOT EXISTS (
+        SELECT 1 FROM material_usage
+        WHERE material_id = :material_id AND user_id = :user_id AND action = :action
+        AND used_at >= :dedupe_since
+    )
+""")
+
+
+def client_info(request) -> Dict[str, Optional[str]]:
+    """ip_address / user_agent of a request, as stored on MaterialUsage."""
+    if request is None:
+        return {"ip_address": None, "user_agent": None}
+    user_agent = request.headers.get("user-agent")
+    return {
+        "ip_address": request.client.host if request.client else None,
+        "user_agent": user_agent[:500] if user_agent else None,
+    }
+
+
+class UsageIngester:
+    """In-process buffer of usage events and counter increments with a batching flush task."""
+
+    def __init__(self, flush_interval_ms: int, batch_size: int, max_pending: int):
+        self.flush_interval = max(flush_interval_ms, 10) / 1000
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max(self.batch_size, max_pending)
+        self._events: List[Dict[str, Any]] = []
+        self._counters: Dict[RowKey, Dict[str, int]] = defaultdict(dict)
+        self._timestamps: Dict[RowKey, Dict[str, datetime]] = defaultdict(dict)
+        self._recent: Dict[tuple, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.deduplicated = 0
+        self.failed_flushes = 0
+        self.last_error: Optional[str] = None
+
+    # -- producers ---------------------------------------------------------
+
+    async def record(
+        self,
+        material_id: int,
+        user_id: int,
+        action: str,
+        request=None,
+        shared_link_id: Optional[int] = None,
+        deal_room_id: Optional[int] = None,
+        dedupe_seconds: Optional[float] = None,
+    ) -> bool:
+        """
+        Buffer a MaterialUsage event. With `dedupe_seconds`, an identical
+        (material, user, action) event recorded within that window is skipped:
+        right away if this worker recorded it (returns False), otherwise at
+        flush time if another worker already stored it.
+        """
+        if dedupe_seconds:
+            key = (material_id, user_id, action)
+            now = time.monotonic()
+            if now - self._recent.get(key, float("-inf")) < dedupe_seconds:
+                self.deduplicated += 1
+                return False
+            self._recent[key] = now
+            if len(self._recent) > self.max_pending:
+                self._recent = {k: t for k, t in self._recent.items() if now - t < 3600}
+
+        if len(self._events) >= self.max_pending:
+            await self.flush()
+            overflow = len(self._events) - self.max_pending + 1
+            if overflow > 0:
+                # Still full: the database is not keeping up, keep the newest events
+                del self._events[:overflow]
+                self.dropped += overflow
+                logger.warning("Usage buffer full; dropped %d oldest events", overflow)
+
+        used_at = datetime.utcnow()
+        self._events.append({
+            "material_id": material_id,
+            "user_id": user_id,
+            "action": action,
+            "used_at": used_at,
+            "shared_link_id": shared_link_id,
+            "deal_room_id": deal_room_id,
+            **client_info(request),
+            "dedupe_since": used_at - timedelta(seconds=dedupe_seconds) if dedupe_seconds else None,
+        })
+        self.recorded += 1
+        if len(self._events) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def increment(self, table: str, row_id: int, column: str, amount: int = 1, **timestamps: datetime) -> None:
+        """Add `amount` to a counter column, and optionally set last_* columns, at the next flush."""
+        validate(table, (column,), timestamps)
+        key = (table, row_id)
+        counters = self._counters[key]
+        counters[column] = counters.get(column, 0) + amount
+        stamps = self._timestamps[key]
+        for name, value in timestamps.items():
+            if stamps.get(name) is None or value > stamps[name]:
+                stamps[name] = value
+
+    @property
+    def pending(self) -> int:
+        return len(self._events)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the flush task and write everything still buffered."""
+        task, self._task = self._task, None
+        if task is not None:
+            # Let an in-flight flush finish rather than cancelling it mid-write
+            self._stopping = True
+            self._wakeup.set()
+            await task
+            self._stopping = False
+        await self.flush()
+        if self._events or self._counters:
+            logger.error(
+                "Shutting down with %d usage events and %d counter rows unwritten",
+                len(self._events), len(self._counters),
+            )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if self._stopping:
+                return
+
+    # -- flushing ------------------------------------------------------------
+
+    async def flush(self) -> int:
+        """Write buffered events and counters in one transaction; returns the number of events written."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._events and not self._counters:
+                return 0
+            events, self._events = self._events, []
+            counters, self._counters = self._counters, defaultdict(dict)
+            timestamps, self._timestamps = self._timestamps, defaultdict(dict)
+            try:
+                rejected = await run_in_threadpool(self._write, events, counters, timestamps)
+            except Exception as e:
+                self.failed_flushes += 1
+                self.last_error = str(e)
+                logger.error("Flushing %d usage events failed: %s", len(events), e)
+                self._requeue(events, counters, timestamps)
+                return 0
+            self.dropped += rejected
+            self.written += len(events) - rejected
+            return len(events) - rejected
+
+    def _write(self, events, counters, timestamps) -> int:
+        """One transaction for the whole batch. Returns the number of events rejected by constraints."""
+        db = SessionLocal()
+        rejected = 0
+        try:
+            if events:
+                try:
+                    with db.begin_nested():
+                        self._insert_events(db, events)
+                except IntegrityError:
+                    # e.g. a material deleted since its event was buffered: keep the valid rows
+                    for event in events:
+                        try:
+                            with db.begin_nested():
+                                self._insert_events(db, [event])
+                        except IntegrityError:
+                            rejected += 1
+                    logger.warning("Discarded %d usage events that violate constraints", rejected)
+            apply_increments(db, counters, timestamps)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return rejected
+
+    @staticmethod
+    def _insert_events(db, events: List[Dict[str, Any]]) -> None:
+        plain = [{k: v for k, v in e.items() if k != "dedupe_since"} for e in events if e["dedupe_since"] is None]
+        deduped = [e for e in events if e["dedupe_since"] is not None]
+        if plain:
+            # executemany of one INSERT: SQLAlchemy sends it as multi-row VALUES batches
+            db.execute(insert(MaterialUsage.__table__), plain)
+        if deduped:
+            db.execute(_DEDUPED_INSERT, deduped)
+
+    def _requeue(self, events, counters, timestamps) -> None:
+        """Put a failed flush back in front of newer data, within the buffer limit."""
+        self._events[:0] = events
+        overflow = len(self._events) - self.max_pending
+        if overflow > 0:
+            del self._events[:overflow]
+            self.dropped += overflow
+        for key, columns in counters.items():
+            merged = self._counters[key]
+            for column, amount in columns.items():
+                merged[column] = merged.get(column, 0) + amount
+        for key, stamps in timestamps.items():
+            merged_stamps = self._timestamps[key]
+            for name, value in stamps.items():
+                if merged_stamps.get(name) is None or value > merged_stamps[name]:
+                    merged_stamps[name] = value
+
+
+usage_ingester = UsageIngester(
+    flush_interval_ms=settings.USAGE_FLUSH_INTERVAL_MS,
+    batch_size=settings.USAGE_FLUSH_BATCH,
+    max_pending=settings.USAGE_MAX_PENDING,
+)
@@ -0,0 +1,188 @@
+"""
+pgvector ANN index query-time tuning and compressed index modes.
+
+hnsw.ef_search trades recall for latency on the HNSW index (pgvector default 40);
+ivfflat.probes does the same for IVFFlat (default 1). Both are set with
+set_config(..., is_local => true) so they only last for the current transaction
+and never leak into other requests sharing the pooled connection.
+
+EMBEDDING_INDEX_PRECISION / EMBEDDING_INDEX_DIMENSIONS select what the ANN
+index is built on (migration 028):
+
+    full    vector(1024), the stored column itself (default)
+    half    halfvec - half-precision floats, half the index size
+    binary  binary_quantize() bits with Hamming distance, 1/32 of the size
+
+EMBEDDING_INDEX_DIMENSIONS > 0 additionally indexes only the leading
+dimensions (Matryoshka truncation, for models trained for it). With any
+compressed mode, ann_search_sql fetches EMBEDDING_RESCORE_FACTOR x the
+requested rows through the compressed index and re-ranks them by exact cosine
+distance on the full-precision embedding_vec, so returned similarities are
+always full precision.
+"""
+import logging
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Width of the embedding_vec columns (migrations 018 and 027)
+VECTOR_COLUMN_DIMENSIONS = 1024
+INDEX_PRECISIONS = ("full", "half", "binary")
+QUERY_VECTOR = "CAST(:qvec AS vector)"
+# pgvector rejects hnsw.ef_search above this, so compressed-index candidate pools stop here too
+HNSW_MAX_EF_SEARCH = 1000
+
+
+class AnnExpression(NamedTuple):
+    indexed: str   # expression the ANN index is built on
+    query: str     # the same transform applied to the :qvec parameter
+    operator: str
+    opclass: str
+
+    @property
+    def compressed(self) -> bool:
+        return self.opclass != "vector_cosine_ops" or "subvector" in self.indexed
+
+
+def ann_expression(
+    column: str = "embedding_vec",
+    precision: Optional[str] = None,
+    dimensions: Optional[int] = None,
+    query_vector: str = QUERY_VECTOR,
+) -> AnnExpression:
+    """Index / ORDER BY expressions for a vector column under the configured storage mode."""
+    precision = (precision or settings.EMBEDDING_INDEX_PRECISION or "full").lower()
+    if precision not in INDEX_PRECISIONS:
+        raise ValueError(f"Unknown embedding index precision {precision!r}; expected one of {INDEX_PRECISIONS}")
+    if dimensions is None:
+        dimensions = settings.EMBEDDING_INDEX_DIMENSIONS
+    dims = dimensions if 0 < dimensions < VECTOR_COLUMN_DIMENSIONS else VECTOR_COLUMN_DIMENSIONS
+    truncated = dims < VECTOR_COLUMN_DIMENSIONS
+
+    def prefix(expr: str) -> str:
+        return f"subvector({expr}, 1, {dims})" if truncated else expr
+
+    if precision == "binary":
+        return AnnExpression(
+            f"(binary_quantize({prefix(column)})::bit({dims}))",
+            f"binary_quantize({prefix(query_vector)})::bit({dims})",
+            "<~>",
+            "bit_hamming_ops",
+        )
+    if precision == "half":
+        return AnnExpression(
+            f"({prefix(column)}::halfvec({dims}))",
+            f"{prefix(query_vector)}::halfvec({dims})",
+            "<=>",
+            "halfvec_cosine_ops",
+        )
+    if truncated:
+        return AnnExpression(
+            f"({prefix(column)}::vector({dims}))",
+            f"{prefix(query_vector)}::vector({dims})",
+            "<=>",
+            "vector_cosine_ops",
+        )
+    return AnnExpression(column, query_vector, "<=>", "vector_cosine_ops")
+
+
+def ann_search_sql(
+    columns: Sequence[str],
+    from_sql: str,
+    where_clauses: Sequence[str],
+    limit: int,
+    vector_column: str = "embedding_vec",
+    expression: Optional[AnnExpression] = None,
+    rescore_factor: Optional[int] = None,
+    query_vector: str = QUERY_VECTOR,
+    limit_sql: str = ":lim",
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Top-:lim rows by cosine distance to :qvec, plus a `similarity` column.
+
+    `columns` may be table-qualified ("c.id"); with a compressed index they are
+    re-selected by their bare name from the rescoring subquery. Returns the SQL
+    and the extra bind params (lim, ann_candidates); the caller binds :qvec.
+
+    `query_vector` and `limit_sql` replace :qvec / :lim with SQL expressions,
+    e.g. columns of an outer query when used inside a LATERAL join.
+    """
+    expr = expression or ann_expression(vector_column, query_vector=query_vector)
+    where = " AND ".join([f"{vector_column} IS NOT NULL", *where_clauses])
+    exact = f"{vector_column} <=> {query_vector}"
+    params = {"lim": limit} if limit_sql == ":lim" else {}
+
+    if not expr.compressed:
+        sql = f"""
+            SELECT {", ".join(columns)}, 1 - ({exact}) AS similarity
+            FROM {from_sql}
+            WHERE {where}
+            ORDER BY {exact}
+            LIMIT {limit_sql}
+        """
+        return sql, params
+
+    factor = max(1, rescore_factor or settings.EMBEDDING_RESCORE_FACTOR)
+    if limit_sql == ":lim":
+        candidates_sql = ":ann_candidates"
+        params["ann_candidates"] = min(limit * factor, max(limit, HNSW_MAX_EF_SEARCH))
+    else:
+        candidates_sql = f"LEAST(({limit_sql}) * {factor}, GREATEST({limit_sql}, {HNSW_MAX_EF_SEARCH}))"
+    names = [c.rsplit(".", 1)[-1] for c in columns]
+    sql = f"""
+        SELECT {", ".join(names)}, 1 - (ann_vec <=> {query_vector}) AS similarity
+        FROM (
+            SELECT {", ".join(columns)}, {vector_column} AS ann_vec
+            FROM {from_sql}
+            WHERE {where}
+            ORDER BY {expr.indexed} {expr.operator} {expr.query}
+            LIMIT {candidates_sql}
+        ) ann
+        ORDER BY ann_vec <=> {query_vector}
+        LIMIT {limit_sql}
+    """
+    return sql, params
+
+
+def apply_search_tuning(
+    db: Session,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    candidates: int = 0,
+) -> None:
+    """
+    Apply ANN search knobs for the current transaction, falling back to settings.
+    HNSW returns at most ef_search rows, so ef_search is raised to `candidates`,
+    up to pgvector's limit of HNSW_MAX_EF_SEARCH.
+
+    Runs in a SAVEPOINT: if the settings are rejected (e.g. pgvector missing)
+    only that is rolled back, never the caller's transaction.
+    """
+    ef = min(max(ef_search or settings.EMBEDDING_HNSW_EF_SEARCH, candidates, 1), HNSW_MAX_EF_SEARCH)
+    pr = max(probes or settings.EMBEDDING_IVFFLAT_PROBES, 1)
+    try:
+        with db.begin_nested():
+            db.execute(
+                text(
+                    "SELECT set_config('hnsw.ef_search', :ef, true), "
+                    "set_config('ivfflat.probes', :pr, true)"
+                ),
+                {"ef": str(int(ef)), "pr": str(int(pr))},
+            )
+    except Exception as e:
+        logger.warning("Could not apply vector search tuning (ef_search=%s, probes=%s): %s", ef, pr, e)
+
+
+def index_mode() -> Dict[str, object]:
+    """The configured ANN storage mode, for status endpoints."""
+    expr = ann_expression()
+    return {
+        "precision": (settings.EMBEDDING_INDEX_PRECISION or "full").lower(),
+        "dimensions": settings.EMBEDDING_INDEX_DIMENSIONS or VECTOR_COLUMN_DIMENSIONS,
+        "rescore_factor": settings.EMBEDDING_RESCORE_FACTOR if expr.compressed else None,
+    }
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Relevance benchmark for vector vs. full-text vs. hybrid (RRF) material search.
+
+Seeds a small labelled corpus of published materials under a dedicated
+universe ("Hybrid Bench"), embeds them with the configured provider, runs a
+fixed set of queries with known relevant materials through each retrieval
+mode and reports MRR, recall@k and nDCG@k. The seeded rows are deleted at the
+end unless --keep is given.
+
+The query set mixes exact product names (where full-text wins), paraphrases
+(where vectors win) and mixed intents, which is where fusion should help.
+
+Usage:
+    python -m scripts.benchmark_hybrid_search
+    python -m scripts.benchmark_hybrid_search --k 5 --keep
+"""
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal
+from app.core.vector_codec import Vector, encode_embedding
+from app.models.material import Material, MaterialStatus
+from app.services.embedding_service import build_material_text, embed_query, embed_texts
+from app.services.embedding_coverage import embedding_coverage
+from app.services.in_memory_vector_index import in_memory_vector_index
+from app.services.hybrid_search import reciprocal_rank_fusion
+from app.api.semantic_search import SearchFilters, _fulltext_candidates, _vector_candidates
+
+BENCH_UNIVERSE = "Hybrid Bench"
+
+# (key, name, product, material_type, description)
+CORPUS = [
+    ("ch_brief", "Managed ClickHouse product brief", "Managed ClickHouse", "product_brief",
+     "Columnar analytics database service for real-time OLAP queries over billions of rows."),
+    ("ch_story", "Retailer cuts dashboard latency", "Managed ClickHouse", "customer_story",
+     "A retail chain moved its reporting warehouse and now serves sub-second analytics dashboards."),
+    ("k8s_brief", "Managed Kubernetes Service product brief", "Managed Kubernetes Service", "product_brief",
+     "Certified Kubernetes control plane with free managed masters and autoscaling node pools."),
+    ("k8s_deck", "Container orchestration sales deck", "Managed Kubernetes Service", "sales_deck",
+     "Pitch for teams running microservices in containers who want to stop operating clusters themselves."),
+    ("s3_brief", "Object Storage product brief", "Object Storage", "product_brief",
+     "S3-compatible object storage with high durability, lifecycle rules and no egress fees."),
+    ("s3_pricing", "Object Storage pricing summary", "Object Storage", "pricing_summary",
+     "Pay-as-you-go storage pricing per GB, with free incoming and outgoing traffic."),
+    ("bm_brief", "Bare Metal servers datasheet", "Bare Metal", "datasheet",
+     "Dedicated physical servers with guaranteed resources, anti-DDoS and private networking."),
+    ("gpu_brief", "Cloud GPU instances product brief", "Cloud GPU", "product_brief",
+     "NVIDIA GPU virtual machines for model training, fine-tuning and inference workloads."),
+    ("ai_deploy", "AI Deploy playbook", "AI Deploy", "gtm_playbook",
+     "How to sell hosted model serving: package a model as a container and expose it as an API."),
+    ("pg_brief", "Managed PostgreSQL product brief", "Managed PostgreSQL", "product_brief",
+     "Fully managed relational database with automated backups, point-in-time recovery and HA."),
+    ("backup_roi", "Backup and disaster recovery ROI case", "Veeam Enterprise", "roi_business_case",
+     "Business case for off-site backups and disaster recovery of virtual machines."),
+    ("sov_brief", "Sovereign cloud market brief", "Hosted Private Cloud", "market_brief",
+     "Data sovereignty and compliance requirements for public sector and regulated industries in Europe."),
+]
+
+# (query, relevant keys)
+QUERIES = [
+    ("Managed ClickHouse", {"ch_brief", "ch_story"}),
+    ("Managed Kubernetes Service", {"k8s_brief", "k8s_deck"}),
+    ("fast analytics for reporting dashboards", {"ch_brief", "ch_story"}),
+    ("run containers without managing clusters", {"k8s_deck", "k8s_brief"}),
+    ("cheap storage with no egress fees", {"s3_brief", "s3_pricing"}),
+    ("dedicated physical servers", {"bm_brief"}),
+    ("train machine learning models on GPUs", {"gpu_brief"}),
+    ("serve a model as an API", {"ai_deploy"}),
+    ("Managed PostgreSQL backups", {"pg_brief"}),
+    ("recover VMs after a disaster", {"backup_roi"}),
+    ("GDPR and data residency for government customers", {"sov_brief"}),
+    ("Object Storage pricing", {"s3_pricing", "s3_brief"}),
+]
+
+
+def _seed(db):
+    """Insert the bench corpus. Returns ({key: material_id}, materials)."""
+    materials = {}
+    for key, name, product, mtype, description in CORPUS:
+        m = Material(
+            name=f"[bench] {name}",
+            material_type=mtype,
+            audience="internal",
+            product_name=product,
+            universe_name=BENCH_UNIVERSE,
+            status=MaterialStatus.PUBLISHED,
+            description=description,
+        )
+        db.add(m)
+        materials[key] = m
+    db.commit()
+    return {key: m.id for key, m in materials.items()}, list(materials.values())
+
+
+async def _embed(db, materials):
+    vecs = await embed_texts([build_material_text(m) for m in materials])
+    for m, vec in zip(materials, vecs):
+        m.embedding = encode_embedding(vec)
+        if embedding_coverage.vector_available:
+            db.execute(
+                text("UPDATE materials SET embedding_vec = :vec WHERE id = :mid"),
+                {"vec": Vector(vec), "mid": m.id},
+            )
+    db.commit()
+
+
+def _metrics(ranked, relevant, k):
+    top = ranked[:k]
+    rr = next((1.0 / i for i, doc in enumerate(top, start=1) if doc in relevant), 0.0)
+    recall = len(set(top) & relevant) / len(relevant)
+    dcg = sum(1.0 / math.log2(i + 1) for i, doc in enumerate(top, start=1) if doc in relevant)
+    ideal = sum(1.0 / math.log2(i + 1) for i in range(1, min(len(relevant), k) + 1))
+    return rr, recall, dcg / ideal if ideal else 0.0
+
+
+async def _run(db, ids, k, pool):
+    filters = SearchFilters(universe=BENCH_UNIVERSE)
+    embedding_coverage.refresh(db)
+    if not embedding_coverage.vector_available:
+        in_memory_vector_index.load(db)
+    scores = {mode: [] for mode in ("vector", "fulltext", "hybrid")}
+
+    for query, relevant_keys in QUERIES:
+        relevant = {ids[key] for key in relevant_keys}
+        qvec = await embed_query(query)
+        vector_hits = _vector_candidates(qvec, pool, filters, db)
+        fulltext_hits = _fulltext_candidates(query, pool, filters, db)
+        fused = reciprocal_rank_fusion({"vector": vector_hits, "fulltext": fulltext_hits})
+
+        scores["vector"].append(_metrics([h[0] for h in vector_hits], relevant, k))
+        scores["fulltext"].append(_metrics([h[0] for h in fulltext_hits], relevant, k))
+        scores["hybrid"].append(_metrics([h.id for h in fused], relevant, k))
+
+    print(f"\n{len(QUERIES)} queries, {len(CORPUS)} materials\n")
+    print(f"{'mode':<10}{'MRR':>8}{'recall@' + str(k):>12}{'nDCG@' + str(k):>10}")
+    for mode, rows in scores.items():
+        mrr, recall, ndcg = (statistics.mean(col) for col in zip(*rows))
+        print(f"{mode:<10}{mrr:>8.3f}{recall:>12.3f}{ndcg:>10.3f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--pool", type=int, default=20, help="Candidates retrieved per signal before fusion")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded materials after the run")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    ids = {}
+    try:
+        embedding_coverage.refresh(db)
+        ids, materials = _seed(db)
+        await _embed(db, materials)
+        await _run(db, ids, args.k, args.pool)
+    finally:
+        if ids and not args.keep:
+            db.rollback()
+            db.query(Material).filter(Material.id.in_(list(ids.values()))).delete(synchronize_session=False)
+            db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
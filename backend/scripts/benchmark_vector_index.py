@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Compare recall and latency of exact vs. HNSW vs. IVFFlat pgvector search.
+
+Seeds a scratch table (bench_embedding_vectors) in a local Postgres with
+clustered random unit vectors, computes exact top-k with NumPy as ground truth,
+then builds each index type and sweeps its query-time knob
+(hnsw.ef_search / ivfflat.probes). The materials table is never touched.
+
+Usage:
+    python -m scripts.benchmark_vector_index --rows 20000 --dim 1024
+    python -m scripts.benchmark_vector_index --database-url postgresql://postgres@localhost:5434/bench
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from app.core.vector_codec import Vector, register_vector_adapters
+
+TABLE = "bench_embedding_vectors"
+
+
+def _make_corpus(rows: int, dim: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors - closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(rows // 200, 8), dim)).astype(np.float32)
+    assignment = rng.integers(0, len(centers), size=rows)
+    data = centers[assignment] + 0.35 * rng.standard_normal((rows, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data
+
+
+def _seed(conn, data: np.ndarray) -> None:
+    dim = data.shape[1]
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    conn.execute(text(f"CREATE TABLE {TABLE} (id integer PRIMARY KEY, embedding_vec vector({dim}))"))
+    batch = 500
+    for start in range(0, len(data), batch):
+        conn.execute(
+            text(f"INSERT INTO {TABLE} (id, embedding_vec) VALUES (:id, CAST(:vec AS vector))"),
+            [{"id": start + i, "vec": Vector(v)} for i, v in enumerate(data[start:start + batch])],
+        )
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def _run_queries(conn, queries: np.ndarray, truth: np.ndarray, k: int, setup_sql: str = ""):
+    latencies = []
+    recalls = []
+    for q, expected in zip(queries, truth):
+        trans = conn.begin()
+        if setup_sql:
+            conn.execute(text(setup_sql))
+        started = time.perf_counter()
+        rows = conn.execute(
+            text(
+                f"SELECT id FROM {TABLE} ORDER BY embedding_vec <=> CAST(:q AS vector) LIMIT :k"
+            ),
+            {"q": Vector(q), "k": k},
+        ).fetchall()
+        latencies.append((time.perf_counter() - started) * 1000)
+        trans.rollback()
+        found = {r[0] for r in rows}
+        recalls.append(len(found & set(expected.tolist())) / k)
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recalls),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def _index_size(conn) -> str:
+    with conn.begin():
+        return conn.execute(
+            text("SELECT pg_size_pretty(pg_relation_size('bench_embedding_vec_idx'))")
+        ).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", "postgresql://postgres@localhost:5432/sales_enablement_bench"))
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch table after the run")
+    args = parser.parse_args()
+
+    data = _make_corpus(args.rows, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = data[rng.choice(len(data), size=args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, : args.k]
+
+    engine = create_engine(args.database_url)
+    register_vector_adapters(engine)
+    with engine.connect() as conn:
+        print(f"Seeding {args.rows} x {args.dim} vectors into {TABLE}...")
+        with conn.begin():
+            _seed(conn, data)
+
+        results = []
+        exact = _run_queries(conn, queries, truth, args.k, "SET LOCAL enable_indexscan = off")
+        results.append(("exact (seq scan)", "-", exact, "-"))
+
+        with conn.begin():
+            conn.execute(text(
+                f"CREATE INDEX bench_embedding_vec_idx ON {TABLE} "
+                "USING hnsw (embedding_vec vector_cosine_ops) WITH (m = 16, ef_construction = 128)"
+            ))
+        size = _index_size(conn)
+        for ef in (20, 40, 100, 200):
+            stats = _run_queries(conn, queries, truth, args.k, f"SET LOCAL hnsw.ef_search = {ef}")
+            results.append(("hnsw m=16 efc=128", f"ef_search={ef}", stats, size))
+
+        lists = max(args.rows // 1000, 10)
+        with conn.begin():
+            conn.execute(text("DROP INDEX bench_embedding_vec_idx"))
+            conn.execute(text(
+                f"CREATE INDEX bench_embedding_vec_idx ON {TABLE} "
+                f"USING ivfflat (embedding_vec vector_cosine_ops) WITH (lists = {lists})"
+            ))
+        size = _index_size(conn)
+        for probes in (1, 5, 10, 20):
+            stats = _run_queries(conn, queries, truth, args.k, f"SET LOCAL ivfflat.probes = {probes}")
+            results.append((f"ivfflat lists={lists}", f"probes={probes}", stats, size))
+
+        if not args.keep:
+            with conn.begin():
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+    print(f"\n{'index':<22}{'knob':<16}{'recall@' + str(args.k):>10}{'p50 ms':>10}{'p95 ms':>10}{'size':>12}")
+    for name, knob, stats, size in results:
+        print(f"{name:<22}{knob:<16}{stats['recall']:>10.3f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
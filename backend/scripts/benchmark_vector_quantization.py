@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Compare recall@k, latency and index size of compressed embedding storage modes.
+
+Builds a synthetic clustered corpus (default 100k x 1024 unit vectors), takes
+exact float32 top-k as ground truth, then for each mode scans the compressed
+vectors for EMBEDDING_RESCORE_FACTOR x k candidates and re-ranks them with the
+full-precision vectors - the same two-stage search ann_search_sql runs in
+Postgres. Recall is reported before and after rescoring.
+
+Modes: float32 (baseline), float16 (halfvec), int8 scalar quantization
+(per-dimension scale), binary sign bits (binary_quantize, Hamming distance),
+and Matryoshka truncation to the leading 256 / 512 dimensions. Random vectors
+are not Matryoshka-trained, so truncation recall here is a pessimistic bound.
+NumPy has no fast float16/int8 matmul, so in-process latencies of those modes
+include an upcast per block; use the pgvector run for realistic latencies.
+
+With --database-url the pgvector modes (full, half, binary, truncated) are also
+built as real HNSW expression indexes on a scratch table (bench_embedding_vectors)
+to report on-disk index size and SQL latency. The materials table is never touched.
+
+Usage:
+    python -m scripts.benchmark_vector_quantization
+    python -m scripts.benchmark_vector_quantization --rows 20000 --database-url postgresql://postgres@localhost:5434/bench
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from scripts.benchmark_vector_index import TABLE, _make_corpus, _seed
+
+BLOCK_ROWS = 16384
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _blocked_scores(codes: np.ndarray, q: np.ndarray, scale: np.ndarray = None) -> np.ndarray:
+    """codes @ q in float32 blocks, so compressed codes are never fully expanded."""
+    out = np.empty(len(codes), dtype=np.float32)
+    qs = q * scale if scale is not None else q
+    for start in range(0, len(codes), BLOCK_ROWS):
+        out[start:start + BLOCK_ROWS] = codes[start:start + BLOCK_ROWS].astype(np.float32) @ qs
+    return out
+
+
+def _truncate(x: np.ndarray, dims: int) -> np.ndarray:
+    t = np.ascontiguousarray(x[:, :dims])
+    return t / np.linalg.norm(t, axis=1, keepdims=True)
+
+
+def _build_modes(data: np.ndarray) -> Dict[str, Tuple[int, Callable[[np.ndarray], np.ndarray]]]:
+    """mode -> (stored bytes, query -> approximate scores, higher is better)."""
+    modes: Dict[str, Tuple[int, Callable]] = {}
+    modes["float32"] = (data.nbytes, lambda q: data @ q)
+
+    half = data.astype(np.float16)
+    modes["half (float16)"] = (half.nbytes, lambda q: _blocked_scores(half, q))
+
+    scale = np.abs(data).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    int8 = np.clip(np.round(data / scale), -127, 127).astype(np.int8)
+    modes["int8 scalar"] = (int8.nbytes + scale.nbytes, lambda q: _blocked_scores(int8, q, scale))
+
+    bits = np.packbits(data > 0, axis=1)
+    modes["binary"] = (
+        bits.nbytes,
+        lambda q: -_POPCOUNT[np.bitwise_xor(bits, np.packbits(q > 0))].sum(axis=1, dtype=np.int32),
+    )
+
+    for dims in (512, 256):
+        if dims < data.shape[1]:
+            t = _truncate(data, dims)
+            modes[f"matryoshka {dims}"] = (t.nbytes, lambda q, t=t, d=dims: t @ (q[:d] / np.linalg.norm(q[:d])))
+            th = t.astype(np.float16)
+            modes[f"matryoshka {dims} + half"] = (
+                th.nbytes, lambda q, th=th, d=dims: _blocked_scores(th, q[:d] / np.linalg.norm(q[:d]))
+            )
+    return modes
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _run_numpy(data, queries, truth, k, factor) -> List[tuple]:
+    results = []
+    for name, (nbytes, score_fn) in _build_modes(data).items():
+        raw_recalls, recalls, latencies = [], [], []
+        for q, expected in zip(queries, truth):
+            started = time.perf_counter()
+            candidates = _top(score_fn(q), k * factor)
+            exact = data[candidates] @ q
+            found = candidates[np.argsort(-exact)[:k]]
+            latencies.append((time.perf_counter() - started) * 1000)
+            expected = set(expected.tolist())
+            raw_recalls.append(len(set(candidates[:k].tolist()) & expected) / k)
+            recalls.append(len(set(found.tolist()) & expected) / k)
+        latencies.sort()
+        results.append((
+            name, float(np.mean(raw_recalls)), float(np.mean(recalls)),
+            latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1], nbytes,
+        ))
+    return results
+
+
+def _run_pgvector(database_url, data, queries, truth, k, factor, keep) -> List[tuple]:
+    from sqlalchemy import create_engine, text
+
+    from app.core.vector_codec import Vector, register_vector_adapters
+    from app.services.vector_index import ann_expression, ann_search_sql
+
+    engine = create_engine(database_url)
+    register_vector_adapters(engine)
+    results = []
+    with engine.connect() as conn:
+        print(f"Seeding {len(data)} x {data.shape[1]} vectors into {TABLE}...")
+        with conn.begin():
+            _seed(conn, data)
+
+        for precision, dims in (("full", 0), ("half", 0), ("binary", 0), ("full", 256), ("half", 256)):
+            expr = ann_expression("embedding_vec", precision, dims)
+            with conn.begin():
+                conn.execute(text("DROP INDEX IF EXISTS bench_embedding_vec_idx"))
+                conn.execute(text(
+                    f"CREATE INDEX bench_embedding_vec_idx ON {TABLE} "
+                    f"USING hnsw ({expr.indexed} {expr.opclass}) WITH (m = 16, ef_construction = 128)"
+                ))
+                size = conn.execute(
+                    text("SELECT pg_relation_size('bench_embedding_vec_idx')")
+                ).scalar()
+            sql, params = ann_search_sql(["id"], TABLE, [], k, expression=expr, rescore_factor=factor)
+            ef = max(100, params.get("ann_candidates", 0))
+
+            recalls, latencies = [], []
+            for q, expected in zip(queries, truth):
+                trans = conn.begin()
+                conn.execute(text(f"SET LOCAL hnsw.ef_search = {ef}"))
+                started = time.perf_counter()
+                rows = conn.execute(text(sql), {"qvec": Vector(q), **params}).fetchall()
+                latencies.append((time.perf_counter() - started) * 1000)
+                trans.rollback()
+                recalls.append(len({r[0] for r in rows} & set(expected.tolist())) / k)
+            latencies.sort()
+            label = precision + (f" / {dims} dims" if dims else "")
+            results.append((
+                label, None, float(np.mean(recalls)),
+                latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1], size,
+            ))
+
+        if not keep:
+            with conn.begin():
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    return results
+
+
+def _print(title: str, results: List[tuple], k: int, size_label: str) -> None:
+    print(f"\n{title}")
+    print(f"{'mode':<26}{'recall@' + str(k):>10}{'rescored':>10}{'p50 ms':>10}{'p95 ms':>10}{size_label:>14}")
+    for name, raw, rescored, p50, p95, size in results:
+        raw_s = f"{raw:.3f}" if raw is not None else "-"
+        print(f"{name:<26}{raw_s:>10}{rescored:>10.3f}{p50:>10.2f}{p95:>10.2f}{size / 2**20:>12.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"), help="Also benchmark pgvector expression indexes")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch table after the run")
+    args = parser.parse_args()
+    if args.database_url and args.dim != 1024:
+        parser.error("--database-url needs --dim 1024 (the width of the embedding_vec columns)")
+
+    print(f"Building {args.rows} x {args.dim} corpus...")
+    data = _make_corpus(args.rows, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = data[rng.choice(len(data), size=args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.stack([_top(data @ q, args.k) for q in queries])
+
+    _print(
+        f"In-process scan, top {args.k * args.rescore_factor} candidates rescored in float32",
+        _run_numpy(data, queries, truth, args.k, args.rescore_factor),
+        args.k, "vectors",
+    )
+    if args.database_url:
+        _print(
+            "pgvector HNSW expression indexes (ann_search_sql)",
+            _run_pgvector(args.database_url, data, queries, truth, args.k, args.rescore_factor, args.keep),
+            args.k, "index",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Recompute materials.usage_count and shared_links access/download counts from
+the material_usage event log (see app/services/counters.py). Safe to run while
+the API is serving; schedule it e.g. nightly from cron.
+Usage: python -m scripts.reconcile_counters [--dry-run]
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.database import SessionLocal
+from app.services.counters import reconcile_counters
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main(dry_run: bool = False):
+    db = SessionLocal()
+    try:
+        corrected = reconcile_counters(db, dry_run=dry_run)
+        for counter, rows in corrected.items():
+            logger.info("%s: %d rows %s", counter, rows, "out of date" if dry_run else "corrected")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile usage counters with material_usage")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many rows have drifted")
+    main(dry_run=parser.parse_args().dry_run)
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 """
-Regenerate embeddings for all materials. Run after migrating to BGE-M3 (1024 dims).
-Usage: python -m scripts.regenerate_embeddings
+Regenerate embeddings for materials that have none or whose content changed
+since they were embedded (per materials.embedding_content_hash).
+Pass --force to re-embed everything, e.g. after migrating to BGE-M3 (1024 dims).
+Usage: python -m scripts.regenerate_embeddings [--force]
 """
+import argparse
 import asyncio
-import json
 import logging
 import sys
 from pathlib import Path
@@ -12,21 +14,21 @@ from pathlib import Path
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-
 from app.core.database import SessionLocal
 from app.models.material import Material
-from app.services.embedding_service import embed_texts, build_material_text
+from app.services.embedding_coverage import embedding_coverage
+from app.services.embedding_pipeline import needs_embedding, store_embedding
+from app.services.embedding_service import embed_texts_with_provider, build_material_text, content_hash
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def main():
+async def main(force: bool = False):
     db = SessionLocal()
     try:
-        materials = db.query(Material).filter(Material.embedding.is_(None)).all()
+        embedding_coverage.refresh(db)
+        materials = [m for m in db.query(Material).all() if force or needs_embedding(m)]
         total = len(materials)
         logger.info("Regenerating embeddings for %d materials...", total)
 
@@ -40,14 +42,10 @@ async def main():
                 continue
             mats, txts = zip(*valid)
             try:
-                vecs = await embed_texts(list(txts))
-                for mat, vec in zip(mats, vecs):
-                    vec_str = "[" + ",".join(f"{v:.8f}" for v in vec) + "]"
-                    mat.embedding = json.dumps(vec)
-                    db.execute(
-                        text("UPDATE materials SET embedding_vec = :vec WHERE id = :mid"),
-                        {"vec": vec_str, "mid": mat.id},
-                    )
+                vecs, provider = await embed_texts_with_provider(list(txts))
+                for mat, txt, vec in zip(mats, txts, vecs):
+                    store_embedding(mat, vec, db)
+                    mat.embedding_content_hash = content_hash(txt, provider)
                 db.commit()
                 success += len(mats)
                 logger.info("Batch %d-%d: %d done (total %d/%d)", i, i + len(mats), len(mats), success, total)
@@ -61,4 +59,6 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Regenerate material embeddings")
+    parser.add_argument("--force", action="store_true", help="Re-embed every material, not just changed ones")
+    asyncio.run(main(force=parser.parse_args().force))
@@ -11,7 +11,7 @@ from app.core.security import get_password_hash
 from app.models.user import User
 
 # Test database URL (use separate test database)
-TEST_DATABASE_URL = "postgresql://postgres@localhost:5434/sales_enablement_test"
+TEST_DATABASE_URL = "postgresql+psycopg://postgres@localhost:5434/sales_enablement_test"
 
 engine = create_engine(TEST_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
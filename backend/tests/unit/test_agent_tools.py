@@ -0,0 +1,42 @@
+"""
+Unit tests for agent tool execution.
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.material import Material, MaterialStatus
+from app.services import agent_tools
+from app.services.agent_tools import execute_tool
+
+
+def test_search_tool_embeds_on_the_callers_event_loop(monkeypatch):
+    """Test that the async search executor awaits embed_query directly, without a worker thread or new loop."""
+    engine = create_engine("sqlite://")
+    Material.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Material(id=1, name="Managed Kubernetes deck", material_type="sales_deck", audience="internal",
+                    status=MaterialStatus.PUBLISHED))
+    db.commit()
+
+    calls = []
+
+    async def embed_query(query):
+        calls.append((query, asyncio.get_running_loop(), threading.current_thread()))
+        return [0.1, 0.2]
+
+    monkeypatch.setattr(agent_tools, "embed_query", embed_query)
+    monkeypatch.setattr(agent_tools, "embedding_coverage", SimpleNamespace(has_vectors=lambda db: True))
+
+    async def scenario():
+        result = await execute_tool("search_materials", {"query": "kubernetes"}, SimpleNamespace(role="sales"), db)
+        return result, asyncio.get_running_loop()
+
+    (ok, output), loop = asyncio.run(scenario())
+    # pgvector SQL fails on SQLite, so the answer comes from the keyword fallback
+    assert ok and 'ID 1: "Managed Kubernetes deck"' in output
+    assert calls == [("kubernetes", loop, threading.main_thread())]
+    db.close()
@@ -0,0 +1,81 @@
+"""
+Unit tests for atomic usage counters and their reconciliation.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.usage import MaterialUsage
+from app.services.counters import apply_increments, reconcile_counters
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    MaterialUsage.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE materials (id INTEGER PRIMARY KEY, usage_count INTEGER, last_updated DATETIME)"))
+        conn.execute(text(
+            "CREATE TABLE shared_links (id INTEGER PRIMARY KEY, access_count INTEGER, download_count INTEGER,"
+            " last_accessed_at DATETIME, last_downloaded_at DATETIME)"
+        ))
+    return sessionmaker(bind=engine)()
+
+
+def _counts(db):
+    return (
+        db.execute(text("SELECT id, usage_count FROM materials ORDER BY id")).all(),
+        db.execute(text("SELECT id, access_count, download_count FROM shared_links ORDER BY id")).all(),
+    )
+
+
+def test_apply_increments_updates_in_sql_and_rejects_unknown_columns():
+    """Test that deltas are added in SQL starting from NULL and only whitelisted columns are accepted."""
+    db = _session()
+    db.execute(text("INSERT INTO materials (id, usage_count) VALUES (1, NULL), (2, 4)"))
+    db.execute(text("INSERT INTO shared_links (id, access_count, download_count) VALUES (10, 1, 0)"))
+    apply_increments(db, {("materials", 1): {"usage_count": 3}, ("materials", 2): {"usage_count": 1}})
+    apply_increments(
+        db,
+        {("shared_links", 10): {"access_count": 2, "download_count": 1}},
+        {("shared_links", 10): {"last_downloaded_at": datetime(2024, 1, 1)}},
+    )
+    assert _counts(db) == ([(1, 3), (2, 5)], [(10, 3, 1)])
+    assert db.execute(text("SELECT last_downloaded_at FROM shared_links")).scalar() is not None
+
+    with pytest.raises(ValueError):
+        apply_increments(db, {("materials", 1): {"name": 1}})
+    with pytest.raises(ValueError):
+        apply_increments(db, {("materials", 1): {"usage_count": 1}}, {("materials", 1): {"created_at": datetime(2024, 1, 1)}})
+    db.close()
+
+
+def test_reconcile_recomputes_counters_from_usage_events():
+    """Test that drifted counters are reset to the counts implied by material_usage."""
+    db = _session()
+    db.execute(text("INSERT INTO materials (id, usage_count) VALUES (1, 40), (2, 1), (3, NULL)"))
+    db.execute(text("INSERT INTO shared_links (id, access_count, download_count) VALUES (10, 9, 0), (11, 0, 0)"))
+    events = [
+        (1, "download", None, None), (1, "download", 10, None), (1, "view", 10, None),
+        (1, "view", None, 5), (1, "view", None, None), (2, "view", None, None),
+    ]
+    for material_id, action, link_id, room_id in events:
+        db.execute(
+            text(
+                "INSERT INTO material_usage (material_id, user_id, action, used_at, shared_link_id, deal_room_id,"
+                " created_at) VALUES (:m, 1, :a, CURRENT_TIMESTAMP, :l, :r, CURRENT_TIMESTAMP)"
+            ),
+            {"m": material_id, "a": action, "l": link_id, "r": room_id},
+        )
+    db.commit()
+
+    assert reconcile_counters(db, dry_run=True) == {
+        "materials.usage_count": 3, "shared_links.download_count": 1, "shared_links.access_count": 1,
+    }
+    assert _counts(db)[0][0] == (1, 40)
+
+    reconcile_counters(db)
+    assert _counts(db) == ([(1, 3), (2, 0), (3, 0)], [(10, 2, 1), (11, 0, 0)])
+    assert set(reconcile_counters(db).values()) == {0}
+    db.close()
@@ -0,0 +1,48 @@
+"""
+Unit tests for MinHash / LSH near-duplicate detection.
+"""
+import numpy as np
+
+from app.services.duplicate_detection import (
+    _clusters,
+    estimated_jaccard,
+    lsh_buckets,
+    minhash_signature,
+    shingle_hashes,
+)
+
+_WORDS = [f"word{i}" for i in range(400)]
+
+
+def _signature(words):
+    return minhash_signature(shingle_hashes(" ".join(words), 5), 128)
+
+
+def test_signature_estimates_shingle_jaccard():
+    """Test that a lightly edited document scores high and an unrelated one low."""
+    original = _signature(_WORDS)
+    edited = _signature(_WORDS[:200] + ["changed"] + _WORDS[201:])
+    unrelated = _signature([f"other{i}" for i in range(400)])
+
+    assert estimated_jaccard(original, original) == 1.0
+    assert estimated_jaccard(original, edited) > 0.9
+    assert estimated_jaccard(original, unrelated) < 0.1
+
+
+def test_signatures_are_stable_and_case_insensitive():
+    """Test that signatures don't depend on process state or letter case, so stored ones stay comparable."""
+    a = _signature(_WORDS)
+    b = minhash_signature(shingle_hashes(" ".join(_WORDS).upper(), 5), 128)
+    assert a.dtype == np.uint32
+    assert np.array_equal(a, b)
+
+
+def test_near_duplicates_share_lsh_buckets():
+    """Test that near-duplicates collide in some band and groups are connected components."""
+    original = lsh_buckets(_signature(_WORDS), 32)
+    edited = lsh_buckets(_signature(_WORDS[:390] + ["tail"] * 10), 32)
+    unrelated = lsh_buckets(_signature([f"other{i}" for i in range(400)]), 32)
+
+    assert set(original) & set(edited)
+    assert not set(original) & set(unrelated)
+    assert sorted(_clusters([(1, 2), (2, 3), (7, 9)])) == [[1, 2, 3], [7, 9]]
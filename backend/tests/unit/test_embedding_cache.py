@@ -0,0 +1,127 @@
+"""
+Unit tests for the query embedding cache.
+"""
+import asyncio
+import time
+
+from app.services.embedding_service import QueryEmbeddingCache, normalize_query
+
+
+def test_normalize_query_collapses_whitespace_and_case():
+    """Test that trivially different queries normalize to the same key."""
+    assert normalize_query("  Managed   ClickHouse ") == "managed clickhouse"
+
+
+def test_cache_hit_and_miss_counters():
+    """Test that lookups update hit/miss counters."""
+    cache = QueryEmbeddingCache(maxsize=4, ttl=60)
+    key = ("kubernetes", "auto", "m")
+
+    assert cache.get(key) is None
+    cache.put(key, [0.1, 0.2])
+
+    assert cache.get(key) == [0.1, 0.2]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the oldest untouched entry is evicted when full."""
+    cache = QueryEmbeddingCache(maxsize=2, ttl=60)
+    cache.put(("a", "p", "m"), [1.0])
+    cache.put(("b", "p", "m"), [2.0])
+    cache.get(("a", "p", "m"))
+    cache.put(("c", "p", "m"), [3.0])
+
+    assert cache.get(("b", "p", "m")) is None
+    assert cache.get(("a", "p", "m")) == [1.0]
+
+
+def test_cache_entries_expire():
+    """Test that entries older than the TTL are not served."""
+    cache = QueryEmbeddingCache(maxsize=2, ttl=0.01)
+    cache.put(("a", "p", "m"), [1.0])
+    time.sleep(0.02)
+
+    assert cache.get(("a", "p", "m")) is None
+
+
+def _auto_with_ovh(monkeypatch):
+    from app.services import embedding_service
+
+    monkeypatch.setattr(embedding_service.settings, "EMBEDDING_PROVIDER", "auto")
+    monkeypatch.setattr(embedding_service.settings, "OVH_AI_EMBEDDING_URL", "https://ovh.example/v1/embeddings")
+    monkeypatch.setattr(embedding_service.settings, "OVH_AI_API_KEY", "key")
+
+
+def test_embed_queries_embeds_only_uncached_queries_once(monkeypatch):
+    """Test that a batch reuses cached vectors and embeds the rest, as typed, in one call."""
+    from app.services import embedding_service
+
+    calls = []
+
+    async def fake_embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts], "ovh"
+
+    cache = QueryEmbeddingCache(maxsize=8, ttl=60)
+    _auto_with_ovh(monkeypatch)
+    monkeypatch.setattr(embedding_service, "query_embedding_cache", cache)
+    monkeypatch.setattr(embedding_service, "embed_texts_with_provider", fake_embed)
+    cache.put(embedding_service._query_cache_key("cached"), [9.0])
+
+    vecs, embedded = asyncio.run(
+        embedding_service.embed_queries(["cached", "Object  Storage", "object storage", "dbaas"])
+    )
+
+    assert calls == [["Object  Storage", "dbaas"]]
+    assert embedded == 2
+    assert vecs == [[9.0], [15.0], [15.0], [5.0]]
+    assert cache.stats()["size"] == 3
+
+
+def test_local_fallback_vectors_are_not_cached(monkeypatch):
+    """Test that in auto mode with OVH configured a vector from the local fallback is served but not cached."""
+    from app.services import embedding_service
+
+    provider = ["local"]
+
+    async def fake_embed(texts):
+        return [[1.0] if provider[0] == "local" else [2.0] for _ in texts], provider[0]
+
+    cache = QueryEmbeddingCache(maxsize=8, ttl=60)
+    _auto_with_ovh(monkeypatch)
+    monkeypatch.setattr(embedding_service, "query_embedding_cache", cache)
+    monkeypatch.setattr(embedding_service, "embed_texts_with_provider", fake_embed)
+
+    assert asyncio.run(embedding_service.embed_query("kubernetes")) == [1.0]
+    provider[0] = "ovh"
+    assert asyncio.run(embedding_service.embed_query("kubernetes")) == [2.0]
+    assert asyncio.run(embedding_service.embed_query("Kubernetes")) == [2.0]
+    assert cache.stats()["hits"] == 1
+
+
+def test_auto_without_ovh_config_caches_local_vectors(monkeypatch):
+    """Test that repeated queries hit the cache when "auto" can only use the local model."""
+    from app.services import embedding_service
+
+    calls = []
+
+    async def local_embed(texts):
+        calls.append(list(texts))
+        return [[3.0] for _ in texts]
+
+    cache = QueryEmbeddingCache(maxsize=8, ttl=60)
+    monkeypatch.setattr(embedding_service.settings, "EMBEDDING_PROVIDER", "auto")
+    monkeypatch.setattr(embedding_service.settings, "OVH_AI_EMBEDDING_URL", "")
+    monkeypatch.setattr(embedding_service.settings, "OVH_AI_API_KEY", "")
+    monkeypatch.setattr(embedding_service, "query_embedding_cache", cache)
+    monkeypatch.setattr(embedding_service.local_embedding_executor, "embed", local_embed)
+
+    assert asyncio.run(embedding_service.embed_query("kubernetes")) == [3.0]
+    assert asyncio.run(embedding_service.embed_query("Kubernetes ")) == [3.0]
+    assert asyncio.run(embedding_service.embed_queries(["kubernetes", "dbaas"])) == ([[3.0], [3.0]], 1)
+
+    assert calls == [["kubernetes"], ["dbaas"]]
+    assert cache.stats()["size"] == 2 and cache.stats()["hits"] == 2
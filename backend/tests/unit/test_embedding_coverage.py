@@ -0,0 +1,58 @@
+"""
+Unit tests for the in-process embedding coverage counter.
+"""
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.services.embedding_coverage import EmbeddingCoverage
+
+
+def _session(with_vectors=True):
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        if with_vectors:
+            conn.execute(text("CREATE TABLE materials (id INTEGER PRIMARY KEY, embedding_vec TEXT)"))
+            conn.execute(text("INSERT INTO materials VALUES (1, '[0.1]'), (2, NULL), (3, NULL)"))
+        else:
+            conn.execute(text("CREATE TABLE materials (id INTEGER PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO materials VALUES (1), (2)"))
+    return sessionmaker(bind=engine)()
+
+
+def test_write_hooks_update_counts_until_the_next_refresh():
+    """Test that hooks keep coverage current in-process and a stale refresh resyncs from the database."""
+    db = _session()
+    coverage = EmbeddingCoverage(refresh_seconds=3600)
+
+    assert coverage.has_vectors(db)
+    assert (coverage.total, coverage.embedded) == (3, 1)
+
+    coverage.mark_created(4)
+    coverage.mark_embedded(2)
+    coverage.mark_embedded(2)
+    coverage.mark_deleted(1)
+    snapshot = coverage.snapshot()
+    assert (snapshot["total_materials"], snapshot["vector_embedded"]) == (3, 1)
+    assert snapshot["vector_coverage_ratio"] == 0.3333
+
+    # Within the interval the database is not read again
+    db.execute(text("UPDATE materials SET embedding_vec = '[0.2]'"))
+    coverage.ensure_fresh(db)
+    assert coverage.embedded == 1
+
+    coverage._refreshed_at -= 3601
+    coverage.ensure_fresh(db)
+    assert (coverage.total, coverage.embedded) == (3, 3)
+    db.close()
+
+
+def test_missing_vector_column_disables_vector_search():
+    """Test that without embedding_vec the tracker reports no vectors instead of failing."""
+    db = _session(with_vectors=False)
+    coverage = EmbeddingCoverage(refresh_seconds=3600)
+    coverage.total = 2
+
+    assert not coverage.has_vectors(db)
+    assert coverage.snapshot()["vector_available"] is False
+    assert coverage.total == 2 and coverage.embedded == 0
+    db.close()
@@ -0,0 +1,43 @@
+"""
+Unit tests for the local embedding executor's micro-batching.
+"""
+import asyncio
+
+from app.services.embedding_executor import EmbeddingExecutor
+
+
+def _fake_embed(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+    return embed
+
+
+def test_concurrent_single_texts_share_one_model_call():
+    """Test that concurrent single-text requests are merged into one batch."""
+    calls = []
+    executor = EmbeddingExecutor(_fake_embed(calls), max_batch=8, max_wait_ms=20)
+
+    async def run():
+        results = await asyncio.gather(*(executor.embed([t]) for t in ("a", "bb", "ccc")))
+        await executor.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert results == [[[1.0]], [[2.0]], [[3.0]]]
+    assert calls == [["a", "bb", "ccc"]]
+
+
+def test_multi_text_requests_bypass_the_batcher():
+    """Test that bulk calls go straight to the pool as a single model call."""
+    calls = []
+    executor = EmbeddingExecutor(_fake_embed(calls), max_batch=8, max_wait_ms=20)
+
+    async def run():
+        result = await executor.embed(["one", "three"])
+        await executor.close()
+        return result
+
+    assert asyncio.run(run()) == [[3.0], [5.0]]
+    assert calls == [["one", "three"]]
@@ -0,0 +1,204 @@
+"""
+Unit tests for the incremental embedding pipeline's queue, retries and batch sizing.
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.material import Material
+from app.services import embedding_pipeline, embedding_service
+from app.services.embedding_coverage import EmbeddingCoverage
+from app.services.embedding_pipeline import MAX_ATTEMPTS, EmbeddingPipeline, needs_embedding
+from app.services.embedding_service import build_material_text, content_hash
+from app.services.in_memory_vector_index import InMemoryVectorIndex
+
+
+def _material(**fields):
+    values = dict(
+        id=1, name="Managed Kubernetes", product_name=None, universe_name=None, description="Deck",
+        tags=None, keywords=None, use_cases=None, pain_points=None, executive_summary=None,
+        embedding="[0.1]", embedding_content_hash=None,
+    )
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def test_batch_size_grows_on_fast_full_batches_and_halves_when_slow():
+    """Test that the batch size doubles up to the max and halves past the target time."""
+    pipeline = EmbeddingPipeline(initial_batch=8, max_batch=20, target_seconds=2.0)
+
+    pipeline._adapt(8, 0.5)
+    assert pipeline.batch_size == 16
+    pipeline._adapt(16, 0.5)
+    assert pipeline.batch_size == 20
+    # A partial batch says nothing about capacity
+    pipeline._adapt(3, 0.1)
+    assert pipeline.batch_size == 20
+    pipeline._adapt(20, 3.0)
+    assert pipeline.batch_size == 10
+
+
+def test_failed_materials_are_retried_up_to_max_attempts():
+    """Test that a failing material goes back to the dirty set until it runs out of attempts."""
+    pipeline = EmbeddingPipeline(initial_batch=4, max_batch=4, target_seconds=1.0)
+    assert pipeline.enqueue([1, 2]) == 2
+    assert pipeline.enqueue([2]) == 0
+
+    for _ in range(MAX_ATTEMPTS - 1):
+        pipeline._retry([1])
+        assert 1 in pipeline._dirty
+    pipeline._dirty.discard(1)
+    pipeline._retry([1])
+    assert 1 not in pipeline._dirty
+    assert pipeline.failed == 1 and 1 not in pipeline._attempts
+
+
+def test_worker_requeues_a_failed_batch_and_shrinks_it(monkeypatch):
+    """Test that the worker retries a failed batch with half the batch size."""
+    pipeline = EmbeddingPipeline(initial_batch=4, max_batch=4, target_seconds=1.0)
+    batches = []
+
+    async def process(batch):
+        batches.append(sorted(batch))
+        if len(batches) == 1:
+            raise RuntimeError("provider down")
+
+    monkeypatch.setattr(pipeline, "_process", process)
+
+    async def scenario():
+        pipeline.enqueue([1, 2, 3])
+        await pipeline.start(scan_on_start=False)
+        while len(batches) < 3:
+            await asyncio.sleep(0.05)
+        await pipeline.close()
+
+    asyncio.run(scenario())
+    assert batches[0] == [1, 2, 3]
+    assert sorted(batches[1] + batches[2]) == [1, 2, 3]
+    assert pipeline.batch_size == 2 and pipeline.last_error == "provider down"
+
+
+def _configure(monkeypatch, provider, ovh):
+    monkeypatch.setattr(embedding_service.settings, "EMBEDDING_PROVIDER", provider)
+    monkeypatch.setattr(embedding_service.settings, "OVH_AI_EMBEDDING_URL", "https://ovh.example/v1/embeddings" if ovh else "")
+    monkeypatch.setattr(embedding_service.settings, "OVH_AI_API_KEY", "key" if ovh else "")
+
+
+def test_fallback_embeddings_read_as_stale(monkeypatch):
+    """Test that a vector hashed as the local fallback is re-embedded in auto mode when OVH is configured."""
+    _configure(monkeypatch, "auto", ovh=True)
+    material = _material()
+    body = build_material_text(material)
+
+    material.embedding_content_hash = content_hash(body, "local")
+    assert needs_embedding(material)
+    material.embedding_content_hash = content_hash(body, "ovh")
+    assert not needs_embedding(material)
+
+    monkeypatch.setattr(embedding_service.settings, "EMBEDDING_PROVIDER", "local")
+    assert needs_embedding(material)
+
+
+def test_auto_without_ovh_config_embeds_locally_once(monkeypatch):
+    """Test that with no OVH endpoint, "auto" vectors are up to date and never scheduled for retry."""
+    _configure(monkeypatch, "auto", ovh=False)
+    engine = create_engine("sqlite://")
+    Material.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Material(id=1, name="Managed Kubernetes", description="Sales deck", material_type="sales_deck",
+                    audience="internal"))
+    db.commit()
+    db.close()
+
+    async def embed(texts):
+        return [[0.1, 0.2] for _ in texts]
+
+    requeued = []
+    pipeline = EmbeddingPipeline(initial_batch=4, max_batch=4, target_seconds=1.0)
+    monkeypatch.setattr(embedding_pipeline, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(embedding_pipeline, "embedding_coverage", EmbeddingCoverage(refresh_seconds=3600))
+    monkeypatch.setattr(embedding_pipeline, "in_memory_vector_index", InMemoryVectorIndex(refresh_seconds=3600))
+    monkeypatch.setattr(embedding_pipeline, "refresh_neighbors", lambda db, ids: None)
+    monkeypatch.setattr(embedding_service, "local_embedding_executor", SimpleNamespace(embed=embed))
+    monkeypatch.setattr(pipeline, "_requeue_later", requeued.append)
+
+    asyncio.run(pipeline._process([1]))
+
+    db = sessionmaker(bind=engine)()
+    material = db.query(Material).one()
+    assert pipeline.embedded == 1 and requeued == []
+    assert not needs_embedding(material)
+    assert pipeline.enqueue_if_changed(material) is False
+    db.close()
+
+
+def test_chunk_job_reuses_pages_extracted_at_upload(monkeypatch):
+    """Test that handed-over pages are chunked and fingerprinted without extracting the file again."""
+    engine = create_engine("sqlite://")
+    Material.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        Material(id=1, name="Deck", material_type="sales_deck", audience="internal", file_path="a.pdf", file_format="pdf"),
+        Material(id=2, name="Brief", material_type="product_brief", audience="internal", file_path="b.pdf", file_format="pdf"),
+    ])
+    db.commit()
+    db.close()
+    monkeypatch.setattr(embedding_pipeline, "SessionLocal", sessionmaker(bind=engine))
+
+    extracted, chunked, fingerprinted = [], [], []
+
+    async def extract(path, file_format):
+        extracted.append(path)
+        return [("1", "re-extracted")]
+
+    async def build(material, db, pages):
+        chunked.append((material.id, pages))
+        return len(pages)
+
+    async def fingerprint(material, db, pages):
+        fingerprinted.append(material.id)
+
+    monkeypatch.setattr(embedding_pipeline, "extract_pages_from_file", extract)
+    monkeypatch.setattr(embedding_pipeline, "build_material_chunks", build)
+    monkeypatch.setattr(embedding_pipeline, "fingerprint_material", fingerprint)
+    monkeypatch.setattr(embedding_pipeline.storage_service, "get_file_path", lambda path: path)
+
+    pipeline = EmbeddingPipeline(initial_batch=4, max_batch=4, target_seconds=1.0)
+    pipeline.enqueue_extracted(1, [("1", "uploaded text")])
+    pipeline.enqueue_extracted(2, [("1", "old upload")])
+    # Re-queuing without pages (e.g. the file was replaced) drops the stale ones
+    pipeline.enqueue_chunks([2])
+
+    async def scenario():
+        for material_id in (1, 2):
+            await pipeline._run_chunk_job(material_id)
+
+    asyncio.run(scenario())
+    assert chunked == [(1, [("1", "uploaded text")]), (2, [("1", "re-extracted")])]
+    assert extracted == ["b.pdf"] and fingerprinted == [1, 2]
+    assert pipeline.chunked == 2 and not pipeline._pages
+
+
+def test_forced_scan_keeps_updated_at(monkeypatch):
+    """Test that a forced re-embed queues every material without touching updated_at."""
+    engine = create_engine("sqlite://")
+    Material.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    stamp = datetime(2024, 1, 1)
+    db.add_all(
+        Material(id=mid, name=f"m{mid}", material_type="sales_deck", audience="internal",
+                 embedding_content_hash="old", updated_at=stamp)
+        for mid in (1, 2)
+    )
+    db.commit()
+    monkeypatch.setattr(EmbeddingPipeline, "_scan_chunks", lambda self, db, force: None)
+
+    pipeline = EmbeddingPipeline(initial_batch=4, max_batch=4, target_seconds=1.0)
+    assert pipeline.scan(db, force=True) == 2
+    db.expire_all()
+    rows = db.query(Material.embedding_content_hash, Material.updated_at).all()
+    assert rows == [(None, stamp), (None, stamp)]
+    db.close()
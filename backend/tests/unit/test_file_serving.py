@@ -0,0 +1,67 @@
+"""
+Unit tests for material file serving (validators, 304, ranges).
+"""
+from types import SimpleNamespace
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services import file_serving
+
+SHA = "ab" * 32
+
+
+def _client(tmp_path, monkeypatch, sha256=SHA):
+    path = tmp_path / "blob"
+    path.write_bytes(bytes(range(100)))
+    monkeypatch.setattr(file_serving.storage_service, "get_file_path", lambda _: path)
+    material = SimpleNamespace(
+        file_path="blobs/x", file_sha256=sha256, file_format="mp4", file_name="demo.mp4", name="Demo",
+    )
+    app = FastAPI()
+
+    @app.get("/file")
+    async def serve(request: Request):
+        return await file_serving.serve_material_file(request, material, inline=True)
+
+    return TestClient(app)
+
+
+def test_strong_etag_from_content_hash_and_304(tmp_path, monkeypatch):
+    """Test that the stored hash is the ETag and revalidation returns 304 without a body."""
+    client = _client(tmp_path, monkeypatch)
+
+    first = client.get("/file")
+    assert first.status_code == 200
+    assert first.headers["etag"] == f'"{SHA}"'
+    assert first.headers["content-type"] == "video/mp4"
+    assert first.headers["content-disposition"].startswith("inline")
+
+    assert client.get("/file", headers={"If-None-Match": f'"{SHA}"'}).status_code == 304
+    assert client.get("/file", headers={"If-Modified-Since": first.headers["last-modified"]}).status_code == 304
+    assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_range_request_returns_partial_content(tmp_path, monkeypatch):
+    """Test that a byte range returns 206 with Content-Range and a weak ETag when no hash is stored."""
+    client = _client(tmp_path, monkeypatch, sha256=None)
+
+    response = client.get("/file", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == bytes(range(10, 20))
+    assert response.headers["content-range"] == "bytes 10-19/100"
+    assert response.headers["etag"].startswith('W/"')
+
+
+def test_offload_returns_x_accel_redirect_without_body(tmp_path, monkeypatch):
+    """Test that with offload enabled the body is left to nginx and validators are still set."""
+    monkeypatch.setattr(file_serving.settings, "FILE_SERVING_OFFLOAD", "x-accel")
+    monkeypatch.setattr(file_serving.storage_service, "storage_path", tmp_path)
+    client = _client(tmp_path, monkeypatch)
+
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == "/protected-files/blob"
+    assert response.headers["etag"] == f'"{SHA}"'
+    assert response.headers["content-disposition"] == 'inline; filename="demo.mp4"'
@@ -0,0 +1,73 @@
+"""
+Unit tests for the shared pooled AI HTTP client's lifecycle.
+"""
+import asyncio
+
+import httpx
+
+from app.services.http_client import AIHttpClient
+
+
+def _client(monkeypatch):
+    """An AIHttpClient whose httpx clients answer locally; returns it with the list of clients created."""
+    ai = AIHttpClient(max_connections=4, max_keepalive=2, max_retries=0)
+    created = []
+    new_client = ai._new_client
+
+    def tracked():
+        client = new_client()
+        client._transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True}))
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(ai, "_new_client", tracked)
+    return ai, created
+
+
+async def _post(ai):
+    response = await ai.post("chat", "https://ai.example/chat", json={}, headers={})
+    return response.status_code
+
+
+def test_one_pooled_client_is_reused_and_closed_on_shutdown(monkeypatch):
+    """Test that start opens one client, requests reuse it and close shuts it."""
+    ai, created = _client(monkeypatch)
+
+    async def scenario():
+        await ai.start()
+        await ai.start()
+        assert [await _post(ai) for _ in range(3)] == [200, 200, 200]
+        assert len(created) == 1 and ai.stats()["started"]
+        await ai.close()
+
+    asyncio.run(scenario())
+    assert created[0].is_closed
+    assert not ai.stats()["started"] and ai.stats()["endpoints"]["chat"]["requests"] == 3
+
+
+def test_client_is_recreated_after_close(monkeypatch):
+    """Test that a request after shutdown lazily opens a new pooled client."""
+    ai, created = _client(monkeypatch)
+
+    async def scenario():
+        await ai.start()
+        await ai.close()
+        assert await _post(ai) == 200
+        assert await _post(ai) == 200
+        await ai.close()
+
+    asyncio.run(scenario())
+    assert len(created) == 2 and all(c.is_closed for c in created)
+
+
+def test_other_event_loops_get_one_off_clients(monkeypatch):
+    """Test that a loop that doesn't own the pooled client uses and closes its own client."""
+    ai, created = _client(monkeypatch)
+    asyncio.run(ai.start())
+
+    assert asyncio.run(_post(ai)) == 200
+    pooled, one_off = created
+    assert one_off.is_closed and not pooled.is_closed
+    assert ai._client is pooled
+    asyncio.run(ai.close())
+    assert pooled.is_closed
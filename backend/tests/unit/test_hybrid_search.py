@@ -0,0 +1,52 @@
+"""
+Unit tests for reciprocal-rank fusion and hybrid search.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.api import semantic_search
+from app.services.hybrid_search import RRF_K, reciprocal_rank_fusion
+
+
+def test_documents_found_by_both_signals_rank_first():
+    """Test that agreement between signals outranks a single top hit."""
+    fused = reciprocal_rank_fusion({
+        "vector": [(1, 0.9), (2, 0.8), (3, 0.7)],
+        "fulltext": [(4, 0.5), (2, 0.4)],
+    })
+
+    assert fused[0].id == 2
+    assert fused[0].score == round(1 / (RRF_K + 2) + 1 / (RRF_K + 2), 6)
+    assert {h.id for h in fused} == {1, 2, 3, 4}
+
+
+def test_per_signal_ranks_and_scores_are_reported():
+    """Test that each hit records the rank and raw score of every signal that found it."""
+    fused = reciprocal_rank_fusion({"vector": [(7, 0.81234)], "fulltext": [(8, 0.2), (7, 0.1)]})
+    hit = next(h for h in fused if h.id == 7)
+
+    assert hit.signals == {
+        "vector": {"rank": 1, "score": 0.8123},
+        "fulltext": {"rank": 2, "score": 0.1},
+    }
+
+
+def test_empty_signals_fuse_to_nothing():
+    """Test that no input yields no results."""
+    assert reciprocal_rank_fusion({"vector": [], "fulltext": []}) == []
+
+
+def test_fulltext_failure_without_vectors_falls_back(monkeypatch):
+    """Test that a failing full-text query in keyword-only hybrid search rolls back and uses the ILIKE fallback."""
+    def broken_fulltext(*args):
+        raise RuntimeError("syntax error in tsquery")
+
+    rolled_back = []
+    monkeypatch.setattr(semantic_search, "_fulltext_candidates", broken_fulltext)
+    monkeypatch.setattr(semantic_search, "_ilike_fallback", lambda query, limit, *args: [{"id": 1, "query": query}])
+    db = SimpleNamespace(rollback=lambda: rolled_back.append(True))
+    filters = semantic_search.SearchFilters(None, None, None, None)
+
+    results = asyncio.run(semantic_search._hybrid_search("k8s", 5, filters, db, use_vectors=False))
+    assert results == [{"id": 1, "query": "k8s"}]
+    assert rolled_back == [True]
@@ -0,0 +1,71 @@
+"""
+Unit tests for the in-process NumPy vector index.
+"""
+from types import SimpleNamespace
+
+from app.services.in_memory_vector_index import InMemoryVectorIndex
+
+
+def _material(material_id, universe="Public Cloud", product="Compute", material_type="PRODUCT_BRIEF", status="published"):
+    return SimpleNamespace(
+        id=material_id,
+        universe_name=universe,
+        product_name=product,
+        material_type=material_type,
+        status=status,
+    )
+
+
+def _index():
+    index = InMemoryVectorIndex(refresh_seconds=3600)
+    index._loaded_at = 0.0  # mark as loaded without a database
+    return index
+
+
+def test_search_ranks_by_cosine_similarity():
+    """Test that the closest vector comes first and scores are cosine similarities."""
+    index = _index()
+    index.upsert(_material(1), [1.0, 0.0, 0.0])
+    index.upsert(_material(2), [0.7, 0.7, 0.0])
+    index.upsert(_material(3), [0.0, 0.0, 5.0])
+
+    hits = index.search([2.0, 0.0, 0.0], k=2)
+
+    assert [h[0] for h in hits] == [1, 2]
+    assert abs(hits[0][1] - 1.0) < 1e-6
+
+
+def test_search_applies_metadata_masks():
+    """Test that filters and the default hidden statuses exclude rows."""
+    index = _index()
+    index.upsert(_material(1, universe="Bare Metal"), [1.0, 0.0])
+    index.upsert(_material(2, status="draft"), [1.0, 0.1])
+    index.upsert(_material(3), [0.5, 0.5])
+
+    assert [h[0] for h in index.search([1.0, 0.0], k=5, universe="public")] == [3]
+    assert [h[0] for h in index.search([1.0, 0.0], k=5, status_filter="draft")] == [2]
+
+
+def test_upsert_replaces_and_remove_compacts():
+    """Test incremental updates keep ids and rows consistent."""
+    index = _index()
+    for i in range(1, 20):
+        index.upsert(_material(i), [float(i), 1.0])
+    index.upsert(_material(5), [-1.0, 0.0])
+    index.remove(1)
+
+    assert len(index) == 18
+    hits = index.search([-1.0, 0.0], k=1)
+    assert hits[0][0] == 5
+    assert 1 not in [h[0] for h in index.search([1.0, 0.0], k=50)]
+
+
+def test_neighbors_exclude_self_and_ignore_status():
+    """Test that a material's neighbours come from its stored vector, any status, without itself."""
+    index = _index()
+    index.upsert(_material(1), [1.0, 0.0])
+    index.upsert(_material(2, status="draft"), [0.9, 0.1])
+    index.upsert(_material(3), [0.0, 1.0])
+
+    assert [h[0] for h in index.neighbors(1, k=5)] == [2, 3]
+    assert index.neighbors(42, k=5) == []
@@ -0,0 +1,36 @@
+"""
+Unit tests for document chunking and passage aggregation.
+"""
+from app.services.material_chunks import ChunkHit, aggregate_by_material, chunk_pages
+
+
+def test_long_pages_split_into_overlapping_windows():
+    """Test that windows overlap, stay within their page and are labelled by position."""
+    words = [f"w{i}" for i in range(10)]
+    chunks = chunk_pages([("Page 1", " ".join(words)), ("Page 2", "short page")], window=4, overlap=1)
+
+    assert [c.location for c in chunks] == [
+        "Page 1 (1/3)", "Page 1 (2/3)", "Page 1 (3/3)", "Page 2",
+    ]
+    assert chunks[0].text == "w0 w1 w2 w3"
+    assert chunks[1].text.split()[0] == "w3"
+    assert chunks[2].text.split()[-1] == "w9"
+    assert chunks[3].text == "short page"
+
+
+def test_empty_pages_are_skipped():
+    """Test that pages without text produce no chunks."""
+    assert chunk_pages([("Slide 1", "   "), ("Slide 2", "")], window=200, overlap=50) == []
+
+
+def test_passages_max_pool_per_material():
+    """Test that a material scores as its best passage and keeps that passage."""
+    hits = [
+        ChunkHit(1, 10, "Slide 1", "a", 0.4),
+        ChunkHit(2, 20, "Page 3", "b", 0.6),
+        ChunkHit(3, 10, "Slide 7", "c", 0.9),
+    ]
+    ranked = aggregate_by_material(hits)
+
+    assert [(mid, score) for mid, score, _ in ranked] == [(10, 0.9), (20, 0.6)]
+    assert ranked[0][2].location == "Slide 7"
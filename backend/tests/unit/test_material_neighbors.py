@@ -0,0 +1,94 @@
+"""
+Unit tests for precomputed "more like this" lists (in-memory index path).
+"""
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.material import Material
+from app.models.material_neighbor import MaterialNeighbor
+from app.services import material_neighbors
+from app.services.embedding_coverage import EmbeddingCoverage
+from app.services.in_memory_vector_index import InMemoryVectorIndex
+from app.services.material_neighbors import compute_neighbors, get_neighbors, invalidate_neighbors
+
+_VECTORS = {
+    1: [1.0, 0.0, 0.0],
+    2: [0.9, 0.1, 0.0],
+    3: [0.0, 0.0, 1.0],
+    4: [0.0, 0.1, 1.0],
+    5: [0.0, 1.0, 0.0],
+    6: [0.0, 1.0, 0.05],
+}
+
+
+def _summary(material_id, status="published"):
+    return SimpleNamespace(
+        id=material_id, universe_name=None, product_name=None, material_type="sales_deck", status=status,
+    )
+
+
+def _setup(monkeypatch, top_n, draft=()):
+    """SQLite without pgvector, so the neighbour lists come from the in-memory index."""
+    engine = create_engine("sqlite://")
+    Material.__table__.create(engine)
+    MaterialNeighbor.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    for mid in _VECTORS:
+        db.add(Material(id=mid, name=f"m{mid}", material_type="sales_deck", audience="internal"))
+    db.commit()
+    # Raw status values, as the neighbour query filters on them in SQL
+    db.execute(text("UPDATE materials SET status = 'published'"))
+    for mid in draft:
+        db.execute(text("UPDATE materials SET status = 'draft' WHERE id = :id"), {"id": mid})
+    db.commit()
+
+    index = InMemoryVectorIndex(refresh_seconds=3600)
+    index._loaded_at = time.monotonic()  # mark as loaded without a database
+    for mid, vec in _VECTORS.items():
+        index.upsert(_summary(mid), vec)
+    monkeypatch.setattr(material_neighbors, "in_memory_vector_index", index)
+    monkeypatch.setattr(material_neighbors, "embedding_coverage", EmbeddingCoverage(refresh_seconds=3600))
+    monkeypatch.setattr(material_neighbors.settings, "SIMILAR_MATERIALS_TOP_N", top_n)
+    return db, index
+
+
+def _lists(db):
+    lists = {}
+    for row in db.query(MaterialNeighbor).order_by(MaterialNeighbor.material_id, MaterialNeighbor.rank):
+        lists.setdefault(row.material_id, []).append(row.neighbor_id)
+    return lists
+
+
+def test_missing_list_is_computed_on_read_and_hidden_neighbours_filtered(monkeypatch):
+    """Test that get_neighbors builds an uncached list once and skips draft materials when reading it."""
+    db, _ = _setup(monkeypatch, top_n=1, draft={2})
+
+    hits = get_neighbors(db, 3, limit=5)
+    assert [row.id for row, _ in hits] == [4]
+    assert get_neighbors(db, 1, limit=5) == []
+    assert _lists(db) == {1: [2], 3: [4]}
+
+    db.query(MaterialNeighbor).update({MaterialNeighbor.score: 0.5})
+    db.commit()
+    assert get_neighbors(db, 3, limit=5)[0][1] == 0.5  # served from the cached list
+    db.close()
+
+
+def test_invalidation_drops_only_lists_the_change_can_affect(monkeypatch):
+    """Test the changed material's own list, lists containing it and lists it now beats are dropped."""
+    db, index = _setup(monkeypatch, top_n=1)
+    assert compute_neighbors(db, _VECTORS) == 6
+    db.commit()
+    assert _lists(db) == {1: [2], 2: [1], 3: [4], 4: [3], 5: [6], 6: [5]}
+
+    # Material 5 moves next to 3 and 4
+    index.upsert(_summary(5), [0.0, 0.05, 1.0])
+    stale = invalidate_neighbors(db, [5])
+    db.commit()
+
+    assert stale == {3, 4, 5, 6}
+    assert _lists(db) == {1: [2], 2: [1]}
+    db.close()
@@ -0,0 +1,69 @@
+"""
+Unit tests for lightweight material summaries.
+"""
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.models.material import Material, MaterialStatus
+from app.services.material_summary import (
+    SUMMARY_FIELDS,
+    json_list,
+    load_summaries,
+    status_value,
+    summary_options,
+    summary_to_dict,
+)
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Material.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        Material(id=1, name="Kubernetes deck", material_type="sales_deck", audience="internal",
+                 status=MaterialStatus.PUBLISHED, tags='["k8s"]', executive_summary="long text"),
+        Material(id=2, name="Object Storage brief", material_type="product_brief", audience="customer_facing"),
+    ])
+    db.commit()
+    db.expunge_all()
+    return db
+
+
+def test_load_summaries_returns_rows_keyed_by_id():
+    """Test that only requested ids come back, as summary rows with Material's attribute names."""
+    db = _session()
+
+    rows = load_summaries(db, [2, 1, 99])
+    assert sorted(rows) == [1, 2]
+    assert rows[1].name == "Kubernetes deck"
+    assert set(rows[1]._fields) == set(SUMMARY_FIELDS)
+    assert summary_to_dict(rows[1], 0.123456)["similarity_score"] == 0.1235
+    assert load_summaries(db, []) == {}
+    db.close()
+
+
+def test_summary_options_defer_heavy_columns():
+    """Test that ORM queries with summary_options leave embeddings and summaries unloaded."""
+    db = _session()
+
+    material = db.query(Material).options(summary_options()).filter(Material.id == 1).one()
+    unloaded = inspect(material).unloaded
+    assert {"executive_summary", "embedding", "search_text"} <= unloaded
+    assert "tags" not in unloaded
+    db.close()
+
+
+def test_status_value_normalizes_enum_and_raw_values():
+    """Test that enum members, raw SQL strings and None all serialize the same way."""
+    assert status_value(MaterialStatus.PUBLISHED) == "published"
+    assert status_value("PUBLISHED") == "published"
+    assert status_value(None) is None
+
+
+def test_json_list_tolerates_bad_values():
+    """Test that JSON array columns decode and anything else becomes an empty list."""
+    assert json_list('["a", "b"]') == ["a", "b"]
+    assert json_list(None) == []
+    assert json_list("") == []
+    assert json_list("not json") == []
+    assert json_list('{"a": 1}') == []
@@ -0,0 +1,69 @@
+"""
+Unit tests for the search result cache and catalog version.
+"""
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.services.search_cache import SearchResultCache, catalog_version, etag_matches
+
+_Base = declarative_base()
+
+
+class _Chunk(_Base):
+    __tablename__ = "material_chunks"
+    id = Column(Integer, primary_key=True)
+    text = Column(String)
+
+
+class _Other(_Base):
+    __tablename__ = "unrelated"
+    id = Column(Integer, primary_key=True)
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    _Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_cache_returns_payload_with_stable_etag():
+    """Test that a cached payload comes back with the ETag returned by put."""
+    cache = SearchResultCache(maxsize=4, ttl=60)
+    etag = cache.put(("q", 10), {"results": [1, 2]})
+
+    assert cache.get(("q", 10)) == (etag, {"results": [1, 2]})
+    assert etag == SearchResultCache(maxsize=1, ttl=60).put("other", {"results": [1, 2]})
+    assert cache.get(("q", 5)) is None
+
+
+def test_if_none_match_uses_weak_comparison():
+    """Test strong, weak, listed and wildcard If-None-Match values."""
+    etag = 'W/"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_catalog_writes_bump_version_on_commit_only():
+    """Test that committed catalog writes bump the counter; rollbacks and other tables don't."""
+    db = _session()
+    start = catalog_version._counter
+
+    db.add(_Other(id=1))
+    db.commit()
+    assert catalog_version._counter == start
+
+    db.add(_Chunk(id=1, text="a"))
+    db.flush()
+    db.rollback()
+    assert catalog_version._counter == start
+
+    db.add(_Chunk(id=2, text="b"))
+    db.commit()
+    assert catalog_version._counter == start + 1
+
+    db.query(_Chunk).filter(_Chunk.id == 2).delete()
+    db.commit()
+    assert catalog_version._counter == start + 2
@@ -0,0 +1,117 @@
+"""
+Unit tests for streaming uploads and content-addressed blob storage.
+"""
+import asyncio
+import hashlib
+import io
+import shutil
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import UploadFile
+
+from app.models.storage_blob import StorageBlob
+from app.services import storage
+from app.services.blob_store import LocalBlobBackend, S3BlobBackend, blob_key
+from app.services.storage import FileTooLargeError, StorageService
+
+
+def _service(tmp_path, backend=None):
+    service = StorageService.__new__(StorageService)
+    service.storage_path = tmp_path
+    service.staging_path = tmp_path / ".staging"
+    service.blobs = backend or LocalBlobBackend(tmp_path)
+    return service
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    StorageBlob.__table__.create(engine)
+    return sessionmaker(bind=engine)()
+
+
+def _upload(service, body, name="a.pdf"):
+    return asyncio.run(service.receive_upload(UploadFile(io.BytesIO(body), filename=name), 1000))
+
+
+class _ObjectStore:
+    """Bucket stand-in with the subset of the boto3 S3 client the backend uses."""
+
+    class NotFound(Exception):
+        response = {"Error": {"Code": "404"}}
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, filename, bucket, key):
+        with open(filename, "rb") as f:
+            self.objects[(bucket, key)] = f.read()
+
+    def download_file(self, bucket, key, filename):
+        with open(filename, "wb") as f:
+            f.write(self.objects[(bucket, key)])
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound()
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+def test_identical_uploads_share_one_blob_until_last_release(tmp_path, monkeypatch):
+    """Test that uploads are streamed, hashed, deduplicated and reference counted."""
+    monkeypatch.setattr(storage, "UPLOAD_CHUNK_SIZE", 7)
+    body = b"x" * 100
+    sha = hashlib.sha256(body).hexdigest()
+    service = _service(tmp_path)
+    db = _session()
+
+    first = _upload(service, body)
+    assert first.size == 100 and first.sha256 == sha
+    key = service.commit_upload(db, first)
+    assert key == blob_key(sha) == f"blobs/{sha[:2]}/{sha[2:4]}/{sha}"
+    assert service.commit_upload(db, _upload(service, body, "copy.pdf")) == key
+    db.commit()
+    assert service.get_file_path(key).read_bytes() == body
+    assert list((tmp_path / ".staging").iterdir()) == []
+    assert db.query(StorageBlob.ref_count).scalar() == 2
+
+    assert service.release_file(db, key) is None
+    db.commit()
+    assert service.release_file(db, key) == sha
+    db.commit()
+    service.purge_blob(db, sha)
+    assert not service.file_exists(key)
+
+
+def test_s3_backend_uploads_once_and_serves_from_cache(tmp_path):
+    """Test the object-store backend against an in-memory bucket."""
+    bucket = _ObjectStore()
+    backend = S3BlobBackend("materials", tmp_path / ".blob_cache", prefix="prod", client=bucket)
+    service = _service(tmp_path, backend)
+    db = _session()
+
+    key = service.commit_upload(db, _upload(service, b"deck"))
+    service.commit_upload(db, _upload(service, b"deck"))
+    db.commit()
+    assert list(bucket.objects) == [("materials", f"prod/{key}")]
+
+    shutil.rmtree(tmp_path / ".blob_cache")
+    assert service.get_file_path(key).read_bytes() == b"deck"
+
+    service.release_file(db, key)
+    service.purge_blob(db, service.release_file(db, key))
+    assert bucket.objects == {}
+
+
+def test_oversized_upload_is_rejected_and_cleaned_up(tmp_path):
+    """Test that the size limit stops the copy and leaves no partial file behind."""
+    service = _service(tmp_path)
+    upload = UploadFile(io.BytesIO(b"y" * 50), filename="big.mp4")
+
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(service.receive_upload(upload, 10, tmp_path))
+    assert list(tmp_path.iterdir()) == []
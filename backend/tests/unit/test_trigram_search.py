@@ -0,0 +1,86 @@
+"""
+Unit tests for trigram keyword matching and its ILIKE fallback.
+"""
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.models.material import Material
+from app.services import trigram_search
+from app.services.trigram_search import trigram_available, trigram_match, trigram_match_all
+
+_COLUMNS = (Material.name, Material.description)
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Material.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(
+        Material(id=mid, name=name, description=description, material_type="sales_deck", audience="internal")
+        for mid, name, description in [
+            (1, "Kubernetes deck", "Managed Kubernetes Service"),
+            (2, "ClickHouse brief", "Managed ClickHouse"),
+            (3, "Object Storage", None),
+        ]
+    )
+    db.commit()
+    return db
+
+
+def _ids(db, condition):
+    return [r[0] for r in db.query(Material.id).filter(condition).order_by(Material.id)]
+
+
+def test_sqlite_falls_back_to_ilike(monkeypatch):
+    """Test that without pg_trgm terms match case-insensitive substrings and the score is constant."""
+    monkeypatch.setattr(trigram_search, "_available", None)
+    db = _session()
+
+    assert not trigram_available(db)
+    match = trigram_match(db, "MANAGED", _COLUMNS)
+    assert _ids(db, match.condition) == [1, 2]
+    assert db.query(match.score).scalar() == 0.0
+    assert _ids(db, trigram_match_all(db, ["managed", "kube"], _COLUMNS)) == [1]
+    assert _ids(db, trigram_match_all(db, ["storage", "kube"], _COLUMNS)) == []
+    # A near miss does not match without pg_trgm
+    assert _ids(db, trigram_match(db, "kubernets", _COLUMNS).condition) == []
+    db.close()
+
+
+def test_postgres_with_pg_trgm_adds_word_similarity(monkeypatch):
+    """Test that with pg_trgm each column matches by ILIKE or `<%` and the score is the best similarity."""
+    monkeypatch.setattr(trigram_search, "_available", True)
+    db = SimpleNamespace()
+
+    match = trigram_match(db, "kubernets", _COLUMNS)
+    condition = str(match.condition.compile(dialect=postgresql.dialect()))
+    score = str(match.score.compile(dialect=postgresql.dialect()))
+    assert condition.count("ILIKE") == 2 and condition.count("<%") == 2
+    assert score.startswith("greatest(word_similarity(") and "coalesce(materials.description" in score
+
+    single = trigram_match(db, "kubernets", (Material.name,)).score
+    assert str(single.compile(dialect=postgresql.dialect())).startswith("word_similarity(")
+    combined = str(trigram_match_all(db, ["a", "b"], _COLUMNS).compile(dialect=postgresql.dialect()))
+    assert " AND " in combined and combined.count("<%") == 4
+
+
+def test_failed_extension_check_degrades_to_ilike(monkeypatch):
+    """Test that a PostgreSQL database whose pg_extension lookup fails is treated as lacking pg_trgm."""
+    monkeypatch.setattr(trigram_search, "_available", None)
+    rolled_back = []
+
+    def execute(*args):
+        raise RuntimeError("permission denied")
+
+    db = SimpleNamespace(
+        get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="postgresql")),
+        execute=execute,
+        rollback=lambda: rolled_back.append(True),
+    )
+    assert not trigram_available(db)
+    assert rolled_back == [True]
+    condition = str(trigram_match(db, "k8s", _COLUMNS).condition.compile(dialect=postgresql.dialect()))
+    assert "<%" not in condition and condition.count("ILIKE") == 2
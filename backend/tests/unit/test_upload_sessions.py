@@ -0,0 +1,48 @@
+"""
+Unit tests for resumable chunked uploads.
+"""
+import asyncio
+import hashlib
+
+import pytest
+
+from app.services.upload_sessions import UploadSessionError, UploadSessionStore
+
+
+async def _body(*pieces):
+    for piece in pieces:
+        yield piece
+
+
+def test_parallel_out_of_order_chunks_assemble_into_the_file(tmp_path):
+    """Test that concurrent chunks at arbitrary offsets are tracked and hard-linked on completion."""
+    data = bytes(range(250)) * 40
+    store = UploadSessionStore(tmp_path / "sessions", ttl_seconds=60)
+    session = store.create(1, "deck.pdf", len(data), {}, hashlib.sha256(data).hexdigest())
+
+    async def upload(offsets):
+        await asyncio.gather(*(
+            store.write_chunk(session, o, _body(data[o:o + 1000][:400], data[o:o + 1000][400:]))
+            for o in offsets
+        ))
+
+    asyncio.run(upload([9000, 3000, 0, 7000]))
+    progress = store.progress(session)
+    assert progress["received_bytes"] == 4000
+    assert progress["missing_ranges"] == [[1000, 3000], [4000, 7000], [8000, 9000]]
+    with pytest.raises(UploadSessionError):
+        asyncio.run(store.assemble(session, tmp_path / "out"))
+
+    asyncio.run(upload([1000, 2000, 4000, 5000, 6000, 8000]))
+    pending = asyncio.run(store.assemble(session, tmp_path / "out"))
+    assert pending.temp_path.read_bytes() == data
+    assert pending.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_chunk_past_declared_size_is_rejected(tmp_path):
+    store = UploadSessionStore(tmp_path, ttl_seconds=60)
+    session = store.create(1, "a.pdf", 10, {})
+
+    with pytest.raises(UploadSessionError):
+        asyncio.run(store.write_chunk(session, 5, _body(b"123456")))
+    assert store.progress(session)["received_bytes"] == 0
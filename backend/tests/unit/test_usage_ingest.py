@@ -0,0 +1,85 @@
+"""
+Unit tests for buffered usage-event ingestion.
+"""
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.usage import MaterialUsage
+from app.services import usage_ingest
+from app.services.usage_ingest import UsageIngester
+
+
+def _database(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    MaterialUsage.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE materials (id INTEGER PRIMARY KEY, usage_count INTEGER, last_updated DATETIME)"))
+        conn.execute(text("INSERT INTO materials (id, usage_count) VALUES (1, 5), (2, NULL)"))
+    monkeypatch.setattr(usage_ingest, "SessionLocal", sessionmaker(bind=engine))
+    return engine
+
+
+def test_events_and_counters_are_written_in_one_batch(tmp_path, monkeypatch):
+    """Test that buffered events are inserted and counters summed per row, with deduplication."""
+    engine = _database(tmp_path, monkeypatch)
+    ingester = UsageIngester(flush_interval_ms=60000, batch_size=100, max_pending=1000)
+
+    async def scenario():
+        await ingester.start()
+        for _ in range(3):
+            await ingester.record(1, 7, "download")
+            ingester.increment("materials", 1, "usage_count")
+        assert await ingester.record(2, 7, "view", dedupe_seconds=60)
+        assert not await ingester.record(2, 7, "view", dedupe_seconds=60)
+        ingester.increment("materials", 2, "usage_count", 2)
+        # A NOT NULL violation only discards that event
+        await ingester.record(2, None, "view")
+        assert ingester.pending == 5
+        await ingester.close()
+
+    asyncio.run(scenario())
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM material_usage")).scalar() == 4
+        counts = dict(conn.execute(text("SELECT id, usage_count FROM materials")).all())
+    assert counts == {1: 8, 2: 2}
+    assert ingester.pending == 0 and ingester.dropped == 1 and ingester.deduplicated == 1
+
+
+def test_dedupe_window_spans_workers(tmp_path, monkeypatch):
+    """Test that a repeat already stored by another worker is not inserted again."""
+    engine = _database(tmp_path, monkeypatch)
+    workers = [UsageIngester(flush_interval_ms=60000, batch_size=100, max_pending=1000) for _ in range(2)]
+
+    async def scenario():
+        for worker in workers:
+            assert await worker.record(1, 7, "view", dedupe_seconds=60)
+            await worker.record(1, 7, "download")
+            await worker.flush()
+
+    asyncio.run(scenario())
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT action, COUNT(*) FROM material_usage GROUP BY action")).all()
+    assert dict(rows) == {"download": 2, "view": 1}
+
+
+def test_failed_flush_keeps_newest_events_within_limit(monkeypatch):
+    """Test that a failing database requeues the batch and sheds the oldest events when full."""
+    ingester = UsageIngester(flush_interval_ms=60000, batch_size=2, max_pending=3)
+
+    def unavailable(*args):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(ingester, "_write", unavailable)
+
+    async def scenario():
+        for material_id in range(1, 6):
+            await ingester.record(material_id, 1, "view")
+        ingester.increment("materials", 1, "usage_count")
+        assert await ingester.flush() == 0
+
+    asyncio.run(scenario())
+    assert [e["material_id"] for e in ingester._events] == [3, 4, 5]
+    assert ingester.dropped == 2 and ingester.failed_flushes == 3
+    assert ingester._counters[("materials", 1)] == {"usage_count": 1}
@@ -0,0 +1,57 @@
+"""
+Unit tests for the shared vector codec.
+"""
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import psycopg
+from psycopg.adapt import AdaptersMap, PyFormat
+from psycopg.types import TypeInfo
+
+from app.core import vector_codec
+from app.core.vector_codec import Vector, decode_embedding, encode_embedding
+
+
+def test_embedding_round_trip_is_float32_exact():
+    """Test that the compact mirror form decodes to the same float32 values."""
+    values = [0.125, -1.5, 3.0e-4, 0.3333333]
+    decoded = decode_embedding(encode_embedding(values))
+
+    assert decoded.dtype == np.float32
+    assert np.array_equal(decoded, np.asarray(values, dtype=np.float32))
+
+
+def test_decode_embedding_reads_legacy_json():
+    """Test that embeddings written before the binary form still decode."""
+    decoded = decode_embedding(json.dumps([0.5, 0.25]))
+    assert decoded.tolist() == [0.5, 0.25]
+    assert decode_embedding(None) is None
+
+
+def test_binary_wire_format_round_trip():
+    """Test the pgvector binary layout: int16 dim, int16 unused, big-endian float4."""
+    vec = Vector([1.0, -2.0, 0.5])
+    data = vec.to_binary()
+
+    assert len(data) == 4 + 3 * 4
+    assert data[:4] == b"\x00\x03\x00\x00"
+    assert Vector.from_binary(data).to_list() == [1.0, -2.0, 0.5]
+
+
+def test_text_literal_is_pgvector_compatible():
+    """Test that the text form is a bracketed, comma separated list."""
+    assert Vector([0.5, 1.0]).to_text() == "[0.5,1.0]"
+
+
+def test_psycopg_connections_bind_vectors_in_binary(monkeypatch):
+    """Test that the default psycopg 3 driver sends vectors in pgvector's binary format."""
+    monkeypatch.setattr(TypeInfo, "fetch", classmethod(lambda cls, conn, name: SimpleNamespace(oid=16400)))
+    conn = SimpleNamespace(adapters=AdaptersMap(psycopg.adapters), autocommit=True)
+    vector_codec._register_psycopg(conn)
+
+    vec = Vector([1.0, -2.0])
+    dumper = conn.adapters.get_dumper(Vector, PyFormat.AUTO)(Vector)
+    assert dumper.oid == 16400
+    assert dumper.dump(vec) == vec.to_binary()
+    assert conn.adapters.get_dumper(Vector, PyFormat.TEXT)(Vector).dump(vec) == b"[1.0,-2.0]"
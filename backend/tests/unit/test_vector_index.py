@@ -0,0 +1,62 @@
+"""
+Unit tests for the compressed ANN index expressions and rescoring SQL.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.services.vector_index import HNSW_MAX_EF_SEARCH, ann_expression, ann_search_sql, apply_search_tuning
+
+
+def test_full_precision_queries_order_by_the_column_directly():
+    """Test that the default mode keeps the single-stage query."""
+    expr = ann_expression("embedding_vec", "full", 0)
+    sql, params = ann_search_sql(["id"], "materials", ["status = :status"], 10, expression=expr)
+
+    assert not expr.compressed
+    assert "ann_candidates" not in params
+    assert "ORDER BY embedding_vec <=> CAST(:qvec AS vector)" in sql
+
+
+def test_compressed_modes_rescore_candidates_at_full_precision():
+    """Test that a truncated halfvec index is searched first and rescored on the full column."""
+    expr = ann_expression("c.embedding_vec", "half", 256)
+    sql, params = ann_search_sql(
+        ["c.id", "c.text"], "material_chunks c", [], 10,
+        vector_column="c.embedding_vec", expression=expr, rescore_factor=4,
+    )
+
+    assert expr.indexed == "(subvector(c.embedding_vec, 1, 256)::halfvec(256))"
+    assert expr.opclass == "halfvec_cosine_ops"
+    assert params == {"lim": 10, "ann_candidates": 40}
+    assert "SELECT id, text, 1 - (ann_vec <=> CAST(:qvec AS vector)) AS similarity" in sql
+    assert f"ORDER BY {expr.indexed} <=> {expr.query}" in sql
+
+
+def test_unknown_precision_is_rejected():
+    """Test that precisions other than full/half/binary raise ValueError."""
+    with pytest.raises(ValueError):
+        ann_expression(precision="int4")
+
+
+def test_candidate_pool_is_capped_at_pgvector_ef_search_limit():
+    """Test that rescoring never asks the HNSW index for more rows than ef_search allows."""
+    expr = ann_expression("embedding_vec", "binary", 0)
+    _, params = ann_search_sql(["id"], "materials", [], 500, expression=expr, rescore_factor=4)
+    assert params["ann_candidates"] == HNSW_MAX_EF_SEARCH
+
+    _, params = ann_search_sql(["id"], "materials", [], 1500, expression=expr, rescore_factor=4)
+    assert params["ann_candidates"] == 1500
+
+
+def test_rejected_tuning_keeps_the_callers_transaction():
+    """Test that a failing set_config only rolls back its savepoint."""
+    engine = create_engine("sqlite://")
+    db = sessionmaker(bind=engine)()
+    db.execute(text("CREATE TABLE t (id INTEGER)"))
+    db.execute(text("INSERT INTO t VALUES (1)"))
+
+    # SQLite has no set_config(), like a database without the setting
+    apply_search_tuning(db, candidates=2000)
+    assert db.execute(text("SELECT COUNT(*) FROM t")).scalar() == 1
+    db.close()